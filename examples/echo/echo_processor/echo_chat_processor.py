@@ -4,14 +4,17 @@ Simple echo implementation of OrchaelChatProcessor that demonstrates environment
 
 import os
 from typing import List
-from orchael_sdk import OrchaelChatProcessor, ChatInput, ChatOutput, ChatHistoryEntry
+from orchael_sdk import OrchaelChatProcessor, ChatInput, ChatOutput, MemoryHistoryStore
 
 
 class EchoChatProcessor(OrchaelChatProcessor):
     """Simple echo processor that repeats input and demonstrates environment variable usage"""
 
     def __init__(self) -> None:
-        self._history: List[ChatHistoryEntry] = []
+        # Keep recent turns in memory unless config.yaml selects another store
+        self.history_store = MemoryHistoryStore(
+            max_entries=int(os.getenv("ECHO_HISTORY_MAX_ENTRIES", "1000"))
+        )
 
         # Read configuration from environment variables
         self.prefix = os.getenv("ECHO_PREFIX", "Echo: ")
@@ -42,10 +45,10 @@ class EchoChatProcessor(OrchaelChatProcessor):
         output = ChatOutput(input=input_text, output=output_text)
 
         # Add to history
-        self._history.append({"input": input_text, "output": output_text})
+        self.record_history({"input": input_text, "output": output_text})
 
         return output
 
-    def get_history(self) -> List[ChatHistoryEntry]:
-        """Return the chat history as an array of ChatHistoryEntry"""
-        return self._history
+    def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        """Echo each input in turn; the work is too cheap to benefit from threads"""
+        return [self.process_chat(chat_input) for chat_input in chat_inputs]
@@ -31,14 +31,24 @@ class TestEchoProcessor:
     def setup_method(self) -> None:
         """Set up test environment"""
         # Clear any existing test environment variables
-        for key in ["ECHO_PREFIX", "ECHO_UPPERCASE", "ECHO_REPEAT_COUNT"]:
+        for key in [
+            "ECHO_PREFIX",
+            "ECHO_UPPERCASE",
+            "ECHO_REPEAT_COUNT",
+            "ECHO_HISTORY_MAX_ENTRIES",
+        ]:
             if key in os.environ:
                 del os.environ[key]
 
     def teardown_method(self) -> None:
         """Clean up test environment"""
         # Clean up test environment variables
-        for key in ["ECHO_PREFIX", "ECHO_UPPERCASE", "ECHO_REPEAT_COUNT"]:
+        for key in [
+            "ECHO_PREFIX",
+            "ECHO_UPPERCASE",
+            "ECHO_REPEAT_COUNT",
+            "ECHO_HISTORY_MAX_ENTRIES",
+        ]:
             if key in os.environ:
                 del os.environ[key]
 
@@ -115,3 +125,30 @@ class TestEchoProcessor:
         assert len(history) == 2
         assert history[0]["input"] == "First message"
         assert history[1]["input"] == "Second message"
+
+    def test_echo_processor_batch(self) -> None:
+        """Test EchoChatProcessor processes batches in order"""
+        processor = EchoChatProcessor()
+
+        results = processor.process_batch(
+            [ChatInput(input="one", history=None), ChatInput(input="two", history=None)]
+        )
+
+        assert [result["output"] for result in results] == ["Echo: one", "Echo: two"]
+        assert len(processor.get_history()) == 2
+
+    def test_echo_processor_history_is_bounded(self) -> None:
+        """Test EchoChatProcessor keeps only the most recent turns"""
+        os.environ["ECHO_HISTORY_MAX_ENTRIES"] = "2"
+        processor = EchoChatProcessor()
+
+        processor.process_batch(
+            [ChatInput(input=str(i), history=None) for i in range(3)]
+        )
+
+        assert [entry["input"] for entry in processor.get_history()] == ["1", "2"]
+        page = processor.get_history_page(cursor=1, limit=1)
+        assert page == {
+            "history": [{"input": "1", "output": "Echo: 1"}],
+            "next_cursor": 2,
+        }
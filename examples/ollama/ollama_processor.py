@@ -3,8 +3,9 @@ Ollama implementation of OrchaelChatProcessor
 """
 
 import os
-from typing import List
-from orchael_sdk import OrchaelChatProcessor, ChatInput, ChatOutput, ChatHistoryEntry  # type: ignore[import-not-found]
+import requests
+from typing import Any, AsyncIterator, Iterator, List
+from orchael_sdk import OrchaelChatProcessor, ChatInput, ChatOutput, ContextWindow, MemoryHistoryStore  # type: ignore[import-not-found]
 from langchain.prompts import ChatPromptTemplate, MessagesPlaceholder  # type: ignore[import-not-found]
 from langchain_core.messages import HumanMessage, AIMessage  # type: ignore[import-not-found]
 from langchain_ollama import ChatOllama  # type: ignore[import-not-found]
@@ -14,7 +15,15 @@ class OllamaChatProcessor(OrchaelChatProcessor):
     """Ollama chat processor that asks questions of ollama"""
 
     def __init__(self) -> None:
-        self._history: List[ChatHistoryEntry] = []
+        # Keep recent turns in memory unless config.yaml selects another store
+        self.history_store = MemoryHistoryStore(
+            max_entries=int(os.getenv("OLLAMA_HISTORY_MAX_ENTRIES", "1000"))
+        )
+
+        # Send the model only as many recent turns as fit its context
+        self.context_window = ContextWindow(
+            max_tokens=int(os.getenv("OLLAMA_CONTEXT_MAX_TOKENS", "2048"))
+        )
 
         # Get configuration from environment variables
         self.ollama_url = os.getenv("OLLAMA_URL", "http://localhost:11434")
@@ -43,32 +52,75 @@ class OllamaChatProcessor(OrchaelChatProcessor):
         # Create the chain
         self.chain = self.prompt | self.ollama
 
-    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
-        # Convert history to LangChain message format
-        messages = []
-        history = chat_input.get("history")
-        if history:
-            for entry in history:
-                messages.append(HumanMessage(content=entry["input"]))
-                messages.append(AIMessage(content=entry["output"]))
-
-        # Add current question
-        messages.append(HumanMessage(content=chat_input["input"]))
+    def warmup(self) -> None:
+        """Load the model into Ollama's memory so the first chat is not cold"""
+        # A generate request without a prompt only loads the model
+        response = requests.post(
+            f"{self.ollama_url}/api/generate",
+            json={"model": self.ollama_model},
+            timeout=300,
+        )
+        response.raise_for_status()
 
-        # Get response from the model
-        ai_response = self.chain.invoke(
-            {"history": messages[:-1], "input": chat_input["input"]}
+    def _build_messages(self, chat_input: ChatInput) -> List[Any]:
+        """Convert the history that fits the context window to LangChain messages"""
+        messages = []
+        history = self.context_window.select(
+            chat_input.get("history"), chat_input["input"]
         )
-        answer = getattr(ai_response, "content", str(ai_response))
+        for entry in history:
+            messages.append(HumanMessage(content=entry["input"]))
+            messages.append(AIMessage(content=entry["output"]))
+        return messages
 
+    def _record(self, chat_input: ChatInput, answer: str) -> ChatOutput:
+        """Create the output and add it to history"""
         # Create output
         output = ChatOutput(input=chat_input["input"], output=answer)
 
         # Add to history
-        self._history.append({"input": chat_input["input"], "output": answer})
+        self.record_history({"input": chat_input["input"], "output": answer})
 
         return output
 
-    def get_history(self) -> List[ChatHistoryEntry]:
-        """Return the chat history as an array of ChatHistoryEntry"""
-        return self._history
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        # Get response from the model
+        ai_response = self.chain.invoke(
+            {"history": self._build_messages(chat_input), "input": chat_input["input"]}
+        )
+        return self._record(
+            chat_input, getattr(ai_response, "content", str(ai_response))
+        )
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        # Await the model directly so the server can serve many conversations
+        # concurrently on a single event loop
+        ai_response = await self.chain.ainvoke(
+            {"history": self._build_messages(chat_input), "input": chat_input["input"]}
+        )
+        return self._record(
+            chat_input, getattr(ai_response, "content", str(ai_response))
+        )
+
+    def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+        # Yield tokens as ChatOllama produces them and record the full answer
+        chunks = []
+        for chunk in self.chain.stream(
+            {"history": self._build_messages(chat_input), "input": chat_input["input"]}
+        ):
+            text = getattr(chunk, "content", str(chunk))
+            if text:
+                chunks.append(text)
+                yield text
+        self._record(chat_input, "".join(chunks))
+
+    async def astream_chat(self, chat_input: ChatInput) -> AsyncIterator[str]:
+        chunks = []
+        async for chunk in self.chain.astream(
+            {"history": self._build_messages(chat_input), "input": chat_input["input"]}
+        ):
+            text = getattr(chunk, "content", str(chunk))
+            if text:
+                chunks.append(text)
+                yield text
+        self._record(chat_input, "".join(chunks))
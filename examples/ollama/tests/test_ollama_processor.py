@@ -91,3 +91,19 @@ class TestOllamaProcessor:
         history = processor.get_history()
         assert isinstance(history, list)
         assert len(history) == 0
+
+    def test_ollama_processor_trims_history_to_context(self) -> None:
+        """Test only the recent turns that fit the context budget are sent"""
+        os.environ["OLLAMA_CONTEXT_MAX_TOKENS"] = "10"
+        try:
+            processor = OllamaChatProcessor()
+        finally:
+            del os.environ["OLLAMA_CONTEXT_MAX_TOKENS"]
+
+        history = [{"input": "q" * 8, "output": "a" * 8} for _ in range(5)]
+        messages = processor._build_messages(
+            ChatInput(input="hello", history=history)
+        )
+
+        # The input takes 2 tokens and each turn 4, so two turns fit
+        assert len(messages) == 4
@@ -2,14 +2,94 @@
 Orchael SDK - A framework for building chat processors
 """
 
-from .orchael_chat_processor import OrchaelChatProcessor
-from .chat_types import ChatInput, ChatOutput, ChatHistoryEntry
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .orchael_chat_processor import OrchaelChatProcessor, WrapperChatProcessor
+    from .chat_types import ChatInput, ChatOutput, ChatHistoryEntry, ChatHistoryPage
+    from .compaction import Compactor, ProcessorSummarizer
+    from .context import ContextWindow
+    from .hedging import HedgedChatProcessor
+    from .history import HistoryBuffer
+    from .history_store import (
+        HistoryStore,
+        LogHistoryStore,
+        MemoryHistoryStore,
+        MmapHistoryStore,
+        SQLiteHistoryStore,
+    )
+    from .middleware import (
+        ChatMiddleware,
+        CompactingChatProcessor,
+        MiddlewareChatProcessor,
+    )
+    from .parallel import ParallelChatProcessor, ParallelStrategy
+
+# Module defining each export. Exports are imported on first access, so a
+# processor importing OrchaelChatProcessor does not also load the history
+# stores, middleware and other optional components.
+_EXPORTS = {
+    "OrchaelChatProcessor": "orchael_chat_processor",
+    "WrapperChatProcessor": "orchael_chat_processor",
+    "ChatInput": "chat_types",
+    "ChatOutput": "chat_types",
+    "ChatHistoryEntry": "chat_types",
+    "ChatHistoryPage": "chat_types",
+    "Compactor": "compaction",
+    "ProcessorSummarizer": "compaction",
+    "ContextWindow": "context",
+    "HedgedChatProcessor": "hedging",
+    "HistoryBuffer": "history",
+    "HistoryStore": "history_store",
+    "LogHistoryStore": "history_store",
+    "MemoryHistoryStore": "history_store",
+    "MmapHistoryStore": "history_store",
+    "SQLiteHistoryStore": "history_store",
+    "ChatMiddleware": "middleware",
+    "CompactingChatProcessor": "middleware",
+    "MiddlewareChatProcessor": "middleware",
+    "ParallelChatProcessor": "parallel",
+    "ParallelStrategy": "parallel",
+}
+
+
+def __getattr__(name: str) -> Any:
+    module_name = _EXPORTS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module_name}", __name__), name)
+    # Cache the export so later lookups skip this hook
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
+
 
 __all__ = [
     "OrchaelChatProcessor",
+    "WrapperChatProcessor",
     "ChatInput",
     "ChatOutput",
     "ChatHistoryEntry",
+    "ChatHistoryPage",
+    "ContextWindow",
+    "Compactor",
+    "CompactingChatProcessor",
+    "ProcessorSummarizer",
+    "HistoryBuffer",
+    "HistoryStore",
+    "MemoryHistoryStore",
+    "SQLiteHistoryStore",
+    "LogHistoryStore",
+    "MmapHistoryStore",
+    "ChatMiddleware",
+    "MiddlewareChatProcessor",
+    "ParallelChatProcessor",
+    "ParallelStrategy",
+    "HedgedChatProcessor",
     "set_env_vars_from_config",
 ]
 
@@ -0,0 +1,189 @@
+"""
+Admission control with an adaptive concurrency limit for Orchael SDK
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Deque, Dict, Optional
+
+
+class Overloaded(Exception):
+    """Raised when a request is shed instead of being admitted"""
+
+    def __init__(self, message: str, retry_after: int, queue_full: bool) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.queue_full = queue_full
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limiter with a bounded wait queue and an AIMD-adjusted limit.
+
+    Up to ``limit`` requests run at once and up to ``max_queue`` more wait for
+    a slot; anything beyond that is shed immediately with :class:`Overloaded`,
+    as are requests that wait longer than ``queue_timeout_ms``.
+
+    The limit adapts to observed latency: every request that completes within
+    the latency threshold grows it additively (by one per ``limit``
+    completions) and every slower one shrinks it multiplicatively by
+    ``backoff``. The threshold is ``target_latency_ms`` when set, otherwise
+    ``tolerance`` times the lowest recently observed latency.
+
+    The limiter must only be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        max_queue: int = 64,
+        queue_timeout_ms: Optional[float] = None,
+        target_latency_ms: Optional[float] = None,
+        tolerance: float = 2.0,
+        backoff: float = 0.9,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if not 1 <= min_limit <= initial_limit <= max_limit:
+            raise ValueError("limits must satisfy 1 <= min <= initial <= max")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+        if not 0 < backoff < 1:
+            raise ValueError("backoff must be between 0 and 1")
+
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.max_queue = max_queue
+        self.queue_timeout_ms = queue_timeout_ms
+        self.target_latency_ms = target_latency_ms
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.in_flight = 0
+        self.accepted = 0
+        self.shed = 0
+        self._clock = clock
+        self._waiters: Deque["asyncio.Future[None]"] = deque()
+        self._baseline_ms: Optional[float] = None
+        self._average_ms = 0.0
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a slot"""
+        return len(self._waiters)
+
+    async def acquire(self) -> None:
+        """Wait for a slot, raising Overloaded if the request is shed"""
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+            self.accepted += 1
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            self.shed += 1
+            raise Overloaded(
+                "Server is overloaded, wait queue is full",
+                self.retry_after(),
+                queue_full=True,
+            )
+
+        waiter: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            timeout = (
+                self.queue_timeout_ms / 1000
+                if self.queue_timeout_ms is not None
+                else None
+            )
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(waiter)
+            self.shed += 1
+            raise Overloaded(
+                "Timed out waiting for a free slot",
+                self.retry_after(),
+                queue_full=False,
+            )
+        except asyncio.CancelledError:
+            self._abandon(waiter)
+            raise
+        self.accepted += 1
+
+    def release(self, latency_ms: Optional[float] = None) -> None:
+        """Free a slot and adapt the limit to the request's latency"""
+        self.in_flight -= 1
+        if latency_ms is not None:
+            self._observe(latency_ms)
+        self._wake()
+
+    @asynccontextmanager
+    async def slot(self, requests: int = 1) -> AsyncIterator[None]:
+        """
+        Hold a slot for the duration of the block, timing it for the limit.
+
+        A block serving several ``requests`` at once, such as a batch, is timed
+        per request so it does not count as one slow request.
+        """
+        await self.acquire()
+        start = self._clock()
+        try:
+            yield
+        finally:
+            self.release((self._clock() - start) * 1000 / max(requests, 1))
+
+    def retry_after(self) -> int:
+        """Estimate in whole seconds how long until a queued request would run"""
+        waiting = len(self._waiters) + 1
+        return max(1, math.ceil(self._average_ms * waiting / self.limit / 1000))
+
+    def stats(self) -> Dict[str, int]:
+        """Return the current limit, load and admission counters"""
+        return {
+            "limit": int(self.limit),
+            "in_flight": self.in_flight,
+            "queue_depth": len(self._waiters),
+            "accepted": self.accepted,
+            "shed": self.shed,
+        }
+
+    def _observe(self, latency_ms: float) -> None:
+        self._average_ms += (latency_ms - self._average_ms) * 0.1
+        if self._baseline_ms is None or latency_ms < self._baseline_ms:
+            self._baseline_ms = latency_ms
+        else:
+            # Let the baseline drift up slowly if the backend gets slower for good
+            self._baseline_ms += (latency_ms - self._baseline_ms) * 0.01
+
+        threshold = (
+            self.target_latency_ms
+            if self.target_latency_ms is not None
+            else self._baseline_ms * self.tolerance
+        )
+        if latency_ms > threshold:
+            self.limit = max(float(self.min_limit), self.limit * self.backoff)
+        else:
+            self.limit = min(float(self.max_limit), self.limit + 1 / self.limit)
+
+    def _wake(self) -> None:
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                # The slot is handed over before the waiter resumes
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def _abandon(self, waiter: "asyncio.Future[None]") -> None:
+        """Give up on a queued request, returning its slot if it was granted"""
+        if waiter.done() and not waiter.cancelled():
+            self.in_flight -= 1
+            self._wake()
+        else:
+            waiter.cancel()
+            try:
+                self._waiters.remove(waiter)
+            except ValueError:
+                pass
@@ -0,0 +1,144 @@
+"""
+Streaming JSONL batch runs for Orchael SDK processors
+"""
+
+import json
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import IO, Any, Callable, Dict, Iterable, Iterator, Optional, Set, Tuple
+
+from .chat_types import ChatInput
+from .orchael_chat_processor import OrchaelChatProcessor
+
+Result = Dict[str, Any]
+
+
+def read_records(lines: Iterable[str]) -> Iterator[Tuple[int, Any]]:
+    """
+    Yield the line number and parsed record of every non-blank line.
+
+    Lines that are not valid JSON yield their ValueError in place of a record.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as e:
+            yield number, e
+
+
+def process_record(processor: OrchaelChatProcessor, number: int, record: Any) -> Result:
+    """
+    Process one input record and return its result record.
+
+    A record is a JSON object with an ``input`` string and optionally a
+    ``history`` list and an ``id`` that is copied to the result. Failures are
+    returned as an ``error`` instead of an ``output``.
+    """
+    result: Result = {"line": number}
+    start = time.perf_counter()
+    try:
+        if isinstance(record, Exception):
+            raise ValueError(f"Invalid JSON: {record}")
+        if not isinstance(record, dict) or not isinstance(record.get("input"), str):
+            raise ValueError("Record must be an object with an 'input' string")
+        if "id" in record:
+            result["id"] = record["id"]
+        result["input"] = record["input"]
+        output = processor.process_chat(
+            ChatInput(input=record["input"], history=record.get("history"))
+        )
+        result["output"] = output["output"]
+    except Exception as e:
+        result["error"] = str(e)
+    result["latency_ms"] = round((time.perf_counter() - start) * 1000, 3)
+    return result
+
+
+class BatchStats:
+    """Counts of a batch run and its throughput"""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.completed = 0
+        self.errors = 0
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Completed records per second"""
+        elapsed = self.elapsed
+        return self.completed / elapsed if elapsed > 0 else 0.0
+
+
+def run_batch(
+    processor: OrchaelChatProcessor,
+    lines: Iterable[str],
+    out: IO[str],
+    concurrency: int = 8,
+    ordered: bool = False,
+    progress: Optional[Callable[[BatchStats], None]] = None,
+) -> BatchStats:
+    """
+    Process JSONL input records and write a JSONL result for each.
+
+    Records are read lazily and processed on ``concurrency`` threads. At most
+    twice that many records are read but not yet written, so memory stays
+    bounded however long the input is. Results are written as they complete,
+    or in input order when ``ordered`` is set, and ``progress`` is called
+    after each one.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+
+    stats = BatchStats()
+    window = concurrency * 2
+    records = read_records(lines)
+    running: Set["Future[Result]"] = set()
+    # Finished results waiting for earlier ones when ordered
+    finished: Dict[int, Result] = {}
+    next_index = 0
+    submitted = 0
+
+    def write(result: Result) -> None:
+        out.write(json.dumps(result) + "\n")
+        stats.completed += 1
+        if "error" in result:
+            stats.errors += 1
+        if progress is not None:
+            progress(stats)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        indexes: Dict["Future[Result]", int] = {}
+        exhausted = False
+        while True:
+            while not exhausted and submitted - stats.completed < window:
+                item = next(records, None)
+                if item is None:
+                    exhausted = True
+                    break
+                future = pool.submit(process_record, processor, *item)
+                indexes[future] = submitted
+                running.add(future)
+                submitted += 1
+
+            if not running:
+                break
+
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                index = indexes.pop(future)
+                if ordered:
+                    finished[index] = future.result()
+                else:
+                    write(future.result())
+            while next_index in finished:
+                write(finished.pop(next_index))
+                next_index += 1
+
+    out.flush()
+    return stats
@@ -0,0 +1,103 @@
+"""
+Dynamic micro-batching of concurrent chat requests for Orchael SDK
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from .chat_types import ChatInput, ChatOutput
+
+BatchFunction = Callable[[List[ChatInput]], Awaitable[List[ChatOutput]]]
+
+
+class MicroBatcher:
+    """
+    Coalesce concurrent single chat requests into batch calls.
+
+    Requests submitted while a batch is filling are queued until either
+    ``max_batch_size`` inputs are waiting or ``max_wait_ms`` has passed since the
+    first of them arrived. The queued inputs are then handed to the batch
+    function in one call and every caller receives its own output.
+
+    The batcher must only be used from a single event loop.
+    """
+
+    def __init__(
+        self,
+        process_batch: BatchFunction,
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must not be negative")
+
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self._process_batch = process_batch
+        self._pending: List[Tuple[ChatInput, "asyncio.Future[ChatOutput]"]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+        self._batches = 0
+        self._items = 0
+
+    async def submit(self, chat_input: ChatInput) -> ChatOutput:
+        """Queue a chat input for the next batch and wait for its output"""
+        loop = asyncio.get_running_loop()
+        future: "asyncio.Future[ChatOutput]" = loop.create_future()
+        self._pending.append((chat_input, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_ms / 1000, self.flush)
+
+        return await future
+
+    def flush(self) -> None:
+        """Send all queued inputs to the batch function now"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        if not self._pending:
+            return
+
+        batch, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._run(batch))
+        # Keep a reference so the task is not garbage collected mid-flight
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, float]:
+        """Return the number of batches flushed and their mean size"""
+        return {
+            "batches": self._batches,
+            "items": self._items,
+            "mean_batch_size": self._items / self._batches if self._batches else 0.0,
+            "pending": len(self._pending),
+        }
+
+    async def _run(
+        self, batch: List[Tuple[ChatInput, "asyncio.Future[ChatOutput]"]]
+    ) -> None:
+        self._batches += 1
+        self._items += len(batch)
+        try:
+            results = await self._process_batch([chat_input for chat_input, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"process_batch returned {len(results)} outputs "
+                    f"for {len(batch)} inputs"
+                )
+        except Exception as e:
+            for _, future in batch:
+                # Callers that gave up (e.g. disconnected clients) are skipped
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
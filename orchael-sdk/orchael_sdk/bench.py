@@ -0,0 +1,204 @@
+"""
+Load generation for Orchael SDK processors and servers
+"""
+
+import json
+import math
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Any, Callable, Dict, List, Optional
+
+from .chat_types import ChatHistoryEntry, ChatInput
+from .orchael_chat_processor import OrchaelChatProcessor
+
+# Sends one request and returns when its first chunk arrived when streaming
+Target = Callable[[ChatInput], Optional[float]]
+
+
+def synthetic_history(turns: int) -> List[ChatHistoryEntry]:
+    """Build a history of ``turns`` numbered turns"""
+    return [
+        {"input": f"Benchmark question {i + 1}", "output": f"Benchmark answer {i + 1}"}
+        for i in range(turns)
+    ]
+
+
+def percentile(ordered: List[float], quantile: float) -> float:
+    """Return the nearest-rank quantile of sorted values"""
+    index = math.ceil(quantile * len(ordered)) - 1
+    return ordered[max(index, 0)]
+
+
+def processor_target(processor: OrchaelChatProcessor, stream: bool = False) -> Target:
+    """Send requests to a processor in this process"""
+
+    def send(chat_input: ChatInput) -> Optional[float]:
+        if not stream:
+            processor.process_chat(chat_input)
+            return None
+        first_chunk: Optional[float] = None
+        for _ in processor.stream_chat(chat_input):
+            if first_chunk is None:
+                first_chunk = time.perf_counter()
+        return first_chunk
+
+    return send
+
+
+def http_target(url: str, stream: bool = False, timeout: float = 60.0) -> Target:
+    """Send requests to the /chat or /chat/stream endpoint of a running server"""
+    endpoint = url.rstrip("/") + ("/chat/stream" if stream else "/chat")
+
+    def send(chat_input: ChatInput) -> Optional[float]:
+        body = {"input": chat_input["input"], "history": chat_input["history"] or []}
+        request = urllib.request.Request(
+            endpoint,
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=timeout) as response:
+                if not stream:
+                    response.read()
+                    return None
+                return _read_events(response)
+        except urllib.error.HTTPError as e:
+            raise RuntimeError(f"HTTP {e.code}: {e.read().decode(errors='replace')}")
+
+    return send
+
+
+def _read_events(response: Any) -> Optional[float]:
+    """Read a Server-Sent Events stream, returning when its first chunk arrived"""
+    first_chunk: Optional[float] = None
+    event = None
+    for raw in response:
+        line = raw.decode().rstrip("\r\n")
+        if line.startswith("event:"):
+            event = line[len("event:") :].strip()
+        elif line.startswith("data:"):
+            if event == "error":
+                raise RuntimeError(json.loads(line[len("data:") :])["error"])
+            if event is None and first_chunk is None:
+                first_chunk = time.perf_counter()
+        elif not line:
+            event = None
+    return first_chunk
+
+
+class BenchResult:
+    """Latencies and errors collected during a benchmark run"""
+
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.first_chunks: List[float] = []
+        self.errors = 0
+        self.error_samples: List[str] = []
+        self.elapsed = 0.0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.errors
+
+    def report(self) -> Dict[str, Any]:
+        """Summarize the run as a JSON-serializable dict"""
+        requests = self.requests
+        report: Dict[str, Any] = {
+            "requests": requests,
+            "errors": self.errors,
+            "error_rate": self.errors / requests if requests else 0.0,
+            "duration_s": self.elapsed,
+            "throughput_rps": (
+                len(self.latencies) / self.elapsed if self.elapsed else 0.0
+            ),
+            "latency_ms": latency_summary(self.latencies),
+        }
+        if self.first_chunks:
+            report["first_chunk_ms"] = latency_summary(self.first_chunks)
+        if self.error_samples:
+            report["error_samples"] = self.error_samples
+        return report
+
+
+def latency_summary(seconds: List[float]) -> Optional[Dict[str, float]]:
+    """Return the mean, p50, p95, p99 and max of durations in milliseconds"""
+    if not seconds:
+        return None
+    ordered = sorted(seconds)
+    summary = {"mean": sum(ordered) / len(ordered)}
+    for name, quantile in (("p50", 0.5), ("p95", 0.95), ("p99", 0.99)):
+        summary[name] = percentile(ordered, quantile)
+    summary["max"] = ordered[-1]
+    return {name: round(value * 1000, 3) for name, value in summary.items()}
+
+
+def run_bench(
+    target: Target,
+    chat_input: ChatInput,
+    concurrency: int = 8,
+    duration: float = 10.0,
+    rate: Optional[float] = None,
+    max_error_samples: int = 5,
+) -> BenchResult:
+    """
+    Send requests to a target from ``concurrency`` threads for ``duration`` seconds.
+
+    Without a ``rate`` every thread sends its next request as soon as the last
+    one completes. With a ``rate`` in requests per second, requests are sent
+    on a fixed schedule instead, and latencies and times to first chunk count
+    from when a request was due, so time spent waiting for a free thread is
+    included rather than hidden.
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if duration <= 0 or (rate is not None and rate <= 0):
+        raise ValueError("duration and rate must be positive")
+
+    result = BenchResult()
+    lock = threading.Lock()
+    start = time.perf_counter()
+    end = start + duration
+    scheduled = 0
+
+    def next_due() -> Optional[float]:
+        nonlocal scheduled
+        now = time.perf_counter()
+        if rate is None:
+            return now if now < end else None
+        with lock:
+            due = start + scheduled / rate
+            scheduled += 1
+        if due >= end:
+            return None
+        if due > now:
+            time.sleep(due - now)
+        return due
+
+    def worker() -> None:
+        while True:
+            due = next_due()
+            if due is None:
+                return
+            try:
+                first_chunk = target(chat_input)
+            except Exception as e:
+                with lock:
+                    result.errors += 1
+                    if len(result.error_samples) < max_error_samples:
+                        result.error_samples.append(str(e))
+                continue
+            latency = time.perf_counter() - due
+            with lock:
+                result.latencies.append(latency)
+                if first_chunk is not None:
+                    result.first_chunks.append(first_chunk - due)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    result.elapsed = time.perf_counter() - start
+    return result
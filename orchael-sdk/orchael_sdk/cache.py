@@ -0,0 +1,126 @@
+"""
+Response cache for Orchael SDK chat processing
+"""
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .chat_types import ChatInput, ChatOutput
+
+
+def cache_key(
+    processor_class: str, env: Optional[Dict[str, Any]], chat_input: ChatInput
+) -> str:
+    """
+    Return a stable digest identifying a chat request.
+
+    The digest covers the processor class, the config env the processor was
+    created with, the input and the history, so the same prompt sent to a
+    differently configured processor never shares an entry.
+    """
+    payload = json.dumps(
+        [processor_class, env or {}, chat_input["input"], chat_input.get("history")],
+        sort_keys=True,
+        separators=(",", ":"),
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def output_size(output: ChatOutput) -> int:
+    """Approximate the memory used by a cached output as its character count"""
+    return len(output["input"]) + len(output["output"])
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of chat outputs with TTL expiry.
+
+    Entries expire ``ttl_seconds`` after being stored and the least recently
+    used entries are evicted once ``max_entries`` or ``max_bytes`` is exceeded.
+    Hits and misses are counted for monitoring.
+
+    The cache is not thread-safe; the server only uses it from the event loop.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: Optional[float] = 300,
+        max_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries: "OrderedDict[str, Tuple[ChatOutput, int, float]]" = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[ChatOutput]:
+        """Return the cached output for a key, or None on a miss"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        output, size, expires_at = entry
+        if self._clock() >= expires_at:
+            self._remove(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return output
+
+    def set(self, key: str, output: ChatOutput) -> None:
+        """Store an output, evicting the least recently used entries if needed"""
+        size = output_size(output)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+
+        expires_at = (
+            self._clock() + self.ttl_seconds
+            if self.ttl_seconds is not None
+            else float("inf")
+        )
+        self._entries[key] = (output, size, expires_at)
+        self._size += size
+
+        while len(self._entries) > self.max_entries or (
+            self.max_bytes is not None and self._size > self.max_bytes
+        ):
+            self._remove(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """Remove every entry, keeping the hit and miss counters"""
+        self._entries.clear()
+        self._size = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters and the cache's current size"""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._entries),
+            "bytes": self._size,
+        }
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._size -= size
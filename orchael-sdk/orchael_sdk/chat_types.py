@@ -31,3 +31,11 @@ class ChatError(TypedDict):
 
 # Union type for all possible response types
 ChatResponse = Union[ChatOutput, ChatError]
+
+
+class ChatHistoryPage(TypedDict):
+    """Represents one page of the chat history"""
+
+    history: List[ChatHistoryEntry]
+    # Cursor of the next page, or None when this page reaches the newest entry
+    next_cursor: Optional[int]
@@ -6,27 +6,26 @@ CLI for Orchael SDK
 import importlib
 import os
 import sys
-import zipfile
-import tempfile
-import shutil
-from typing import Type, Dict, Any, cast
+import time
+from typing import TYPE_CHECKING, Type, Dict, Any, List, Optional, cast
 
 import click
 
-try:
-    import yaml
-except ImportError:
-    click.echo("Error: PyYAML is required. Install with: pip install PyYAML", err=True)
-    sys.exit(1)
-
-from .orchael_chat_processor import OrchaelChatProcessor
-from .chat_types import ChatInput
+# Everything else is imported by the commands that use it, so that `--help`
+# and `build` do not pay for YAML parsing, asyncio, the history stores or the
+# benchmarking and profiling tools. tests/test_cli_startup.py enforces this.
+if TYPE_CHECKING:
+    from .batch_runner import BatchStats
+    from .chat_types import ChatHistoryEntry
+    from .orchael_chat_processor import OrchaelChatProcessor
 
 
 def load_processor_class(
     class_path: str, config_file: str
-) -> Type[OrchaelChatProcessor]:
+) -> Type["OrchaelChatProcessor"]:
     """Dynamically load a processor class from a string path like 'module.ClassName'"""
+    from .orchael_chat_processor import OrchaelChatProcessor
+
     try:
         # Add the config file's directory to Python path to enable relative imports
         config_dir = os.path.dirname(os.path.abspath(config_file))
@@ -54,6 +53,14 @@ def load_processor_class(
 
 def load_config(config_file: str) -> Dict[str, Any]:
     """Load configuration from YAML file"""
+    try:
+        import yaml
+    except ImportError:
+        click.echo(
+            "Error: PyYAML is required. Install with: pip install PyYAML", err=True
+        )
+        sys.exit(1)
+
     try:
         with open(config_file, "r") as f:
             config = yaml.safe_load(f)
@@ -164,6 +171,8 @@ def _validate_nodejs_version(version: str) -> bool:
 
 def _copy_tree_excluding_cache(src: str, dst: str) -> None:
     """Copy a directory tree excluding __pycache__ directories and Python cache files"""
+    import shutil
+
     if not os.path.exists(dst):
         os.makedirs(dst)
 
@@ -189,6 +198,10 @@ def create_agent_package(
     config_file: str, output_file: str, include_dependencies: bool = True
 ) -> None:
     """Create a ZIP package for uploading to the backend"""
+    import shutil
+    import tempfile
+    import zipfile
+
     try:
         # Check if output file already exists and warn user
         if os.path.exists(output_file):
@@ -304,6 +317,26 @@ def build(config: str, output: str, no_deps: bool) -> None:
     create_agent_package(config, output, include_dependencies=not no_deps)
 
 
+def create_processor(
+    processor_class: Type["OrchaelChatProcessor"], config: Dict[str, Any]
+) -> "OrchaelChatProcessor":
+    """Instantiate a processor with the history store, hedging and middleware from config"""
+    from .hedging import apply_hedging
+    from .history_store import create_history_store
+    from .middleware import apply_middleware
+
+    try:
+        processor = processor_class()
+        history_settings = config.get("history")
+        if isinstance(history_settings, dict):
+            processor.history_store = create_history_store(history_settings)
+        processor = apply_hedging(processor, config.get("hedging"))
+        return apply_middleware(processor, config.get("middleware"))
+    except Exception as e:
+        click.echo(f"Error creating processor instance: {e}", err=True)
+        sys.exit(1)
+
+
 @cli.command()
 @click.option(
     "--config",
@@ -315,8 +348,52 @@ def build(config: str, output: str, no_deps: bool) -> None:
     "--input", "-i", help="Input text to process (required unless --history is used)"
 )
 @click.option("--history", is_flag=True, help="Show chat history")
-def chat(config: str, input: str, history: bool) -> None:
+@click.option(
+    "--repl",
+    is_flag=True,
+    help="Chat interactively, loading the processor once and keeping history",
+)
+@click.option(
+    "--batch",
+    type=click.Path(allow_dash=True, dir_okay=False),
+    help="Process every JSONL record in a file ('-' for stdin)",
+)
+@click.option(
+    "--out",
+    type=click.Path(allow_dash=True, dir_okay=False),
+    default="-",
+    help="File to write --batch results to (default: stdout)",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=8,
+    help="Records processed at once with --batch (default: 8)",
+)
+@click.option(
+    "--ordered",
+    is_flag=True,
+    help="Write --batch results in input order instead of as they complete",
+)
+def chat(
+    config: str,
+    input: str,
+    history: bool,
+    repl: bool,
+    batch: Optional[str],
+    out: str,
+    concurrency: int,
+    ordered: bool,
+) -> None:
     """Process chat input or show history"""
+    if sum(map(bool, (input or history, repl, batch))) > 1:
+        click.echo(
+            "Error: --repl, --batch and --input or --history cannot be combined",
+            err=True,
+        )
+        sys.exit(1)
+
+    start = time.perf_counter()
 
     # Load configuration
     config_data = load_config(config)
@@ -327,22 +404,38 @@ def chat(config: str, input: str, history: bool) -> None:
 
     # Load processor class
     processor_class = load_processor_class(processor_class_path, config)
+    loaded = time.perf_counter()
 
     # Create processor instance
+    processor = create_processor(processor_class, config_data)
+    created = time.perf_counter()
+
     try:
-        processor = processor_class()
-    except Exception as e:
-        click.echo(f"Error creating processor instance: {e}", err=True)
-        sys.exit(1)
+        if repl:
+            click.echo(
+                f"Loaded {processor_class_path} in {_ms(created - start)} "
+                f"(import {_ms(loaded - start)}, init {_ms(created - loaded)})"
+            )
+            run_repl(processor)
+        elif batch:
+            run_batch_files(processor, batch, out, concurrency, ordered)
+        else:
+            run_chat(processor, input, history)
+    finally:
+        # Persistent stores write history in the background
+        if processor.history_store is not None:
+            processor.history_store.close()
+
+
+def run_chat(processor: "OrchaelChatProcessor", input: str, history: bool) -> None:
+    """Show the processor's history or process a single chat input"""
+    from .chat_types import ChatInput
 
     # Show history if requested
     if history:
         history_entries = processor.get_history()
         click.echo("Chat History:")
-        for i, entry in enumerate(history_entries):
-            click.echo(f"{i+1}. Input: {entry['input']}")
-            click.echo(f"   Output: {entry['output']}")
-            click.echo()
+        _echo_history(history_entries)
         return
 
     # Check if input is provided
@@ -362,6 +455,394 @@ def chat(config: str, input: str, history: bool) -> None:
         sys.exit(1)
 
 
+def run_batch_files(
+    processor: "OrchaelChatProcessor",
+    input_file: str,
+    output_file: str,
+    concurrency: int,
+    ordered: bool,
+) -> None:
+    """Process a JSONL input file into a JSONL results file, reporting progress"""
+    from .batch_runner import run_batch
+
+    interactive = sys.stderr.isatty()
+    last_report = 0.0
+
+    def report(stats: "BatchStats") -> None:
+        nonlocal last_report
+        # Redraw the progress line at most a few times a second
+        if interactive and stats.elapsed - last_report >= 0.2:
+            last_report = stats.elapsed
+            click.echo(f"\r{_batch_summary(stats)}", nl=False, err=True)
+
+    try:
+        with click.open_file(input_file, "r", encoding="utf-8") as lines:
+            with click.open_file(output_file, "w", encoding="utf-8") as out:
+                stats = run_batch(
+                    processor,
+                    lines,
+                    out,
+                    concurrency=concurrency,
+                    ordered=ordered,
+                    progress=report,
+                )
+    except OSError as e:
+        click.echo(f"Error running batch: {e}", err=True)
+        sys.exit(1)
+
+    if interactive:
+        click.echo(err=True)
+    click.echo(f"{_batch_summary(stats)} in {stats.elapsed:.1f} s", err=True)
+
+
+def _batch_summary(stats: "BatchStats") -> str:
+    """Describe how many records a batch run processed and how fast"""
+    return (
+        f"Processed {stats.completed} records ({stats.errors} errors), "
+        f"{stats.throughput:.1f} records/s"
+    )
+
+
+REPL_HELP = """Commands:
+  /history  Show the conversation so far
+  /reset    Start a new conversation
+  /stats    Show turn latencies
+  /exit     Quit (or press Ctrl+D)"""
+
+
+def run_repl(processor: "OrchaelChatProcessor") -> None:
+    """
+    Chat with a processor until the input ends.
+
+    The conversation is kept in memory and sent as the history of every turn.
+    Each turn's latency is shown after its output; a failing turn is reported
+    and left out of the history.
+    """
+    click.echo("Type /help for commands, /exit or Ctrl+D to quit")
+    from .chat_types import ChatInput
+
+    conversation: List["ChatHistoryEntry"] = []
+    latencies: List[float] = []
+
+    while True:
+        try:
+            line = input("> ").strip()
+        except EOFError:
+            click.echo()
+            break
+        except KeyboardInterrupt:
+            click.echo()
+            continue
+
+        if not line:
+            continue
+        if line in ("/exit", "/quit"):
+            break
+        if line == "/help":
+            click.echo(REPL_HELP)
+        elif line == "/history":
+            _echo_history(conversation)
+        elif line == "/reset":
+            conversation.clear()
+            click.echo("Conversation cleared")
+        elif line == "/stats" and not latencies:
+            click.echo("No turns yet")
+        elif line == "/stats":
+            _echo_latencies(latencies)
+        elif line.startswith("/"):
+            click.echo(f"Unknown command {line}, type /help for commands", err=True)
+        else:
+            start = time.perf_counter()
+            try:
+                result = processor.process_chat(
+                    ChatInput(input=line, history=list(conversation))
+                )
+            except Exception as e:
+                click.echo(f"Error processing chat: {e}", err=True)
+                continue
+            latency = time.perf_counter() - start
+            latencies.append(latency)
+            conversation.append({"input": line, "output": result["output"]})
+            click.echo(result["output"])
+            click.echo(f"({_ms(latency)})")
+
+    if latencies:
+        _echo_latencies(latencies)
+
+
+def _echo_history(entries: List["ChatHistoryEntry"]) -> None:
+    """Print numbered history entries"""
+    for i, entry in enumerate(entries):
+        click.echo(f"{i+1}. Input: {entry['input']}")
+        click.echo(f"   Output: {entry['output']}")
+        click.echo()
+
+
+def _echo_latencies(latencies: List[float]) -> None:
+    """Print the number of turns and their mean, median and slowest latency"""
+    ordered = sorted(latencies)
+    click.echo(
+        f"{len(ordered)} turns: mean {_ms(sum(ordered) / len(ordered))}, "
+        f"p50 {_ms(ordered[(len(ordered) - 1) // 2])}, max {_ms(ordered[-1])}"
+    )
+
+
+def _ms(seconds: float) -> str:
+    """Format a duration in seconds as milliseconds"""
+    return f"{seconds * 1000:.1f} ms"
+
+
+@cli.command()
+@click.option(
+    "--config",
+    "-c",
+    default="config.yaml",
+    help="Path to YAML configuration file (default: config.yaml)",
+)
+@click.option(
+    "--url",
+    help="Benchmark a running server at this URL instead of an in-process processor",
+)
+@click.option(
+    "--concurrency",
+    type=click.IntRange(min=1),
+    default=8,
+    help="Requests in flight at once (default: 8)",
+)
+@click.option(
+    "--rate",
+    type=click.FloatRange(min=0, min_open=True),
+    default=None,
+    help="Requests per second to send (default: as fast as possible)",
+)
+@click.option(
+    "--duration",
+    type=click.FloatRange(min=0, min_open=True),
+    default=10.0,
+    help="Seconds to send requests for (default: 10)",
+)
+@click.option(
+    "--history-turns",
+    type=click.IntRange(min=0),
+    default=0,
+    help="Turns of history sent with every request (default: 0)",
+)
+@click.option(
+    "--input",
+    "-i",
+    default="Hello",
+    help="Input text of every request (default: Hello)",
+)
+@click.option("--stream", is_flag=True, help="Stream outputs and time the first chunk")
+@click.option("--json", "as_json", is_flag=True, help="Print the report as JSON")
+def bench(
+    config: str,
+    url: Optional[str],
+    concurrency: int,
+    rate: Optional[float],
+    duration: float,
+    history_turns: int,
+    input: str,
+    stream: bool,
+    as_json: bool,
+) -> None:
+    """Measure throughput and latency of a processor or a running server"""
+    import json
+
+    from .bench import http_target, processor_target, run_bench, synthetic_history
+    from .chat_types import ChatInput
+
+    processor: Optional["OrchaelChatProcessor"] = None
+    if url:
+        target = http_target(url, stream)
+    else:
+        start = time.perf_counter()
+        config_data = load_config(config)
+        set_env_vars_from_config(config_data)
+        processor_class = load_processor_class(config_data["processor_class"], config)
+        processor = create_processor(processor_class, config_data)
+        processor.warmup()
+        if not as_json:
+            click.echo(
+                f"Loaded {config_data['processor_class']} "
+                f"in {_ms(time.perf_counter() - start)}"
+            )
+        target = processor_target(processor, stream)
+
+    if not as_json:
+        click.echo(
+            f"Sending requests to {url or 'the processor'} for {duration:g} s "
+            f"from {concurrency} threads" + (f" at {rate:g} requests/s" if rate else "")
+        )
+    chat_input = ChatInput(input=input, history=synthetic_history(history_turns))
+    try:
+        result = run_bench(target, chat_input, concurrency, duration, rate)
+    finally:
+        if processor is not None and processor.history_store is not None:
+            processor.history_store.close()
+
+    report = {
+        "target": url or config,
+        "concurrency": concurrency,
+        "rate": rate,
+        "history_turns": history_turns,
+        "stream": stream,
+        **result.report(),
+    }
+    if as_json:
+        click.echo(json.dumps(report, indent=2))
+    else:
+        _echo_bench_report(report)
+
+
+def _echo_bench_report(report: Dict[str, Any]) -> None:
+    """Print a benchmark report as text"""
+    click.echo(
+        f"Requests: {report['requests']} in {report['duration_s']:.1f} s, "
+        f"{report['throughput_rps']:.1f} requests/s"
+    )
+    click.echo(f"Errors: {report['errors']} ({report['error_rate']:.1%})")
+    for sample in report.get("error_samples", []):
+        click.echo(f"  {sample}")
+    for key, label in (("latency_ms", "Latency"), ("first_chunk_ms", "First chunk")):
+        summary = report.get(key)
+        if summary:
+            click.echo(
+                f"{label} (ms): "
+                + ", ".join(f"{name} {value:.1f}" for name, value in summary.items())
+            )
+
+
+@cli.command()
+@click.option(
+    "--config",
+    "-c",
+    default="config.yaml",
+    help="Path to YAML configuration file (default: config.yaml)",
+)
+@click.option(
+    "--workload",
+    "-w",
+    required=True,
+    type=click.Path(allow_dash=True, dir_okay=False),
+    help="JSONL file of inputs to process, as for chat --batch",
+)
+@click.option(
+    "--collapsed",
+    type=click.Path(dir_okay=False, writable=True),
+    default="profile.collapsed",
+    help="File to write collapsed stacks to (default: profile.collapsed)",
+)
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0, min_open=True),
+    default=5.0,
+    help="Milliseconds between CPU samples (default: 5)",
+)
+@click.option(
+    "--top",
+    type=click.IntRange(min=1),
+    default=10,
+    help="Number of allocation sites to report (default: 10)",
+)
+@click.option(
+    "--no-memory",
+    is_flag=True,
+    help="Skip allocation tracing, which slows the processor down",
+)
+def profile(
+    config: str,
+    workload: str,
+    collapsed: str,
+    interval: float,
+    top: int,
+    no_memory: bool,
+) -> None:
+    """Profile CPU time and allocations of a processor over a workload"""
+    import tracemalloc
+
+    from .batch_runner import process_record, read_records
+    from .bench import latency_summary
+    from .profiling import StackSampler, top_allocations
+
+    if not no_memory:
+        tracemalloc.start()
+    sampler = StackSampler(interval / 1000)
+    sampler.phase = "import"
+    sampler.start()
+    processor: Optional["OrchaelChatProcessor"] = None
+    startup: Optional[tracemalloc.Snapshot] = None
+    finished: Optional[tracemalloc.Snapshot] = None
+    try:
+        start = time.perf_counter()
+        config_data = load_config(config)
+        set_env_vars_from_config(config_data)
+        processor_class = load_processor_class(config_data["processor_class"], config)
+        imported = time.perf_counter()
+
+        sampler.phase = "init"
+        processor = create_processor(processor_class, config_data)
+        processor.warmup()
+        initialized = time.perf_counter()
+        if not no_memory:
+            startup = tracemalloc.take_snapshot()
+
+        sampler.phase = "request"
+        latencies: List[float] = []
+        errors = 0
+        try:
+            with click.open_file(workload, "r", encoding="utf-8") as lines:
+                for number, record in read_records(lines):
+                    result = process_record(processor, number, record)
+                    latencies.append(result["latency_ms"] / 1000)
+                    errors += "error" in result
+        except OSError as e:
+            click.echo(f"Error reading workload: {e}", err=True)
+            sys.exit(1)
+        processed = time.perf_counter()
+        if not no_memory:
+            finished = tracemalloc.take_snapshot()
+    finally:
+        sampler.stop()
+        tracemalloc.stop()
+        if processor is not None and processor.history_store is not None:
+            processor.history_store.close()
+
+    with open(collapsed, "w", encoding="utf-8") as f:
+        f.writelines(line + "\n" for line in sampler.collapsed())
+
+    click.echo(f"Import: {_ms(imported - start)}")
+    click.echo(f"Init: {_ms(initialized - imported)}")
+    click.echo(
+        f"Requests: {len(latencies)} ({errors} errors) in {_ms(processed - initialized)}"
+    )
+    summary = latency_summary(latencies)
+    if summary:
+        click.echo(
+            "Request latency (ms): "
+            + ", ".join(f"{name} {value:.1f}" for name, value in summary.items())
+        )
+    click.echo(
+        "CPU samples: "
+        + ", ".join(f"{phase} {count}" for phase, count in sampler.samples.items())
+        + f", running threads only, written to {collapsed}"
+    )
+    if startup is not None and finished is not None:
+        click.echo("Top allocations during import and init:")
+        _echo_allocations(top_allocations(startup, limit=top))
+        click.echo("Top allocations during requests, still in use at the end:")
+        _echo_allocations(top_allocations(finished, startup, limit=top))
+
+
+def _echo_allocations(allocations: List[Dict[str, Any]]) -> None:
+    """Print allocation sites with their size and block count"""
+    for allocation in allocations:
+        click.echo(
+            f"  {allocation['size'] / 1024:10.1f} KiB {allocation['count']:8d} blocks"
+            f"  {allocation['location']}"
+        )
+
+
 @cli.command()
 @click.option(
     "--host", "-h", default="0.0.0.0", help="Host to bind to (default: 0.0.0.0)"
@@ -375,7 +856,22 @@ def chat(config: str, input: str, history: bool) -> None:
     default="config.yaml",
     help="Path to YAML configuration file (default: config.yaml)",
 )
-def server(host: str, port: int, config: str) -> None:
+@click.option(
+    "--max-workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Threads used for synchronous processor calls (default: config or 8)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Worker processes sharing a preloaded processor (default: 1)",
+)
+def server(
+    host: str, port: int, config: str, max_workers: Optional[int], workers: int
+) -> None:
     """Run the Orchael SDK FastAPI server"""
 
     # Check if config file exists
@@ -389,12 +885,20 @@ def server(host: str, port: int, config: str) -> None:
 
     click.echo(f"Starting Orchael SDK server on {host}:{port}")
     click.echo(f"Using config file: {config}")
+    if workers > 1:
+        click.echo(f"Running {workers} worker processes")
     click.echo("Press Ctrl+C to stop the server")
 
     try:
         from .server import run_server
 
-        run_server(host=host, port=port, config_file=config)
+        run_server(
+            host=host,
+            port=port,
+            config_file=config,
+            max_workers=max_workers,
+            workers=workers,
+        )
     except KeyboardInterrupt:
         click.echo("\nServer stopped by user")
     except Exception as e:
@@ -0,0 +1,194 @@
+"""
+Incremental history compaction for Orchael SDK processors
+"""
+
+import asyncio
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from .chat_types import ChatHistoryEntry, ChatInput
+from .context import ContextWindow
+from .orchael_chat_processor import OrchaelChatProcessor
+
+# Folds turns into a running summary: (summary so far, new turns) -> summary
+Summarizer = Callable[[str, List[ChatHistoryEntry]], str]
+
+# Identifies a block of turns: the previous block's digest and the entry ids
+BlockKey = Tuple[bytes, Tuple[int, ...]]
+
+# Input of the history entry that carries the summary to the model
+SUMMARY_INPUT = "Summarize our conversation so far."
+
+DEFAULT_SUMMARY_PROMPT = (
+    "Update the summary of a conversation with its latest turns. Keep the "
+    "facts, decisions and open questions needed to continue the conversation "
+    "and reply with the updated summary only.\n\n"
+    "Summary so far:\n{summary}\n\nLatest turns:\n{turns}"
+)
+
+
+class ProcessorSummarizer:
+    """
+    Summarizer that asks a chat processor to update the summary.
+
+    Use a separate processor instance from the one answering the conversation,
+    since processors record the turns they process in their history.
+    """
+
+    def __init__(
+        self, processor: OrchaelChatProcessor, prompt: str = DEFAULT_SUMMARY_PROMPT
+    ) -> None:
+        self.processor = processor
+        self.prompt = prompt
+
+    def __call__(self, summary: str, turns: List[ChatHistoryEntry]) -> str:
+        lines = []
+        for turn in turns:
+            lines.append(f"User: {turn['input']}")
+            lines.append(f"Assistant: {turn['output']}")
+        chat_input = ChatInput(
+            input=self.prompt.format(
+                summary=summary or "(none)", turns="\n".join(lines)
+            ),
+            history=[],
+        )
+        return self.processor.process_chat(chat_input)["output"].strip()
+
+
+class Compactor:
+    """
+    Roll older turns of a conversation into a running summary.
+
+    All but the most recent ``keep_turns`` turns are compacted, in blocks of
+    ``every`` turns, so the summary changes once every ``every`` turns. Each
+    update folds only the next block into the previous summary, which is looked
+    up by a digest of the turns it covers, so a growing conversation never
+    summarizes the same turns twice. The summary is prepended to the remaining
+    turns as a history entry, and ``window`` can further trim those turns to a
+    token budget.
+
+    Summaries are kept for the ``cache_size`` most recently used conversation
+    prefixes. The digest of each block is remembered too, by the previous
+    block's digest and the identity of its entries, so a history kept in
+    memory, like a server session's, only has its new turns hashed. Entries
+    must therefore not be changed in place once sent. The compactor is
+    thread-safe, although concurrent requests for a new block may both
+    summarize it.
+    """
+
+    def __init__(
+        self,
+        summarizer: Summarizer,
+        every: int = 8,
+        keep_turns: int = 8,
+        window: Optional[ContextWindow] = None,
+        cache_size: int = 1024,
+    ) -> None:
+        if every < 1:
+            raise ValueError("every must be at least 1")
+        if keep_turns < 0:
+            raise ValueError("keep_turns must not be negative")
+        if cache_size < 1:
+            raise ValueError("cache_size must be at least 1")
+
+        self.summarizer = summarizer
+        self.every = every
+        self.keep_turns = keep_turns
+        self.window = window
+        self.cache_size = cache_size
+        self.summaries = 0
+        self._cache: "OrderedDict[str, str]" = OrderedDict()
+        # (previous digest, entry ids) -> (entries, digest); keeping the
+        # entries alive keeps their ids from being reused
+        self._digests: "OrderedDict[BlockKey, Tuple[Tuple[Any, ...], bytes]]" = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def apply(self, chat_input: ChatInput) -> ChatInput:
+        """Return the chat input with its older history replaced by a summary"""
+        history = chat_input.get("history") or []
+        boundary, keys, done, summary = self._plan(history)
+        for end in range(done + self.every, boundary + 1, self.every):
+            summary = self.summarizer(summary, list(history[end - self.every : end]))
+            self._store(keys[end // self.every - 1], summary)
+        return self._compose(chat_input, history[boundary:], summary)
+
+    async def aapply(self, chat_input: ChatInput) -> ChatInput:
+        """Like apply, running the summarizer in a worker thread"""
+        history = chat_input.get("history") or []
+        boundary, keys, done, summary = self._plan(history)
+        for end in range(done + self.every, boundary + 1, self.every):
+            summary = await asyncio.to_thread(
+                self.summarizer, summary, list(history[end - self.every : end])
+            )
+            self._store(keys[end // self.every - 1], summary)
+        return self._compose(chat_input, history[boundary:], summary)
+
+    def _plan(
+        self, history: Sequence[ChatHistoryEntry]
+    ) -> Tuple[int, List[str], int, str]:
+        """
+        Return how many turns to compact, the digest of each block, how many
+        turns the newest cached summary covers and that summary.
+        """
+        boundary = max(len(history) - self.keep_turns, 0)
+        boundary -= boundary % self.every
+
+        keys = []
+        digest = b""
+        for start in range(0, boundary, self.every):
+            digest = self._digest(digest, history[start : start + self.every])
+            keys.append(digest.hex())
+
+        with self._lock:
+            for index in range(len(keys) - 1, -1, -1):
+                summary = self._cache.get(keys[index])
+                if summary is not None:
+                    self._cache.move_to_end(keys[index])
+                    return boundary, keys, (index + 1) * self.every, summary
+        return boundary, keys, 0, ""
+
+    def _digest(self, previous: bytes, block: Sequence[ChatHistoryEntry]) -> bytes:
+        """Chain the digest of a block of turns onto the previous block's"""
+        key = (previous, tuple(map(id, block)))
+        with self._lock:
+            known = self._digests.get(key)
+            if known is not None:
+                self._digests.move_to_end(key)
+                return known[1]
+
+        turns = [(entry["input"], entry["output"]) for entry in block]
+        digest = hashlib.sha256(
+            previous + json.dumps(turns, separators=(",", ":")).encode("utf-8")
+        ).digest()
+        with self._lock:
+            self._digests[key] = (tuple(block), digest)
+            while len(self._digests) > self.cache_size:
+                self._digests.popitem(last=False)
+        return digest
+
+    def _store(self, key: str, summary: str) -> None:
+        with self._lock:
+            self.summaries += 1
+            self._cache[key] = summary
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def _compose(
+        self,
+        chat_input: ChatInput,
+        recent: Sequence[ChatHistoryEntry],
+        summary: str,
+    ) -> ChatInput:
+        history = list(recent)
+        if self.window is not None:
+            # The summary is sent too, so it takes its share of the budget
+            history = self.window.select(history, chat_input["input"] + summary)
+        if summary:
+            history.insert(0, {"input": SUMMARY_INPUT, "output": summary})
+        return ChatInput(input=chat_input["input"], history=history)
@@ -0,0 +1,112 @@
+"""
+Context-window management for Orchael SDK processors
+"""
+
+import math
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence
+
+from .chat_types import ChatHistoryEntry, ChatInput
+
+# Rough number of characters per token for English text
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate the number of tokens in text without a tokenizer"""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class ContextWindow:
+    """
+    Select the most recent history that fits a model's context budget.
+
+    The budget is ``max_tokens`` tokens, counted with ``count_tokens`` (by
+    default an estimate of four characters per token), and/or ``max_chars``
+    characters. The new input is counted against the budget first, then turns
+    are taken newest first until the next one would not fit. ``max_turns``
+    additionally caps the number of turns.
+
+    With a custom ``count_tokens``, the cost of each turn is cached by its
+    text, so a conversation's earlier turns are not tokenized again on every
+    request. The cache is bounded by ``cache_size`` turns and safe to use from
+    several threads. The default estimate is cheaper than a cache lookup and
+    is not cached.
+    """
+
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_chars: Optional[int] = None,
+        max_turns: Optional[int] = None,
+        count_tokens: Callable[[str], int] = estimate_tokens,
+        cache_size: int = 4096,
+    ) -> None:
+        if max_tokens is None and max_chars is None and max_turns is None:
+            raise ValueError("Set at least one of max_tokens, max_chars or max_turns")
+        for name, value in [
+            ("max_tokens", max_tokens),
+            ("max_chars", max_chars),
+            ("max_turns", max_turns),
+        ]:
+            if value is not None and value < 0:
+                raise ValueError(f"{name} must not be negative")
+
+        self.max_tokens = max_tokens
+        self.max_chars = max_chars
+        self.max_turns = max_turns
+        self.count_tokens = count_tokens
+        self._cache = (
+            None
+            if count_tokens is estimate_tokens
+            else lru_cache(maxsize=cache_size)(self._measure_turn)
+        )
+        self._turn_tokens: Callable[[str, str], int] = (
+            self._measure_turn if self._cache is None else self._cache
+        )
+
+    def select(
+        self, history: Optional[Sequence[ChatHistoryEntry]], input: str = ""
+    ) -> List[ChatHistoryEntry]:
+        """Return the newest turns of ``history`` that fit alongside ``input``"""
+        if not history:
+            return []
+
+        tokens = self.max_tokens
+        chars = self.max_chars
+        if tokens is not None and input:
+            tokens -= self.count_tokens(input)
+        if chars is not None:
+            chars -= len(input)
+
+        start = len(history)
+        limit = 0 if self.max_turns is None else len(history) - self.max_turns
+        while start > max(limit, 0):
+            entry = history[start - 1]
+            if tokens is not None:
+                tokens -= self._turn_tokens(entry["input"], entry["output"])
+                if tokens < 0:
+                    break
+            if chars is not None:
+                chars -= len(entry["input"]) + len(entry["output"])
+                if chars < 0:
+                    break
+            start -= 1
+        return list(history[start:])
+
+    def apply(self, chat_input: ChatInput) -> ChatInput:
+        """Return the chat input with its history trimmed to the budget"""
+        return ChatInput(
+            input=chat_input["input"],
+            history=self.select(chat_input.get("history"), chat_input["input"]),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Return hit/miss counters of the per-turn token cache"""
+        if self._cache is None:
+            return {"hits": 0, "misses": 0, "entries": 0}
+        info = self._cache.cache_info()
+        return {"hits": info.hits, "misses": info.misses, "entries": info.currsize}
+
+    def _measure_turn(self, input: str, output: str) -> int:
+        return self.count_tokens(input) + self.count_tokens(output)
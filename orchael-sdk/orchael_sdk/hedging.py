@@ -0,0 +1,206 @@
+"""
+Hedged requests for Orchael SDK processors
+"""
+
+import asyncio
+import itertools
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from .chat_types import ChatInput, ChatOutput
+from .middleware import load_object
+from .orchael_chat_processor import OrchaelChatProcessor, WrapperChatProcessor
+from .parallel import call_processor, cancel_tasks, first_successful, run_detached
+
+
+class LatencyTracker:
+    """
+    Quantile of the most recent latencies.
+
+    Keeps the last ``window`` observations and recomputes the quantile after
+    every ``refresh`` new ones, so reading it costs nothing per request. It is
+    None until ``min_samples`` latencies have been observed.
+    """
+
+    def __init__(
+        self,
+        quantile: float = 0.95,
+        window: int = 1000,
+        min_samples: int = 20,
+        refresh: int = 16,
+    ) -> None:
+        if not 0 < quantile <= 1:
+            raise ValueError("quantile must be in (0, 1]")
+        if window < 1 or min_samples < 1 or refresh < 1:
+            raise ValueError("window, min_samples and refresh must be at least 1")
+
+        self.quantile = quantile
+        self.min_samples = min_samples
+        self.refresh = refresh
+        self.value: Optional[float] = None
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._since_refresh = 0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        """Record a latency in seconds"""
+        with self._lock:
+            self._samples.append(seconds)
+            self._since_refresh += 1
+            if len(self._samples) < self.min_samples:
+                return
+            if self.value is None or self._since_refresh >= self.refresh:
+                ordered = sorted(self._samples)
+                index = math.ceil(self.quantile * len(ordered)) - 1
+                self.value = ordered[max(index, 0)]
+                self._since_refresh = 0
+
+
+class HedgedChatProcessor(WrapperChatProcessor):
+    """
+    Processor that sends a second request when the first one is slow.
+
+    If the wrapped processor has not answered within the ``quantile`` of its
+    recent latencies, the same input is sent again, to the next of
+    ``replicas`` or to the processor itself when there are none. Whichever
+    answers first wins and the other call is cancelled; synchronous ones finish
+    in their worker thread but their output is discarded. Errors are not
+    hedged: a failing first call fails the request.
+
+    The hedge delay is clamped to ``min_delay_ms`` and ``max_delay_ms``, and
+    nothing is hedged until ``min_samples`` latencies have been observed.
+    When the first call loses, the time it had run for is recorded as its
+    latency, so hedging does not drag the observed quantile down.
+
+    The losing call may still record its turn in its processor's history, so
+    hedging the processor onto itself can record a turn twice. Streaming and
+    batched calls are passed through without hedging.
+
+    Synchronous processors run on ``executor``, which the server sets to its
+    worker pool, or on the event loop's default executor when it is None.
+    """
+
+    # Hedging needs the async call whatever the wrapped processor implements
+    delegated_hooks = WrapperChatProcessor.delegated_hooks - {"aprocess_chat"}
+
+    executor: Optional[Executor] = None
+
+    def __init__(
+        self,
+        processor: OrchaelChatProcessor,
+        replicas: Sequence[OrchaelChatProcessor] = (),
+        quantile: float = 0.95,
+        min_delay_ms: float = 10.0,
+        max_delay_ms: Optional[float] = None,
+        window: int = 1000,
+        min_samples: int = 20,
+    ) -> None:
+        super().__init__(processor)
+        self.replicas = list(replicas)
+        self.min_delay_ms = min_delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.latency = LatencyTracker(quantile, window, min_samples)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+        self._next_replica = itertools.cycle(self.replicas or [processor])
+
+    def hedge_delay(self) -> Optional[float]:
+        """Return seconds to wait before hedging, or None while still learning"""
+        quantile = self.latency.value
+        if quantile is None:
+            return None
+        delay_ms = max(quantile * 1000, self.min_delay_ms)
+        if self.max_delay_ms is not None:
+            delay_ms = min(delay_ms, self.max_delay_ms)
+        return delay_ms / 1000
+
+    def stats(self) -> Dict[str, float]:
+        """Return request, hedge and hedge win counts and the hedge delay"""
+        delay = self.hedge_delay()
+        return {
+            "requests": self.requests,
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "delay_ms": 0.0 if delay is None else delay * 1000,
+        }
+
+    def warmup(self) -> None:
+        super().warmup()
+        for replica in self.replicas:
+            replica.warmup()
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        return run_detached(self.aprocess_chat(chat_input))
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.requests += 1
+        delay = self.hedge_delay()
+        start = time.perf_counter()
+        primary = asyncio.create_task(
+            call_processor(self.processor, chat_input, self.executor)
+        )
+
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done:
+            output = primary.result()
+            self.latency.observe(time.perf_counter() - start)
+            return output
+
+        self.hedges += 1
+        replica = next(self._next_replica)
+        tasks = [
+            primary,
+            asyncio.create_task(call_processor(replica, chat_input, self.executor)),
+        ]
+        try:
+            winner = await first_successful(tasks)
+        finally:
+            cancel_tasks(tasks)
+            self.latency.observe(time.perf_counter() - start)
+        if winner is not primary:
+            self.hedge_wins += 1
+        return winner.result()
+
+
+def apply_hedging(
+    processor: OrchaelChatProcessor, settings: Optional[Dict[str, Any]]
+) -> OrchaelChatProcessor:
+    """
+    Wrap a processor in the hedging described by a config's 'hedging' section.
+
+    ``replicas`` lists the import paths of processor classes to send hedged
+    requests to; without it they are retried on the processor itself.
+    Replicas share the processor's history store, so a turn a replica answers
+    shows up in the processor's history.
+    """
+    if not isinstance(settings, dict) or not settings.get("enabled", True):
+        return processor
+
+    replicas: List[OrchaelChatProcessor] = []
+    for path in settings.get("replicas") or []:
+        replica_class = load_object(path)
+        if not (
+            isinstance(replica_class, type)
+            and issubclass(replica_class, OrchaelChatProcessor)
+        ):
+            raise ValueError(f"Replica {path} is not an OrchaelChatProcessor subclass")
+        replica = replica_class()
+        if processor.history_store is not None:
+            replica.history_store = processor.history_store
+        replicas.append(replica)
+
+    max_delay_ms = settings.get("max_delay_ms")
+    return HedgedChatProcessor(
+        processor,
+        replicas,
+        quantile=float(settings.get("quantile", 0.95)),
+        min_delay_ms=float(settings.get("min_delay_ms", 10.0)),
+        max_delay_ms=None if max_delay_ms is None else float(max_delay_ms),
+        window=int(settings.get("window", 1000)),
+        min_samples=int(settings.get("min_samples", 20)),
+    )
@@ -0,0 +1,130 @@
+"""
+Bounded chat history for Orchael SDK processors
+"""
+
+import threading
+from collections import deque
+from itertools import islice
+from typing import Deque, Iterable, List, Optional, Sequence
+
+from .chat_types import ChatHistoryEntry, ChatHistoryPage
+
+
+def entry_size(entry: ChatHistoryEntry) -> int:
+    """Approximate the memory used by a history entry as its character count"""
+    return len(entry["input"]) + len(entry["output"])
+
+
+def check_page(cursor: int, limit: Optional[int]) -> None:
+    """Validate the cursor and limit of a history page request"""
+    if cursor < 0:
+        raise ValueError("cursor must not be negative")
+    if limit is not None and limit < 1:
+        raise ValueError("limit must be at least 1")
+
+
+def history_page(
+    entries: Sequence[ChatHistoryEntry], cursor: int = 0, limit: Optional[int] = None
+) -> ChatHistoryPage:
+    """
+    Return up to ``limit`` entries starting at position ``cursor``.
+
+    Cursors are positions counted from the oldest entry, so ``next_cursor`` of
+    one page is the ``cursor`` of the next.
+    """
+    check_page(cursor, limit)
+
+    end = len(entries) if limit is None else min(cursor + limit, len(entries))
+    return ChatHistoryPage(
+        history=list(entries[cursor:end]),
+        next_cursor=end if end < len(entries) else None,
+    )
+
+
+class HistoryBuffer:
+    """
+    Ring buffer of chat history that keeps only the most recent turns.
+
+    The oldest entries are dropped once more than ``max_entries`` are held or
+    their characters exceed ``max_bytes``, so a long-running processor uses
+    bounded memory.
+
+    Entries are addressed by their position in the full history, counting
+    dropped ones, so a cursor from :meth:`page` stays valid while new turns
+    are recorded. A cursor that points at dropped entries resumes at the oldest
+    entry still held.
+
+    The buffer is thread-safe, since the server runs synchronous processors on
+    a worker pool.
+    """
+
+    def __init__(
+        self, max_entries: Optional[int] = 1000, max_bytes: Optional[int] = None
+    ) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: Deque[ChatHistoryEntry] = deque()
+        self._size = 0
+        self._dropped = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size(self) -> int:
+        """Approximate number of characters held"""
+        return self._size
+
+    def append(self, entry: ChatHistoryEntry) -> None:
+        """Add a turn, dropping the oldest ones beyond the limits"""
+        with self._lock:
+            self._entries.append(entry)
+            self._size += entry_size(entry)
+            self._trim()
+
+    def extend(self, entries: Iterable[ChatHistoryEntry]) -> None:
+        """Add several turns in order"""
+        with self._lock:
+            for entry in entries:
+                self._entries.append(entry)
+                self._size += entry_size(entry)
+            self._trim()
+
+    def clear(self) -> None:
+        """Remove every entry"""
+        with self._lock:
+            self._dropped += len(self._entries)
+            self._entries.clear()
+            self._size = 0
+
+    def entries(self) -> List[ChatHistoryEntry]:
+        """Return a copy of the entries held, oldest first"""
+        with self._lock:
+            return list(self._entries)
+
+    def page(self, cursor: int = 0, limit: Optional[int] = None) -> ChatHistoryPage:
+        """Return up to ``limit`` entries from position ``cursor`` onwards"""
+        check_page(cursor, limit)
+
+        with self._lock:
+            start = max(cursor - self._dropped, 0)
+            stop = len(self._entries) if limit is None else start + limit
+            entries = list(islice(self._entries, start, stop))
+            end = start + len(entries)
+            return ChatHistoryPage(
+                history=entries,
+                next_cursor=(self._dropped + end if end < len(self._entries) else None),
+            )
+
+    def _trim(self) -> None:
+        # The newest entry is always kept, even if it exceeds max_bytes alone
+        while len(self._entries) > 1 and (
+            (self.max_entries is not None and len(self._entries) > self.max_entries)
+            or (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            self._size -= entry_size(self._entries.popleft())
+            self._dropped += 1
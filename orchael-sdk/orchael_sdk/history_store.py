@@ -0,0 +1,589 @@
+"""
+Pluggable chat history storage for Orchael SDK processors
+"""
+
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from itertools import islice
+from typing import IO, Any, Dict, Iterator, List, Optional, Union
+
+from .chat_types import ChatHistoryEntry, ChatHistoryPage
+from .history import HistoryBuffer, check_page
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None  # type: ignore[assignment]
+
+# Each index record is the end offset of an entry in the data file
+INDEX_RECORD = struct.Struct("<Q")
+
+# Longest the writer thread waits before retrying a batch that failed to write
+MAX_RETRY_DELAY_MS = 5000.0
+
+
+def encode_entry(entry: ChatHistoryEntry) -> bytes:
+    """Encode a history entry as one JSON line"""
+    return (
+        json.dumps({"input": entry["input"], "output": entry["output"]}).encode("utf-8")
+        + b"\n"
+    )
+
+
+@contextmanager
+def locked(f: IO[bytes]) -> Iterator[None]:
+    """Hold an exclusive lock on an open file, shared by all processes using it"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class HistoryStore(ABC):
+    """
+    Storage for a processor's chat history.
+
+    Entries are addressed by their position in the full history, oldest first,
+    and read a page at a time so long histories are never loaded whole.
+    """
+
+    @abstractmethod
+    def append(self, entry: ChatHistoryEntry) -> None:
+        """Record a completed turn"""
+        pass
+
+    @abstractmethod
+    def page(self, cursor: int = 0, limit: Optional[int] = None) -> ChatHistoryPage:
+        """Return up to ``limit`` entries from position ``cursor`` onwards"""
+        pass
+
+    def entries(self) -> List[ChatHistoryEntry]:
+        """Return every stored entry, oldest first"""
+        return self.page()["history"]
+
+    def flush(self) -> None:
+        """Write out any buffered entries. The default does nothing."""
+        pass
+
+    def close(self) -> None:
+        """Flush buffered entries and release resources"""
+        self.flush()
+
+
+class MemoryHistoryStore(HistoryStore):
+    """History kept in a bounded in-memory HistoryBuffer"""
+
+    def __init__(
+        self, max_entries: Optional[int] = 1000, max_bytes: Optional[int] = None
+    ) -> None:
+        self.buffer = HistoryBuffer(max_entries=max_entries, max_bytes=max_bytes)
+
+    def append(self, entry: ChatHistoryEntry) -> None:
+        self.buffer.append(entry)
+
+    def page(self, cursor: int = 0, limit: Optional[int] = None) -> ChatHistoryPage:
+        return self.buffer.page(cursor, limit)
+
+    def entries(self) -> List[ChatHistoryEntry]:
+        return self.buffer.entries()
+
+
+class BatchedHistoryStore(HistoryStore):
+    """
+    Base class for stores that write to disk from a background thread.
+
+    ``append`` only queues the entry, so recording history never waits on I/O.
+    A writer thread writes the queue in one batch once ``batch_size`` entries
+    are waiting or ``flush_interval_ms`` has passed. Reads flush first, so they
+    always include every appended entry.
+
+    A batch that fails to write stays queued. The writer retries it after a
+    delay that doubles with each failure, up to ``MAX_RETRY_DELAY_MS``, and
+    keeps the error in ``write_error`` until a write succeeds. Reads and
+    flushes raise the error themselves.
+
+    The writer is restarted in a forked child, which drops entries its parent
+    had queued; the parent still writes those itself.
+    """
+
+    def __init__(self, batch_size: int = 64, flush_interval_ms: float = 50.0) -> None:
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        if flush_interval_ms <= 0:
+            raise ValueError("flush_interval_ms must be positive")
+
+        self.batch_size = batch_size
+        self.flush_interval_ms = flush_interval_ms
+        self.write_error: Optional[Exception] = None
+        self._pid: Optional[int] = None
+        self._closed = False
+
+    def append(self, entry: ChatHistoryEntry) -> None:
+        self._check_process()
+        with self._queued:
+            self._pending.append(entry)
+            if len(self._pending) >= self.batch_size:
+                self._queued.notify()
+
+    def flush(self) -> None:
+        self._check_process()
+        self._write_pending()
+
+    def close(self) -> None:
+        if self._pid != os.getpid():
+            return
+        with self._queued:
+            self._closed = True
+            self._queued.notify()
+        self._writer.join()
+        self._write_pending()
+        with self._io_lock:
+            self._close()
+
+    def page(self, cursor: int = 0, limit: Optional[int] = None) -> ChatHistoryPage:
+        check_page(cursor, limit)
+        self.flush()
+        with self._io_lock:
+            return self._read(cursor, limit)
+
+    @abstractmethod
+    def _open(self) -> None:
+        """Open the underlying storage for this process"""
+        pass
+
+    @abstractmethod
+    def _write(self, entries: List[ChatHistoryEntry]) -> None:
+        """Write a batch of entries, in order"""
+        pass
+
+    @abstractmethod
+    def _read(self, cursor: int, limit: Optional[int]) -> ChatHistoryPage:
+        """Read a page of written entries"""
+        pass
+
+    def _close(self) -> None:
+        """Release the underlying storage. The default does nothing."""
+        pass
+
+    def _check_process(self) -> None:
+        """Start the writer, or restart it after a fork"""
+        if self._closed:
+            raise ValueError("History store is closed")
+        if self._pid == os.getpid():
+            return
+
+        # Locks and the thread inherited from a parent process are unusable
+        self._pid = os.getpid()
+        self._io_lock = threading.Lock()
+        self._queued = threading.Condition()
+        self._pending: List[ChatHistoryEntry] = []
+        self._open()
+        self._writer = threading.Thread(
+            target=self._run, name="orchael-history-writer", daemon=True
+        )
+        self._writer.start()
+
+    def _run(self) -> None:
+        retry_delay_ms = 0.0
+        while True:
+            with self._queued:
+                if retry_delay_ms:
+                    # A full queue would wake the writer at once, so a failing
+                    # backend only ends the wait early on close
+                    self._queued.wait_for(
+                        lambda: self._closed, timeout=retry_delay_ms / 1000
+                    )
+                else:
+                    self._queued.wait_for(
+                        lambda: self._closed or len(self._pending) >= self.batch_size,
+                        timeout=self.flush_interval_ms / 1000,
+                    )
+                if self._closed:
+                    return
+            try:
+                self._write_pending()
+            except Exception as e:
+                # The batch stays queued; the error surfaces on the next read
+                self.write_error = e
+                retry_delay_ms = min(
+                    max(retry_delay_ms * 2, self.flush_interval_ms), MAX_RETRY_DELAY_MS
+                )
+            else:
+                self.write_error = None
+                retry_delay_ms = 0.0
+
+    def _write_pending(self) -> None:
+        # Taking the I/O lock first keeps batches in append order
+        with self._io_lock:
+            with self._queued:
+                batch, self._pending = self._pending, []
+            if not batch:
+                return
+            try:
+                self._write(batch)
+            except Exception:
+                with self._queued:
+                    self._pending[:0] = batch
+                raise
+
+
+class SQLiteHistoryStore(BatchedHistoryStore):
+    """
+    History in a SQLite database in WAL mode.
+
+    WAL lets several worker processes append to and read the same database
+    concurrently. ``max_entries`` prunes the oldest rows after each batch.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_entries: Optional[int] = None,
+        batch_size: int = 64,
+        flush_interval_ms: float = 50.0,
+    ) -> None:
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        super().__init__(batch_size, flush_interval_ms)
+        self.path = path
+        self.max_entries = max_entries
+        self._check_process()
+
+    def _open(self) -> None:
+        self._connection = sqlite3.connect(
+            self.path, check_same_thread=False, isolation_level=None
+        )
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        # AUTOINCREMENT never reuses ids, so an id is the entry's position + 1
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+            "input TEXT NOT NULL, "
+            "output TEXT NOT NULL)"
+        )
+
+    def _write(self, entries: List[ChatHistoryEntry]) -> None:
+        with self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.executemany(
+                "INSERT INTO history (input, output) VALUES (?, ?)",
+                [(entry["input"], entry["output"]) for entry in entries],
+            )
+            if self.max_entries is not None:
+                self._connection.execute(
+                    "DELETE FROM history WHERE id <= "
+                    "(SELECT MAX(id) FROM history) - ?",
+                    (self.max_entries,),
+                )
+
+    def _read(self, cursor: int, limit: Optional[int]) -> ChatHistoryPage:
+        # Fetch one extra row to tell whether another page follows
+        rows = self._connection.execute(
+            "SELECT id, input, output FROM history WHERE id > ? ORDER BY id LIMIT ?",
+            (cursor, -1 if limit is None else limit + 1),
+        ).fetchall()
+        more = limit is not None and len(rows) > limit
+        rows = rows[:limit]
+        return ChatHistoryPage(
+            history=[{"input": row[1], "output": row[2]} for row in rows],
+            next_cursor=rows[-1][0] if more else None,
+        )
+
+    def _close(self) -> None:
+        self._connection.close()
+
+
+class LogHistoryStore(BatchedHistoryStore):
+    """
+    History in an append-only JSON Lines file.
+
+    Each batch is written with a single append under an exclusive file lock,
+    so several worker processes can share one file. A partial last line left
+    by a crash is cut off on open, under the same lock. Set ``fsync`` to force
+    every batch to disk before the next one is written.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync: bool = False,
+        batch_size: int = 64,
+        flush_interval_ms: float = 50.0,
+    ) -> None:
+        super().__init__(batch_size, flush_interval_ms)
+        self.path = path
+        self.fsync = fsync
+        self._check_process()
+
+    def _open(self) -> None:
+        self._file: IO[bytes] = open(self.path, "ab")
+        with locked(self._file):
+            self._repair()
+
+    def _repair(self) -> None:
+        """Cut off a partial last line so new entries start on a fresh line"""
+        try:
+            f = open(self.path, "rb+")
+        except FileNotFoundError:
+            return
+        with f:
+            size = f.seek(0, os.SEEK_END)
+            end = size
+            while end > 0:
+                start = max(end - 4096, 0)
+                f.seek(start)
+                newline = f.read(end - start).rfind(b"\n")
+                if newline != -1:
+                    end = start + newline + 1
+                    break
+                end = start
+            if end != size:
+                f.truncate(end)
+
+    def _write(self, entries: List[ChatHistoryEntry]) -> None:
+        data = b"".join(encode_entry(entry) for entry in entries)
+        with locked(self._file):
+            self._file.write(data)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+
+    def _read(self, cursor: int, limit: Optional[int]) -> ChatHistoryPage:
+        with open(self.path, "rb") as f:
+            stop = None if limit is None else cursor + limit + 1
+            # A line still being appended by another process is not read yet
+            lines = list(islice(self._complete_lines(f), cursor, stop))
+        more = limit is not None and len(lines) > limit
+        lines = lines[:limit]
+        return ChatHistoryPage(
+            history=[json.loads(line) for line in lines],
+            next_cursor=cursor + len(lines) if more else None,
+        )
+
+    def _close(self) -> None:
+        self._file.close()
+
+    @staticmethod
+    def _complete_lines(f: IO[bytes]) -> Iterator[bytes]:
+        for line in f:
+            if line.endswith(b"\n"):
+                yield line
+
+
+class MmapHistoryStore(BatchedHistoryStore):
+    """
+    History in an append-only JSON Lines file with a memory-mapped offset index.
+
+    Next to the data file at ``path``, ``path + ".idx"`` holds the end offset
+    of every entry as an 8-byte integer. Both files are memory-mapped for
+    reading, so a page or the last few entries are found with a couple of
+    index lookups and cost time proportional to the page, not to the whole
+    history, and the history is never loaded into memory.
+
+    Batches are appended under an exclusive file lock, so several worker
+    processes can share the files. On open, index records without data are
+    dropped and data without index records, such as an existing log written
+    by LogHistoryStore, is indexed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        fsync: bool = False,
+        batch_size: int = 64,
+        flush_interval_ms: float = 50.0,
+    ) -> None:
+        super().__init__(batch_size, flush_interval_ms)
+        self.path = path
+        self.index_path = path + ".idx"
+        self.fsync = fsync
+        self._check_process()
+
+    def __len__(self) -> int:
+        self.flush()
+        with self._io_lock:
+            self._remap()
+            return len(self._index_map) // INDEX_RECORD.size
+
+    def tail(self, count: int) -> List[ChatHistoryEntry]:
+        """Return the newest ``count`` entries, oldest first"""
+        if count < 1:
+            raise ValueError("count must be at least 1")
+        self.flush()
+        with self._io_lock:
+            self._remap()
+            total = len(self._index_map) // INDEX_RECORD.size
+            return self._entries(max(total - count, 0), total)
+
+    def _open(self) -> None:
+        self._data = open(self.path, "ab")
+        self._index = open(self.index_path, "ab")
+        self._data_map: Union[mmap.mmap, bytes] = b""
+        self._index_map: Union[mmap.mmap, bytes] = b""
+        with locked(self._index):
+            self._repair()
+
+    def _repair(self) -> None:
+        """Make the index match the complete entries in the data file"""
+        index_size = os.fstat(self._index.fileno()).st_size
+        index_size -= index_size % INDEX_RECORD.size
+        data_size = os.fstat(self._data.fileno()).st_size
+
+        with open(self.index_path, "rb") as f:
+            end = 0
+            while index_size:
+                f.seek(index_size - INDEX_RECORD.size)
+                end = INDEX_RECORD.unpack(f.read(INDEX_RECORD.size))[0]
+                if end <= data_size:
+                    break
+                index_size -= INDEX_RECORD.size
+                end = 0
+        self._index.truncate(index_size)
+
+        # Index entries written to the data file but missing from the index
+        offsets = []
+        with open(self.path, "rb") as f:
+            f.seek(end)
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break
+                end += len(line)
+                offsets.append(end)
+        self._data.truncate(end)
+        self._append_index(offsets)
+
+    def _write(self, entries: List[ChatHistoryEntry]) -> None:
+        lines = [encode_entry(entry) for entry in entries]
+        with locked(self._index):
+            end = os.fstat(self._data.fileno()).st_size
+            offsets = []
+            for line in lines:
+                end += len(line)
+                offsets.append(end)
+            # Data goes first so the index never points past it
+            self._data.write(b"".join(lines))
+            self._data.flush()
+            if self.fsync:
+                os.fsync(self._data.fileno())
+            self._append_index(offsets)
+
+    def _append_index(self, offsets: List[int]) -> None:
+        if not offsets:
+            return
+        self._index.write(b"".join(INDEX_RECORD.pack(offset) for offset in offsets))
+        self._index.flush()
+        if self.fsync:
+            os.fsync(self._index.fileno())
+
+    def _read(self, cursor: int, limit: Optional[int]) -> ChatHistoryPage:
+        self._remap()
+        total = len(self._index_map) // INDEX_RECORD.size
+        end = total if limit is None else min(cursor + limit, total)
+        return ChatHistoryPage(
+            history=self._entries(cursor, end),
+            next_cursor=end if end < total else None,
+        )
+
+    def _entries(self, start: int, stop: int) -> List[ChatHistoryEntry]:
+        """Decode entries ``start`` to ``stop`` using the index"""
+        if start >= stop:
+            return []
+        offset = (
+            INDEX_RECORD.unpack_from(self._index_map, (start - 1) * INDEX_RECORD.size)[
+                0
+            ]
+            if start
+            else 0
+        )
+        entries = []
+        for position in range(start, stop):
+            end = INDEX_RECORD.unpack_from(
+                self._index_map, position * INDEX_RECORD.size
+            )[0]
+            entries.append(json.loads(self._data_map[offset:end]))
+            offset = end
+        return entries
+
+    def _remap(self) -> None:
+        """Map the files again if they grew, e.g. through another process"""
+        index_size = os.fstat(self._index.fileno()).st_size
+        index_size -= index_size % INDEX_RECORD.size
+        if index_size == len(self._index_map):
+            return
+        self._index_map = self._map(self.index_path, index_size)
+        # Map only the data the index covers
+        data_end = INDEX_RECORD.unpack_from(
+            self._index_map, index_size - INDEX_RECORD.size
+        )[0]
+        self._data_map = self._map(self.path, data_end)
+
+    @staticmethod
+    def _map(path: str, size: int) -> Union[mmap.mmap, bytes]:
+        if size == 0:
+            return b""
+        with open(path, "rb") as f:
+            # The mapping stays valid after the file is closed
+            return mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ)
+
+    def _close(self) -> None:
+        self._data.close()
+        self._index.close()
+
+
+def create_history_store(settings: Dict[str, Any]) -> HistoryStore:
+    """
+    Create the history store described by a config's 'history' section.
+
+    ``backend`` is one of ``memory`` (the default), ``sqlite``, ``log`` or
+    ``mmap``; the file-based backends also need a ``path``.
+    """
+    backend = settings.get("backend", "memory")
+
+    if backend == "memory":
+        return MemoryHistoryStore(
+            max_entries=settings.get("max_entries", 1000),
+            max_bytes=settings.get("max_bytes"),
+        )
+    if backend not in ("sqlite", "log", "mmap"):
+        raise ValueError(
+            f"Unknown history backend {backend!r}, "
+            "expected memory, sqlite, log or mmap"
+        )
+    if "path" not in settings:
+        raise ValueError(f"The {backend} history backend requires a 'path'")
+
+    path = str(settings["path"])
+    batch_size = int(settings.get("batch_size", 64))
+    flush_interval_ms = float(settings.get("flush_interval_ms", 50.0))
+    if backend == "sqlite":
+        return SQLiteHistoryStore(
+            path,
+            max_entries=settings.get("max_entries"),
+            batch_size=batch_size,
+            flush_interval_ms=flush_interval_ms,
+        )
+    if backend == "mmap":
+        return MmapHistoryStore(
+            path,
+            fsync=bool(settings.get("fsync", False)),
+            batch_size=batch_size,
+            flush_interval_ms=flush_interval_ms,
+        )
+    return LogHistoryStore(
+        path,
+        fsync=bool(settings.get("fsync", False)),
+        batch_size=batch_size,
+        flush_interval_ms=flush_interval_ms,
+    )
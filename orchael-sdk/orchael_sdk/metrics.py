@@ -0,0 +1,426 @@
+"""
+Prometheus-style metrics for the Orchael SDK server
+"""
+
+import time
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Latency buckets in seconds, from sub-millisecond handling to slow model calls
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Size buckets for counts such as history entries
+DEFAULT_SIZE_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 5000)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric(ABC):
+    """Base class for metrics with optional labels"""
+
+    type_name = "untyped"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+
+    def render(self) -> List[str]:
+        """Return the metric in the Prometheus text exposition format"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type_name}",
+        ]
+        lines.extend(self.samples())
+        return lines
+
+    @abstractmethod
+    def samples(self) -> Iterable[str]:
+        """Return the metric's sample lines, one per set of label values"""
+        pass
+
+    def _label_values(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}"
+            )
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(Metric):
+    """
+    Monotonically increasing count.
+
+    Updates are plain integer additions without locks. The server only updates
+    metrics from the event loop thread, so they never race.
+    """
+
+    type_name = "counter"
+
+    def __init__(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {} if labelnames else {(): 0}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        """Increase the count for the given label values"""
+        key = self._label_values(labels) if labels or self.labelnames else ()
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        """Return the count for the given label values"""
+        key = self._label_values(labels) if labels or self.labelnames else ()
+        return self._values.get(key, 0)
+
+    def samples(self) -> Iterable[str]:
+        for key, value in self._values.items():
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}{labels} {_format_value(value)}"
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    type_name = "gauge"
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        """Decrease the value for the given label values"""
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str) -> None:
+        """Set the value for the given label values"""
+        key = self._label_values(labels) if labels or self.labelnames else ()
+        self._values[key] = value
+
+
+class CallbackMetric(Metric):
+    """
+    Metric whose value is read from a callback when metrics are scraped.
+
+    Used to expose counters that other components already keep, such as cache
+    hits, without updating two counts per request. The sample is omitted while
+    the callback returns None, e.g. for a disabled feature.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Optional[float]],
+        type_name: str = "gauge",
+    ) -> None:
+        super().__init__(name, documentation)
+        self.callback = callback
+        self.type_name = type_name
+
+    def samples(self) -> Iterable[str]:
+        value = self.callback()
+        if value is not None:
+            yield f"{self.name} {_format_value(value)}"
+
+
+class _HistogramChild:
+    """Bucket counts for one set of label values, allocated once"""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, bucket_count: int) -> None:
+        # One slot per finite bucket plus the implicit +Inf bucket
+        self.counts = [0] * (bucket_count + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Histogram(Metric):
+    """
+    Distribution of observed values over fixed, preallocated buckets.
+
+    An observation costs one binary search and three additions, so histograms
+    are cheap enough to record on every request.
+    """
+
+    type_name = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._children: Dict[LabelValues, _HistogramChild] = {}
+        if not labelnames:
+            self._children[()] = _HistogramChild(len(self.buckets))
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record an observation for the given label values"""
+        key = self._label_values(labels) if labels or self.labelnames else ()
+        child = self._children.get(key)
+        if child is None:
+            child = self._children[key] = _HistogramChild(len(self.buckets))
+        child.counts[bisect_left(self.buckets, value)] += 1
+        child.sum += value
+        child.count += 1
+
+    def count(self, **labels: str) -> int:
+        """Return the number of observations for the given label values"""
+        key = self._label_values(labels) if labels or self.labelnames else ()
+        child = self._children.get(key)
+        return child.count if child is not None else 0
+
+    def samples(self) -> Iterable[str]:
+        for key, child in self._children.items():
+            cumulative = 0
+            for bound, bucket_count in zip(
+                self.buckets + (float("inf"),), child.counts
+            ):
+                cumulative += bucket_count
+                labels = _format_labels(
+                    self.labelnames + ("le",), key + (_format_value(bound),)
+                )
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    """Collection of metrics rendered together for a scrape"""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        """Add a metric, replacing any existing metric with the same name"""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Counter:
+        """Create and register a counter"""
+        metric = Counter(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def gauge(
+        self, name: str, documentation: str, labelnames: Sequence[str] = ()
+    ) -> Gauge:
+        """Create and register a gauge"""
+        metric = Gauge(name, documentation, labelnames)
+        self.register(metric)
+        return metric
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS,
+    ) -> Histogram:
+        """Create and register a histogram"""
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self.register(metric)
+        return metric
+
+    def callback(
+        self,
+        name: str,
+        documentation: str,
+        callback: Callable[[], Optional[float]],
+        type_name: str = "gauge",
+    ) -> CallbackMetric:
+        """Create and register a metric read from a callback at scrape time"""
+        metric = CallbackMetric(name, documentation, callback, type_name)
+        self.register(metric)
+        return metric
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class RequestTimer:
+    """Timestamps of one request's phases, shared by middleware and handler"""
+
+    __slots__ = ("start", "handler_start", "handler_end", "phases")
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.handler_start: Optional[float] = None
+        self.handler_end: Optional[float] = None
+        # Seconds spent in phases measured inside the handler, e.g. queue wait
+        self.phases: List[Tuple[str, float]] = []
+
+
+# Timer of the request being handled in the current task
+current_timer: ContextVar[Optional[RequestTimer]] = ContextVar(
+    "current_timer", default=None
+)
+
+
+def mark_handler_start() -> None:
+    """Note that the request was validated and its handler started"""
+    timer = current_timer.get()
+    if timer is not None:
+        timer.handler_start = time.perf_counter()
+
+
+def mark_handler_end() -> None:
+    """Note that the handler returned and response serialization begins"""
+    timer = current_timer.get()
+    if timer is not None:
+        timer.handler_end = time.perf_counter()
+
+
+def record_phase(phase: str, seconds: float) -> None:
+    """Attribute time to a phase of the current request"""
+    timer = current_timer.get()
+    if timer is not None:
+        timer.phases.append((phase, seconds))
+
+
+ASGIApp = Callable[
+    [
+        MutableMapping[str, Any],
+        Callable[[], Awaitable[MutableMapping[str, Any]]],
+        Callable[[MutableMapping[str, Any]], Awaitable[None]],
+    ],
+    Awaitable[None],
+]
+
+
+class MetricsMiddleware:
+    """
+    ASGI middleware recording request counts, latency and in-flight requests.
+
+    Handlers report the phases of a request through the current
+    :class:`RequestTimer`. Besides phases recorded with :func:`record_phase`,
+    the middleware derives ``validation`` (receiving and validating the body
+    until the handler starts) and ``serialization`` (from the handler returning
+    until the response starts) from the handler's timestamps.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        requests: Counter,
+        duration: Histogram,
+        in_flight: Gauge,
+        phases: Histogram,
+    ) -> None:
+        self.app = app
+        self.requests = requests
+        self.duration = duration
+        self.in_flight = in_flight
+        self.phases = phases
+
+    async def __call__(
+        self,
+        scope: MutableMapping[str, Any],
+        receive: Callable[[], Awaitable[MutableMapping[str, Any]]],
+        send: Callable[[MutableMapping[str, Any]], Awaitable[None]],
+    ) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer(time.perf_counter())
+        token = current_timer.set(timer)
+        status = 500
+
+        async def send_wrapper(message: MutableMapping[str, Any]) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                now = time.perf_counter()
+                endpoint = _endpoint(scope)
+                if timer.handler_start is not None:
+                    self.phases.observe(
+                        timer.handler_start - timer.start,
+                        endpoint=endpoint,
+                        phase="validation",
+                    )
+                if timer.handler_end is not None:
+                    self.phases.observe(
+                        now - timer.handler_end,
+                        endpoint=endpoint,
+                        phase="serialization",
+                    )
+            await send(message)
+
+        self.in_flight.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec()
+            current_timer.reset(token)
+            endpoint = _endpoint(scope)
+            self.requests.inc(endpoint=endpoint, status=str(status))
+            self.duration.observe(time.perf_counter() - timer.start, endpoint=endpoint)
+            for phase, seconds in timer.phases:
+                self.phases.observe(seconds, endpoint=endpoint, phase=phase)
+
+
+def _endpoint(scope: MutableMapping[str, Any]) -> str:
+    """Label requests by route template so path parameters do not add series"""
+    route = scope.get("route")
+    path = getattr(route, "path", None)
+    return str(path) if path is not None else "unmatched"
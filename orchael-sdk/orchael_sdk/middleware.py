@@ -0,0 +1,324 @@
+"""
+Middleware pipeline around Orchael SDK chat processors
+"""
+
+import asyncio
+import importlib
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    cast,
+)
+
+from .chat_types import ChatInput, ChatOutput
+from .compaction import Compactor, ProcessorSummarizer, Summarizer
+from .context import ContextWindow
+from .orchael_chat_processor import (
+    OrchaelChatProcessor,
+    WrapperChatProcessor,
+    overrides,
+)
+
+
+class ChatMiddleware:
+    """
+    Base class for steps run before and after a processor handles an input.
+
+    ``before`` returns the input to pass on, e.g. with trimmed history, and may
+    raise to reject it. ``after`` returns the output to pass back and receives
+    the input as it entered the pipeline. Both default to passing their
+    argument through unchanged.
+
+    The async variants default to the sync hooks. Override them when a hook
+    does blocking I/O, so it does not stall the event loop of async processors.
+    """
+
+    def before(self, chat_input: ChatInput) -> ChatInput:
+        """Return the input to pass to the next middleware or the processor"""
+        return chat_input
+
+    def after(self, chat_input: ChatInput, output: ChatOutput) -> ChatOutput:
+        """Return the output to pass back to the previous middleware or caller"""
+        return output
+
+    async def abefore(self, chat_input: ChatInput) -> ChatInput:
+        """Asynchronously return the input to pass on"""
+        return self.before(chat_input)
+
+    async def aafter(self, chat_input: ChatInput, output: ChatOutput) -> ChatOutput:
+        """Asynchronously return the output to pass back"""
+        return self.after(chat_input, output)
+
+
+def _hooks(
+    middlewares: Sequence[ChatMiddleware], *names: str
+) -> List[Callable[..., Any]]:
+    """Bind the first named hook of each middleware that overrides any of them"""
+    hooks = []
+    for middleware in middlewares:
+        if any(
+            getattr(type(middleware), name) is not getattr(ChatMiddleware, name)
+            for name in names
+        ):
+            hooks.append(getattr(middleware, names[0]))
+    return hooks
+
+
+class MiddlewareChatProcessor(WrapperChatProcessor):
+    """
+    Processor that runs a chain of middleware around another processor.
+
+    ``before`` hooks run in order and ``after`` hooks in reverse order, for
+    sync, async, batched and streaming calls alike. Only the hooks a middleware
+    overrides are called. When streaming, ``after`` hooks run once the stream
+    is complete and see the whole output, but cannot change what was sent.
+
+    History, warmup and caching are those of the wrapped processor.
+    """
+
+    def __init__(
+        self, processor: OrchaelChatProcessor, middlewares: Sequence[ChatMiddleware]
+    ) -> None:
+        super().__init__(processor)
+        self.middlewares = list(middlewares)
+
+        reverse = self.middlewares[::-1]
+        self._before: List[Callable[[ChatInput], ChatInput]] = _hooks(
+            self.middlewares, "before"
+        )
+        self._after: List[Callable[[ChatInput, ChatOutput], ChatOutput]] = _hooks(
+            reverse, "after"
+        )
+        self._abefore: List[Callable[[ChatInput], Awaitable[ChatInput]]] = _hooks(
+            self.middlewares, "abefore", "before"
+        )
+        self._aafter: List[Callable[[ChatInput, ChatOutput], Awaitable[ChatOutput]]] = (
+            _hooks(reverse, "aafter", "after")
+        )
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        processed = chat_input
+        for before in self._before:
+            processed = before(processed)
+        output = self.processor.process_chat(processed)
+        for after in self._after:
+            output = after(chat_input, output)
+        return output
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        if not overrides(self.processor, "aprocess_chat"):
+            # Run the hooks and a synchronous processor in one worker thread hop
+            return await asyncio.to_thread(self.process_chat, chat_input)
+
+        processed = chat_input
+        for abefore in self._abefore:
+            processed = await abefore(processed)
+        output = await self.processor.aprocess_chat(processed)
+        for aafter in self._aafter:
+            output = await aafter(chat_input, output)
+        return output
+
+    def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        processed = list(chat_inputs)
+        for before in self._before:
+            processed = [before(chat_input) for chat_input in processed]
+        outputs = self.processor.process_batch(processed)
+        for after in self._after:
+            outputs = [
+                after(chat_input, output)
+                for chat_input, output in zip(chat_inputs, outputs)
+            ]
+        return outputs
+
+    async def aprocess_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        if not overrides(self.processor, "aprocess_batch"):
+            # Runs process_batch in a worker thread, or aprocess_chat per input
+            return await super().aprocess_batch(chat_inputs)
+
+        processed = list(chat_inputs)
+        for abefore in self._abefore:
+            processed = list(
+                await asyncio.gather(*(abefore(chat_input) for chat_input in processed))
+            )
+        outputs = await self.processor.aprocess_batch(processed)
+        for aafter in self._aafter:
+            outputs = list(
+                await asyncio.gather(
+                    *(
+                        aafter(chat_input, output)
+                        for chat_input, output in zip(chat_inputs, outputs)
+                    )
+                )
+            )
+        return outputs
+
+    def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+        processed = chat_input
+        for before in self._before:
+            processed = before(processed)
+        if not self._after:
+            yield from self.processor.stream_chat(processed)
+            return
+
+        chunks = []
+        for chunk in self.processor.stream_chat(processed):
+            chunks.append(chunk)
+            yield chunk
+        output = ChatOutput(input=chat_input["input"], output="".join(chunks))
+        for after in self._after:
+            output = after(chat_input, output)
+
+    async def astream_chat(self, chat_input: ChatInput) -> AsyncIterator[str]:
+        if not overrides(self.processor, "astream_chat"):
+            # Iterates stream_chat in a worker thread
+            async for chunk in super().astream_chat(chat_input):
+                yield chunk
+            return
+
+        processed = chat_input
+        for abefore in self._abefore:
+            processed = await abefore(processed)
+        chunks = []
+        async for chunk in self.processor.astream_chat(processed):
+            if self._aafter:
+                chunks.append(chunk)
+            yield chunk
+        output = ChatOutput(input=chat_input["input"], output="".join(chunks))
+        for aafter in self._aafter:
+            output = await aafter(chat_input, output)
+
+
+class ContextWindowMiddleware(ChatMiddleware):
+    """Trim the history of each input to a :class:`ContextWindow`"""
+
+    def __init__(self, window: ContextWindow) -> None:
+        self.window = window
+
+    def before(self, chat_input: ChatInput) -> ChatInput:
+        return self.window.apply(chat_input)
+
+
+class CompactionMiddleware(ChatMiddleware):
+    """Replace older history with a running summary using a :class:`Compactor`"""
+
+    def __init__(self, compactor: Compactor) -> None:
+        self.compactor = compactor
+
+    def before(self, chat_input: ChatInput) -> ChatInput:
+        return self.compactor.apply(chat_input)
+
+    async def abefore(self, chat_input: ChatInput) -> ChatInput:
+        return await self.compactor.aapply(chat_input)
+
+
+class CompactingChatProcessor(MiddlewareChatProcessor):
+    """
+    Processor that compacts the history of each input before passing it on.
+
+    Wraps another processor and runs every input through a :class:`Compactor`,
+    so the wrapped processor sees a summary of older turns followed by the
+    recent ones.
+    """
+
+    def __init__(self, processor: OrchaelChatProcessor, compactor: Compactor) -> None:
+        super().__init__(processor, [CompactionMiddleware(compactor)])
+        self.compactor = compactor
+
+
+def load_object(path: str) -> Any:
+    """Import an object from a path like 'module.name'"""
+    module_name, _, name = path.rpartition(".")
+    if not module_name:
+        raise ValueError(f"Expected a path like 'module.name', got {path!r}")
+    try:
+        return getattr(importlib.import_module(module_name), name)
+    except (ImportError, AttributeError) as e:
+        raise ValueError(f"Cannot import {path}: {e}") from e
+
+
+def _context_window(settings: Dict[str, Any]) -> ContextWindow:
+    return ContextWindow(
+        max_tokens=settings.get("max_tokens"),
+        max_chars=settings.get("max_chars"),
+        max_turns=settings.get("max_turns"),
+    )
+
+
+def _summarizer(path: str) -> Summarizer:
+    summarizer = load_object(path)
+    if isinstance(summarizer, type):
+        if issubclass(summarizer, OrchaelChatProcessor):
+            return ProcessorSummarizer(summarizer())
+        summarizer = summarizer()
+    if not callable(summarizer):
+        raise ValueError(f"Summarizer {path} is not callable")
+    return cast(Summarizer, summarizer)
+
+
+def create_middleware(name: str, settings: Dict[str, Any]) -> ChatMiddleware:
+    """
+    Create one middleware of a config's 'middleware' section.
+
+    ``name`` is ``context_window``, ``compaction`` or the import path of a
+    :class:`ChatMiddleware` subclass, which is created with ``settings`` as
+    keyword arguments.
+    """
+    if name == "context_window":
+        return ContextWindowMiddleware(_context_window(settings))
+    if name == "compaction":
+        if "summarizer" not in settings:
+            raise ValueError("The compaction middleware requires a 'summarizer'")
+        window = settings.get("window")
+        compactor = Compactor(
+            _summarizer(str(settings["summarizer"])),
+            every=int(settings.get("every", 8)),
+            keep_turns=int(settings.get("keep_turns", 8)),
+            window=_context_window(window) if isinstance(window, dict) else None,
+            cache_size=int(settings.get("cache_size", 1024)),
+        )
+        return CompactionMiddleware(compactor)
+
+    middleware_class = load_object(name)
+    if not (
+        isinstance(middleware_class, type)
+        and issubclass(middleware_class, ChatMiddleware)
+    ):
+        raise ValueError(f"Middleware {name} is not a ChatMiddleware subclass")
+    return middleware_class(**settings)
+
+
+def apply_middleware(
+    processor: OrchaelChatProcessor, settings: Optional[List[Any]]
+) -> OrchaelChatProcessor:
+    """
+    Wrap a processor in the middleware listed by a config's 'middleware' section.
+
+    Each item is a middleware name, or a mapping from the name to its settings.
+    Without middleware the processor is returned as is, so calls go straight
+    to it.
+    """
+    if not settings:
+        return processor
+    if not isinstance(settings, list):
+        raise ValueError("The 'middleware' config section must be a list")
+
+    middlewares = []
+    for item in settings:
+        if isinstance(item, str):
+            middlewares.append(create_middleware(item, {}))
+        elif isinstance(item, dict) and len(item) == 1:
+            name, options = next(iter(item.items()))
+            middlewares.append(create_middleware(name, options or {}))
+        else:
+            raise ValueError(
+                f"Invalid middleware {item!r}, expected a name or "
+                "a mapping from a name to its settings"
+            )
+    return MiddlewareChatProcessor(processor, middlewares)
@@ -3,19 +3,268 @@ Base class for Orchael chat processors
 """
 
 from abc import ABC, abstractmethod
-from typing import List
-from .chat_types import ChatInput, ChatOutput, ChatHistoryEntry
+from typing import TYPE_CHECKING, AsyncIterator, FrozenSet, Iterator, List, Optional
+from .chat_types import ChatInput, ChatOutput, ChatHistoryEntry, ChatHistoryPage
+from .history import history_page
+
+if TYPE_CHECKING:
+    from .history_store import HistoryStore
+
+# asyncio, concurrent.futures and the history stores are imported where they
+# are used: loading a processor class should not pay for them, since the CLI
+# imports processors on every run.
+
+# Upper bound on the threads the default process_batch fans out to
+DEFAULT_BATCH_WORKERS = 8
 
 
 class OrchaelChatProcessor(ABC):
     """Base class for chat processors that implement the Orchael chat interface"""
 
+    # Whether the server may answer repeated requests from its response cache.
+    # Set to False when the output is not determined by the input and history.
+    cacheable: bool = True
+
+    # Where the default history hooks keep completed turns. The server and CLI
+    # replace it with the store configured by the config's 'history' section.
+    history_store: Optional["HistoryStore"] = None
+
     @abstractmethod
     def process_chat(self, chat_input: ChatInput) -> ChatOutput:
         """Process a chat input and return a chat output"""
         pass
 
-    @abstractmethod
     def get_history(self) -> List[ChatHistoryEntry]:
-        """Return the chat history as an array of ChatHistoryEntry"""
+        """
+        Return the chat history as an array of ChatHistoryEntry.
+
+        The default returns the entries of history_store, or an empty history
+        when there is no store.
+        """
+        if self.history_store is None:
+            return []
+        return self.history_store.entries()
+
+    def get_history_page(
+        self, cursor: int = 0, limit: Optional[int] = None
+    ) -> ChatHistoryPage:
+        """
+        Return up to ``limit`` history entries starting at position ``cursor``.
+
+        The server pages through history with this instead of serializing it
+        whole. The default reads the page from history_store when get_history
+        is not overridden, and otherwise slices the list get_history returns.
+        """
+        if self.history_store is not None and not overrides(self, "get_history"):
+            return self.history_store.page(cursor, limit)
+        return history_page(self.get_history(), cursor, limit)
+
+    def record_history(self, entry: ChatHistoryEntry) -> None:
+        """
+        Record a completed turn in the processor's history.
+
+        The server calls this for turns answered without running process_chat,
+        such as response cache hits, and processors should call it from
+        process_chat as well. The default appends the entry to history_store,
+        if there is one.
+        """
+        if self.history_store is not None:
+            self.history_store.append(entry)
+
+    def warmup(self) -> None:
+        """
+        Prepare the processor to serve its first request.
+
+        The server calls this once at startup, before reporting ready. Override
+        it to preload models, open connections or fill caches. The default does
+        nothing.
+        """
         pass
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        """
+        Asynchronously process a chat input and return a chat output.
+
+        Override this in processors backed by async I/O so the server can await
+        them directly on the event loop. The default runs process_chat in a
+        worker thread.
+        """
+        import asyncio
+
+        return await asyncio.to_thread(self.process_chat, chat_input)
+
+    async def aget_history(self) -> List[ChatHistoryEntry]:
+        """
+        Asynchronously return the chat history.
+
+        The default runs get_history in a worker thread.
+        """
+        import asyncio
+
+        return await asyncio.to_thread(self.get_history)
+
+    def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        """
+        Process several chat inputs and return their outputs in the same order.
+
+        Override this in processors whose backend supports real batching. The
+        default fans the inputs out to process_chat on a small thread pool.
+        """
+        if len(chat_inputs) <= 1:
+            return [self.process_chat(chat_input) for chat_input in chat_inputs]
+
+        from concurrent.futures import ThreadPoolExecutor
+
+        workers = min(len(chat_inputs), DEFAULT_BATCH_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(self.process_chat, chat_inputs))
+
+    async def aprocess_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        """
+        Asynchronously process several chat inputs, preserving their order.
+
+        The default runs an overridden process_batch in a worker thread, and
+        otherwise awaits aprocess_chat for every input concurrently.
+        """
+        import asyncio
+
+        if overrides(self, "process_batch"):
+            return await asyncio.to_thread(self.process_batch, chat_inputs)
+        return list(
+            await asyncio.gather(
+                *(self.aprocess_chat(chat_input) for chat_input in chat_inputs)
+            )
+        )
+
+    def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+        """
+        Process a chat input and yield the output in chunks as it is generated.
+
+        Override this in processors that can stream tokens. Implementations
+        should still record the complete output to history. The default yields
+        the whole output of process_chat as a single chunk.
+        """
+        yield self.process_chat(chat_input)["output"]
+
+    async def astream_chat(self, chat_input: ChatInput) -> AsyncIterator[str]:
+        """
+        Asynchronously yield the output of a chat input in chunks.
+
+        The default iterates stream_chat in a worker thread when a subclass
+        overrides it, and otherwise yields the output of aprocess_chat as a
+        single chunk.
+        """
+        import asyncio
+
+        if overrides(self, "stream_chat"):
+            chunks = self.stream_chat(chat_input)
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                yield chunk
+        else:
+            yield (await self.aprocess_chat(chat_input))["output"]
+
+
+def overrides(processor: object, method_name: str) -> bool:
+    """
+    Check whether a processor provides its own version of a base class method.
+
+    A wrapper provides a hook listed in its ``delegated_hooks`` only when the
+    processor it wraps does, so callers pick the sync or async variant, or skip
+    an optional hook, by the wrapped processor.
+    """
+    if (
+        isinstance(processor, WrapperChatProcessor)
+        and method_name in processor.delegated_hooks
+    ):
+        return overrides(processor.processor, method_name)
+    implementation = getattr(type(processor), method_name, None)
+    return implementation is not None and implementation is not getattr(
+        OrchaelChatProcessor, method_name
+    )
+
+
+class WrapperChatProcessor(OrchaelChatProcessor):
+    """
+    Base class for processors that add behaviour around another processor.
+
+    Chat calls, history, warmup and caching are passed through to the wrapped
+    ``processor``, so subclasses only override the calls they change.
+    """
+
+    # Hooks that count as overridden only if the wrapped processor overrides
+    # them, see overrides(). A synchronous wrapped processor then runs on the
+    # server's worker pool, and micro-batching sees its batch hooks.
+    delegated_hooks: FrozenSet[str] = frozenset(
+        {
+            "aprocess_chat",
+            "aget_history",
+            "process_batch",
+            "aprocess_batch",
+            "stream_chat",
+            "astream_chat",
+        }
+    )
+
+    def __init__(self, processor: OrchaelChatProcessor) -> None:
+        self.processor = processor
+        self.cacheable = processor.cacheable
+
+    @property
+    def history_store(self) -> Optional["HistoryStore"]:
+        return self.processor.history_store
+
+    @history_store.setter
+    def history_store(self, store: Optional["HistoryStore"]) -> None:
+        self.processor.history_store = store
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        return self.processor.process_chat(chat_input)
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        if overrides(self.processor, "aprocess_chat"):
+            return await self.processor.aprocess_chat(chat_input)
+        # Runs process_chat in a worker thread
+        return await super().aprocess_chat(chat_input)
+
+    def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        return self.processor.process_batch(chat_inputs)
+
+    async def aprocess_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        if overrides(self.processor, "aprocess_batch"):
+            return await self.processor.aprocess_batch(chat_inputs)
+        # Runs process_batch in a worker thread, or aprocess_chat per input
+        return await super().aprocess_batch(chat_inputs)
+
+    def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+        return self.processor.stream_chat(chat_input)
+
+    async def astream_chat(self, chat_input: ChatInput) -> AsyncIterator[str]:
+        if overrides(self.processor, "astream_chat"):
+            async for chunk in self.processor.astream_chat(chat_input):
+                yield chunk
+        else:
+            # Iterates stream_chat in a worker thread
+            async for chunk in super().astream_chat(chat_input):
+                yield chunk
+
+    def get_history(self) -> List[ChatHistoryEntry]:
+        return self.processor.get_history()
+
+    async def aget_history(self) -> List[ChatHistoryEntry]:
+        if overrides(self.processor, "aget_history"):
+            return await self.processor.aget_history()
+        return await super().aget_history()
+
+    def get_history_page(
+        self, cursor: int = 0, limit: Optional[int] = None
+    ) -> ChatHistoryPage:
+        return self.processor.get_history_page(cursor, limit)
+
+    def record_history(self, entry: ChatHistoryEntry) -> None:
+        self.processor.record_history(entry)
+
+    def warmup(self) -> None:
+        self.processor.warmup()
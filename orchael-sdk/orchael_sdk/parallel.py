@@ -0,0 +1,261 @@
+"""
+Parallel fan-out over several Orchael SDK processors
+"""
+
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import Executor
+from typing import Any, Callable, Coroutine, List, Optional, Sequence, TypeVar, Union
+
+from .chat_types import ChatInput, ChatOutput
+from .orchael_chat_processor import OrchaelChatProcessor, overrides
+
+T = TypeVar("T")
+
+Tasks = List["asyncio.Task[ChatOutput]"]
+
+
+class ParallelStrategy(ABC):
+    """Decides which output to return from processors queried in parallel"""
+
+    @abstractmethod
+    async def select(self, chat_input: ChatInput, tasks: Tasks) -> ChatOutput:
+        """
+        Return the output for ``chat_input`` from the running tasks.
+
+        ``tasks`` are in the order of the processors. Tasks still running when
+        this returns are cancelled.
+        """
+
+
+async def first_successful(tasks: Tasks) -> "asyncio.Task[ChatOutput]":
+    """Return the first task to succeed, raising the first error if all fail"""
+    errors: List[BaseException] = []
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in tasks:
+            if task in done:
+                error = task.exception()
+                if error is None:
+                    return task
+                errors.append(error)
+    raise errors[0]
+
+
+async def first_success(tasks: Tasks) -> ChatOutput:
+    """Return the first successful output, raising the first error if all fail"""
+    return (await first_successful(tasks)).result()
+
+
+async def successes(tasks: Tasks, timeout: Optional[float]) -> List[ChatOutput]:
+    """
+    Return the outputs of the tasks that succeed within ``timeout`` seconds.
+
+    Waits for every task without a timeout. If none has succeeded when the
+    timeout expires, waits for the first success instead.
+    """
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    outputs = [
+        task.result() for task in tasks if task in done and task.exception() is None
+    ]
+    if outputs:
+        return outputs
+    if pending:
+        return [await first_success([task for task in tasks if task in pending])]
+    # Every task failed
+    return [tasks[0].result()]
+
+
+class FirstSuccess(ParallelStrategy):
+    """Return the first successful output and cancel the other processors"""
+
+    async def select(self, chat_input: ChatInput, tasks: Tasks) -> ChatOutput:
+        return await first_success(tasks)
+
+
+def join_outputs(chat_input: ChatInput, outputs: List[ChatOutput]) -> ChatOutput:
+    """Merge outputs by joining them with blank lines"""
+    return ChatOutput(
+        input=chat_input["input"],
+        output="\n\n".join(output["output"] for output in outputs),
+    )
+
+
+class MergeAll(ParallelStrategy):
+    """
+    Merge the outputs of every processor that succeeds.
+
+    ``merge`` combines the successful outputs, in processor order, into one.
+    With a ``timeout`` in seconds, processors still running by then are left
+    out.
+    """
+
+    def __init__(
+        self,
+        merge: Callable[[ChatInput, List[ChatOutput]], ChatOutput] = join_outputs,
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.merge = merge
+        self.timeout = timeout
+
+    async def select(self, chat_input: ChatInput, tasks: Tasks) -> ChatOutput:
+        return self.merge(chat_input, await successes(tasks, self.timeout))
+
+
+class BestScored(ParallelStrategy):
+    """
+    Return the successful output with the highest score.
+
+    ``scorer`` rates an output for an input; ties go to the earlier processor.
+    With a ``timeout`` in seconds, processors still running by then are left
+    out.
+    """
+
+    def __init__(
+        self,
+        scorer: Callable[[ChatInput, ChatOutput], float],
+        timeout: Optional[float] = None,
+    ) -> None:
+        self.scorer = scorer
+        self.timeout = timeout
+
+    async def select(self, chat_input: ChatInput, tasks: Tasks) -> ChatOutput:
+        outputs = await successes(tasks, self.timeout)
+        return max(outputs, key=lambda output: self.scorer(chat_input, output))
+
+
+def create_strategy(
+    name: str, scorer: Optional[Callable[[ChatInput, ChatOutput], float]] = None
+) -> ParallelStrategy:
+    """Create a strategy from its name: first_success, merge_all or best_scored"""
+    if name == "first_success":
+        return FirstSuccess()
+    if name == "merge_all":
+        return MergeAll()
+    if name == "best_scored":
+        if scorer is None:
+            raise ValueError("The best_scored strategy requires a scorer")
+        return BestScored(scorer)
+    raise ValueError(
+        f"Unknown strategy {name!r}, expected first_success, merge_all or best_scored"
+    )
+
+
+async def call_processor(
+    processor: OrchaelChatProcessor,
+    chat_input: ChatInput,
+    executor: Optional[Executor] = None,
+) -> ChatOutput:
+    """
+    Await native async processors, run synchronous ones in a worker thread.
+
+    Synchronous processors run on ``executor``, or on the event loop's default
+    executor when there is none.
+    """
+    if overrides(processor, "aprocess_chat"):
+        return await processor.aprocess_chat(chat_input)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, processor.process_chat, chat_input)
+
+
+def cancel_tasks(tasks: Tasks) -> None:
+    """Cancel the tasks still running and mark errors of finished ones as handled"""
+    for task in tasks:
+        if not task.done():
+            task.cancel()
+        elif not task.cancelled():
+            task.exception()
+
+
+_background_loop: Optional[asyncio.AbstractEventLoop] = None
+_background_loop_lock = threading.Lock()
+
+
+def background_loop() -> asyncio.AbstractEventLoop:
+    """Return the event loop that runs detached coroutines, starting it once"""
+    global _background_loop
+    with _background_loop_lock:
+        if _background_loop is None:
+            loop = asyncio.new_event_loop()
+            threading.Thread(
+                target=loop.run_forever, name="orchael-background-loop", daemon=True
+            ).start()
+            _background_loop = loop
+    return _background_loop
+
+
+def run_detached(coroutine: Coroutine[Any, Any, T]) -> T:
+    """
+    Run a coroutine from synchronous code and wait for its result.
+
+    The coroutine runs on a long-lived loop in a background thread, so no loop
+    is created per call, and a cancelled synchronous processor still running
+    in its worker thread does not delay the result. It must not be called from
+    a coroutine running on that loop.
+    """
+    return asyncio.run_coroutine_threadsafe(coroutine, background_loop()).result()
+
+
+class ParallelChatProcessor(OrchaelChatProcessor):
+    """
+    Processor that sends each input to several processors at once.
+
+    Every processor in ``processors`` gets the same input concurrently, and
+    ``strategy`` decides what to return: ``first_success`` (the default) the
+    first output to arrive, ``merge_all`` all outputs merged, and
+    ``best_scored`` the output ``scorer`` rates highest. Pass a
+    :class:`ParallelStrategy` for other policies. Processors still running
+    once the strategy has decided are cancelled; synchronous ones finish in
+    their worker thread but their output is discarded.
+
+    The chosen turn is recorded in this processor's own history.
+
+    Synchronous processors run on ``executor``, which the server sets to its
+    worker pool, or on the event loop's default executor when it is None.
+    """
+
+    executor: Optional[Executor] = None
+
+    def __init__(
+        self,
+        processors: Sequence[OrchaelChatProcessor],
+        strategy: Union[str, ParallelStrategy] = "first_success",
+        scorer: Optional[Callable[[ChatInput, ChatOutput], float]] = None,
+    ) -> None:
+        if not processors:
+            raise ValueError("ParallelChatProcessor needs at least one processor")
+
+        self.processors = list(processors)
+        self.strategy = (
+            create_strategy(strategy, scorer) if isinstance(strategy, str) else strategy
+        )
+        self.cacheable = all(processor.cacheable for processor in self.processors)
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        return run_detached(self.aprocess_chat(chat_input))
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        tasks = [
+            asyncio.create_task(call_processor(processor, chat_input, self.executor))
+            for processor in self.processors
+        ]
+        try:
+            output = await self.strategy.select(chat_input, tasks)
+        finally:
+            cancel_tasks(tasks)
+        self.record_history({"input": chat_input["input"], "output": output["output"]})
+        return output
+
+    def warmup(self) -> None:
+        async def warm_all() -> None:
+            await asyncio.gather(
+                *(
+                    asyncio.to_thread(processor.warmup)
+                    for processor in self.processors
+                    if overrides(processor, "warmup")
+                )
+            )
+
+        asyncio.run(warm_all())
@@ -0,0 +1,142 @@
+"""
+Sampling CPU and allocation profiling for Orchael SDK processors
+"""
+
+import os
+import sys
+import threading
+import tracemalloc
+from collections import Counter
+from types import FrameType
+from typing import Any, Dict, List, Optional
+
+# Innermost frames of threads parked waiting rather than running: lock,
+# condition and event waits, selector polls and idle pool workers
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+
+def frame_stack(frame: Optional[FrameType]) -> List[str]:
+    """Return the functions of a frame's stack, outermost first"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def is_idle(frame: FrameType) -> bool:
+    """Check whether a thread's innermost frame is one of IDLE_FRAMES"""
+    code = frame.f_code
+    return (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES
+
+
+class StackSampler:
+    """
+    Statistical CPU profiler built on sys._current_frames.
+
+    A background thread records the stack of every other thread each
+    ``interval`` seconds. Stacks are rooted at the current ``phase``, so the
+    cost of importing, initializing and serving requests shows up separately,
+    and ``samples`` counts the samples taken in each phase. Sampling needs no
+    instrumentation of the profiled code.
+
+    Threads parked in a wait, a selector poll or a queue get are left out,
+    so the stacks show where threads were running, and ``idle`` counts the
+    thread stacks skipped in each phase. Set ``include_idle`` to record them
+    too. Blocking calls made directly from C, like time.sleep, still look busy.
+    """
+
+    def __init__(self, interval: float = 0.005, include_idle: bool = False) -> None:
+        if interval <= 0:
+            raise ValueError("interval must be positive")
+
+        self.interval = interval
+        self.include_idle = include_idle
+        self.phase = "main"
+        self.samples: "Counter[str]" = Counter()
+        self.idle: "Counter[str]" = Counter()
+        self.stacks: "Counter[str]" = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Start sampling in a background thread"""
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="orchael-stack-sampler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop sampling and wait for the sampling thread"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "StackSampler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            phase = self.phase
+            self.samples[phase] += 1
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                if not self.include_idle and is_idle(frame):
+                    self.idle[phase] += 1
+                    continue
+                self.stacks[";".join([phase] + frame_stack(frame))] += 1
+
+    def collapsed(self) -> List[str]:
+        """Return the samples in the collapsed format read by flamegraph tools"""
+        return [f"{stack} {count}" for stack, count in sorted(self.stacks.items())]
+
+
+def top_allocations(
+    snapshot: tracemalloc.Snapshot,
+    baseline: Optional[tracemalloc.Snapshot] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """
+    Return the source lines that allocated the most memory still in use.
+
+    With a ``baseline`` snapshot, only memory allocated since it was taken is
+    counted. Allocations made by the profiler itself are left out.
+    """
+    ignored = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    ]
+    snapshot = snapshot.filter_traces(ignored)
+    if baseline is None:
+        sites = [
+            (stat.traceback[0], stat.size, stat.count)
+            for stat in snapshot.statistics("lineno")
+        ]
+    else:
+        sites = [
+            (stat.traceback[0], stat.size_diff, stat.count_diff)
+            for stat in snapshot.compare_to(baseline.filter_traces(ignored), "lineno")
+            if stat.size_diff > 0
+        ]
+        sites.sort(key=lambda site: site[1], reverse=True)
+
+    return [
+        {"location": f"{frame.filename}:{frame.lineno}", "size": size, "count": count}
+        for frame, size, count in sites[:limit]
+    ]
@@ -3,14 +3,37 @@
 FastAPI server for Orchael SDK
 """
 
+import asyncio
+import gc
 import importlib
+import json
 import os
+import signal
+import socket
 import sys
-from typing import Type, Dict, Any, cast, List, Optional
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Type,
+    TypeVar,
+    Union,
+    cast,
+)
 
 import click
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
+from starlette.types import Receive, Scope, Send
 import uvicorn
 
 try:
@@ -18,8 +41,38 @@ try:
 except ImportError:
     raise ImportError("PyYAML is required. Install with: pip install PyYAML")
 
-from .orchael_chat_processor import OrchaelChatProcessor
-from .chat_types import ChatInput, ChatHistoryEntry
+from .orchael_chat_processor import (
+    OrchaelChatProcessor,
+    WrapperChatProcessor,
+    overrides,
+)
+from .chat_types import ChatInput, ChatOutput, ChatHistoryEntry, ChatHistoryPage
+from .admission import AdaptiveLimiter, Overloaded
+from .batching import MicroBatcher
+from .cache import ResponseCache, cache_key
+from .hedging import HedgedChatProcessor, apply_hedging
+from .history import history_page
+from .history_store import create_history_store
+from .metrics import (
+    DEFAULT_SIZE_BUCKETS,
+    MetricsMiddleware,
+    Registry,
+    mark_handler_end,
+    mark_handler_start,
+    record_phase,
+)
+from .middleware import apply_middleware
+from .parallel import ParallelChatProcessor
+from .sessions import SessionStore
+from .singleflight import SingleFlight
+
+T = TypeVar("T")
+
+# Default size of the worker pool used for synchronous processor calls
+DEFAULT_MAX_WORKERS = 8
+
+# Entries fetched and written at a time when streaming the whole chat history
+HISTORY_PAGE_SIZE = 256
 
 
 class ChatRequest(BaseModel):
@@ -27,6 +80,7 @@ class ChatRequest(BaseModel):
 
     input: str
     history: List[ChatHistoryEntry] = []
+    sessionid: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -34,6 +88,34 @@ class ChatResponse(BaseModel):
 
     input: str
     output: str
+    sessionid: Optional[str] = None
+
+
+class BatchChatRequest(BaseModel):
+    """Request model for batch chat endpoint"""
+
+    requests: List[ChatRequest]
+
+
+class BatchChatItem(BaseModel):
+    """Result of one request in a batch, with either an output or an error"""
+
+    input: str
+    output: Optional[str] = None
+    sessionid: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchChatResponse(BaseModel):
+    """Response model for batch chat endpoint"""
+
+    responses: List[BatchChatItem]
+
+
+class SessionResponse(BaseModel):
+    """Response model for session creation endpoint"""
+
+    sessionid: str
 
 
 class HealthResponse(BaseModel):
@@ -48,6 +130,13 @@ class ChatHistoryResponse(BaseModel):
     history: List[ChatHistoryEntry]
 
 
+class ChatHistoryPageResponse(BaseModel):
+    """Response model for a page of the chat history"""
+
+    history: List[ChatHistoryEntry]
+    next_cursor: Optional[int] = None
+
+
 def load_processor_class(
     class_path: str, config_file: str
 ) -> Type[OrchaelChatProcessor]:
@@ -105,39 +194,696 @@ def set_env_vars_from_config(config: Dict[str, Any]) -> None:
 # Global processor instance
 processor: Optional[OrchaelChatProcessor] = None
 
+# Configuration the processor was loaded from
+config: Optional[Dict[str, Any]] = None
+
+# Guards creation of the processor instance
+processor_lock = threading.Lock()
+
+# Set once the processor has been created and warmed up
+ready = False
+
+# Worker pool used to run synchronous processor calls off the event loop
+executor: Optional[ThreadPoolExecutor] = None
+
+# Conversation histories kept on the server for clients that send a sessionid
+session_store: Optional[SessionStore] = None
+
+# Coalesces concurrent /chat requests into process_batch calls when configured
+micro_batcher: Optional[MicroBatcher] = None
+
+# Opt-in cache of /chat responses
+response_cache: Optional[ResponseCache] = None
+
+# Shares one processor call between identical concurrent /chat requests
+in_flight: Optional[SingleFlight[ChatOutput]] = None
+
+# Limits concurrent processor calls and sheds load beyond a bounded queue
+admission_limiter: Optional[AdaptiveLimiter] = None
+
+# Hedges slow processor calls when the config has a 'hedging' section
+hedged_processor: Optional[HedgedChatProcessor] = None
+
+# Prometheus-style metrics served by /metrics. They are only updated from the
+# event loop, so plain counters are safe without locks.
+metrics = Registry()
+http_requests = metrics.counter(
+    "orchael_http_requests_total",
+    "HTTP requests by endpoint and status code",
+    ("endpoint", "status"),
+)
+http_request_duration = metrics.histogram(
+    "orchael_http_request_duration_seconds",
+    "Total time to handle an HTTP request",
+    ("endpoint",),
+)
+http_requests_in_flight = metrics.gauge(
+    "orchael_http_requests_in_flight", "HTTP requests currently being handled"
+)
+request_phase_duration = metrics.histogram(
+    "orchael_request_phase_duration_seconds",
+    "Time spent in each phase of a request: queue_wait, validation, "
+    "process and serialization",
+    ("endpoint", "phase"),
+)
+processor_calls_in_flight = metrics.gauge(
+    "orchael_processor_calls_in_flight", "Chat requests currently being processed"
+)
+chat_history_entries = metrics.histogram(
+    "orchael_chat_history_entries",
+    "History entries sent to the processor per chat request",
+    buckets=DEFAULT_SIZE_BUCKETS,
+)
+processor_init_seconds = metrics.gauge(
+    "orchael_processor_init_seconds", "Time taken to load and create the processor"
+)
+processor_warmup_seconds = metrics.gauge(
+    "orchael_processor_warmup_seconds", "Time taken by the processor's warmup hook"
+)
+
+
+def stat(component: Callable[[], Any], key: str) -> Callable[[], Optional[float]]:
+    """Read one value of an optional component's stats() at scrape time"""
+
+    def read() -> Optional[float]:
+        instance = component()
+        return None if instance is None else cast(float, instance.stats()[key])
+
+    return read
+
+
+def register_component_metrics() -> None:
+    """
+    Expose the counters the optional components already keep.
+
+    They are read at scrape time, so requests pay nothing extra for them.
+    """
+    for name, component, key, kind, documentation in (
+        ("sessions", lambda: session_store, "sessions", "gauge", "Active sessions"),
+        (
+            "session_history_bytes",
+            lambda: session_store,
+            "bytes",
+            "gauge",
+            "Characters of history held by sessions",
+        ),
+        ("cache_hits_total", lambda: response_cache, "hits", "counter", "Cache hits"),
+        (
+            "cache_misses_total",
+            lambda: response_cache,
+            "misses",
+            "counter",
+            "Cache misses",
+        ),
+        (
+            "cache_entries",
+            lambda: response_cache,
+            "entries",
+            "gauge",
+            "Cached responses",
+        ),
+        (
+            "coalesced_requests_total",
+            lambda: in_flight,
+            "shared",
+            "counter",
+            "Requests that shared an identical in-flight call",
+        ),
+        (
+            "micro_batches_total",
+            lambda: micro_batcher,
+            "batches",
+            "counter",
+            "Micro-batches sent to the processor",
+        ),
+        (
+            "micro_batch_items_total",
+            lambda: micro_batcher,
+            "items",
+            "counter",
+            "Requests sent to the processor in micro-batches",
+        ),
+        (
+            "admission_limit",
+            lambda: admission_limiter,
+            "limit",
+            "gauge",
+            "Current adaptive concurrency limit",
+        ),
+        (
+            "admission_queue_depth",
+            lambda: admission_limiter,
+            "queue_depth",
+            "gauge",
+            "Requests waiting for an admission slot",
+        ),
+        (
+            "admission_shed_total",
+            lambda: admission_limiter,
+            "shed",
+            "counter",
+            "Requests shed by admission control",
+        ),
+        (
+            "hedged_processor_calls_total",
+            lambda: hedged_processor,
+            "requests",
+            "counter",
+            "Processor calls made through request hedging",
+        ),
+        (
+            "hedges_total",
+            lambda: hedged_processor,
+            "hedges",
+            "counter",
+            "Processor calls that were hedged with a second request",
+        ),
+        (
+            "hedge_wins_total",
+            lambda: hedged_processor,
+            "hedge_wins",
+            "counter",
+            "Hedged calls answered first by the second request",
+        ),
+        (
+            "hedge_delay_ms",
+            lambda: hedged_processor,
+            "delay_ms",
+            "gauge",
+            "Current delay before a call is hedged",
+        ),
+    ):
+        metrics.callback(f"orchael_{name}", documentation, stat(component, key), kind)
+
+
+register_component_metrics()
+
+
+def get_server_config() -> Dict[str, Any]:
+    """Return the optional 'server' section of the loaded config"""
+    if config and isinstance(config.get("server"), dict):
+        return cast(Dict[str, Any], config["server"])
+    return {}
+
+
+def get_max_workers() -> int:
+    """Resolve the worker pool size from ORCHAEL_MAX_WORKERS or the config"""
+    value = os.getenv("ORCHAEL_MAX_WORKERS") or get_server_config().get(
+        "max_workers", DEFAULT_MAX_WORKERS
+    )
+    try:
+        max_workers = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"max_workers must be an integer, got {value!r}")
+
+    if max_workers < 1:
+        raise ValueError("max_workers must be at least 1")
+
+    return max_workers
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Get or create the bounded worker pool"""
+    global executor
+    if executor is None:
+        executor = ThreadPoolExecutor(
+            max_workers=get_max_workers(), thread_name_prefix="orchael-worker"
+        )
+    return executor
+
+
+async def run_in_worker(func: Callable[..., T], *args: Any) -> T:
+    """Run a blocking call on the worker pool so the event loop stays responsive"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), func, *args)
+
+
+def shutdown_executor() -> None:
+    """Shut down the worker pool, waiting for in-flight calls to finish"""
+    global executor
+    if executor is not None:
+        executor.shutdown(wait=True)
+        executor = None
+
+
+def get_session_store() -> SessionStore:
+    """Get or create the session store configured by 'server.sessions'"""
+    global session_store
+    if session_store is None:
+        settings = get_server_config().get("sessions") or {}
+        session_store = SessionStore(
+            max_sessions=int(settings.get("max_sessions", 1000)),
+            ttl_seconds=settings.get("ttl_seconds", 3600),
+            max_entries=settings.get("max_entries"),
+            max_bytes=settings.get("max_bytes"),
+        )
+    return session_store
+
+
+def build_chat_input(request: ChatRequest) -> ChatInput:
+    """Create the processor input, using server-side history for sessions"""
+    if request.sessionid is None:
+        history = request.history
+    else:
+        # A new session starts from any history the client sent along. The
+        # processor gets a copy, so the session only changes once the turn is
+        # recorded and other turns never change the list it was given.
+        history = list(
+            get_session_store().get_or_create(request.sessionid, request.history)
+        )
+    chat_history_entries.observe(len(history))
+    return ChatInput(input=request.input, history=history)
+
+
+def record_session_turn(request: ChatRequest, output: str) -> None:
+    """Append a completed turn to the request's session, if it has one"""
+    if request.sessionid is not None:
+        get_session_store().append(
+            request.sessionid, {"input": request.input, "output": output}
+        )
+
+
+async def call_process_chat(
+    proc: OrchaelChatProcessor, chat_input: ChatInput
+) -> ChatOutput:
+    """Await native async processors, run synchronous ones on the worker pool"""
+    if overrides(proc, "aprocess_chat"):
+        return await proc.aprocess_chat(chat_input)
+    return await run_in_worker(proc.process_chat, chat_input)
+
+
+async def call_get_history(proc: OrchaelChatProcessor) -> List[ChatHistoryEntry]:
+    """Await native async history, run synchronous get_history on the worker pool"""
+    if overrides(proc, "aget_history"):
+        return await proc.aget_history()
+    return await run_in_worker(proc.get_history)
+
+
+def reads_history_pages(proc: OrchaelChatProcessor) -> bool:
+    """Check whether a processor can read its history a page at a time"""
+    if overrides(proc, "get_history_page"):
+        return True
+    # The default get_history_page reads pages from the history store
+    return getattr(proc, "history_store", None) is not None and not overrides(
+        proc, "get_history"
+    )
+
+
+async def call_get_history_page(
+    proc: OrchaelChatProcessor, cursor: int, limit: Optional[int]
+) -> ChatHistoryPage:
+    """Fetch one page of history, slicing the full history if the processor can't"""
+    if reads_history_pages(proc):
+        return await run_in_worker(proc.get_history_page, cursor, limit)
+    return history_page(await call_get_history(proc), cursor, limit)
+
+
+async def iter_history_pages(
+    proc: OrchaelChatProcessor, cursor: int
+) -> AsyncIterator[List[ChatHistoryEntry]]:
+    """Yield the history from ``cursor`` onwards in pages of HISTORY_PAGE_SIZE"""
+    if reads_history_pages(proc):
+        next_cursor: Optional[int] = cursor
+        while next_cursor is not None:
+            page = await call_get_history_page(proc, next_cursor, HISTORY_PAGE_SIZE)
+            yield page["history"]
+            next_cursor = page["next_cursor"]
+    else:
+        # Without a paging hook the history is fetched once and sliced
+        history = await call_get_history(proc)
+        for start in range(cursor, len(history), HISTORY_PAGE_SIZE):
+            yield history[start : start + HISTORY_PAGE_SIZE]
+
+
+def format_history_entries(entries: List[ChatHistoryEntry]) -> str:
+    """Serialize history entries as comma-separated JSON objects"""
+    return ",".join(
+        json.dumps(
+            {"input": entry["input"], "output": entry["output"]},
+            separators=(",", ":"),
+        )
+        for entry in entries
+    )
+
+
+async def call_process_batch(
+    proc: OrchaelChatProcessor, chat_inputs: List[ChatInput]
+) -> List[ChatOutput]:
+    """Use the processor's batch hooks, or fan out to process_chat concurrently"""
+    if overrides(proc, "aprocess_batch"):
+        return await proc.aprocess_batch(chat_inputs)
+    if overrides(proc, "process_batch"):
+        return await run_in_worker(proc.process_batch, chat_inputs)
+    return list(
+        await asyncio.gather(
+            *(call_process_chat(proc, chat_input) for chat_input in chat_inputs)
+        )
+    )
+
+
+async def call_process_batch_items(
+    proc: OrchaelChatProcessor, chat_inputs: List[ChatInput]
+) -> List[Union[ChatOutput, Exception]]:
+    """
+    Process a batch, returning each input's output or the error it failed with.
+
+    A processor's batch hooks get the whole batch and fail it as a whole;
+    without them a failing process_chat call fails only its own input.
+    """
+    if overrides(proc, "aprocess_batch") or overrides(proc, "process_batch"):
+        return list(await call_process_batch(proc, chat_inputs))
+
+    results = await asyncio.gather(
+        *(call_process_chat(proc, chat_input) for chat_input in chat_inputs),
+        return_exceptions=True,
+    )
+    outputs: List[Union[ChatOutput, Exception]] = []
+    for result in results:
+        if isinstance(result, Exception) or not isinstance(result, BaseException):
+            outputs.append(result)
+        else:
+            raise result
+    return outputs
+
+
+def get_micro_batcher(proc: OrchaelChatProcessor) -> Optional[MicroBatcher]:
+    """
+    Get the micro-batcher configured by 'server.micro_batching', if any.
+
+    Batching only pays off for processors with their own batch hooks, so other
+    processors are always called directly.
+    """
+    global micro_batcher
+    settings = get_server_config().get("micro_batching")
+    if not isinstance(settings, dict) or not settings.get("enabled", True):
+        return None
+    if not (overrides(proc, "aprocess_batch") or overrides(proc, "process_batch")):
+        return None
+
+    if micro_batcher is None:
+
+        async def process_batch(chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+            return await call_process_batch(proc, chat_inputs)
+
+        micro_batcher = MicroBatcher(
+            process_batch,
+            max_batch_size=int(settings.get("max_batch_size", 16)),
+            max_wait_ms=float(settings.get("max_wait_ms", 5.0)),
+        )
+    return micro_batcher
+
+
+def get_response_cache(proc: OrchaelChatProcessor) -> Optional[ResponseCache]:
+    """Get the response cache configured by 'server.cache', if the processor allows"""
+    global response_cache
+    settings = get_server_config().get("cache")
+    if not isinstance(settings, dict) or not settings.get("enabled", True):
+        return None
+    if not getattr(proc, "cacheable", True):
+        return None
+
+    if response_cache is None:
+        response_cache = ResponseCache(
+            max_entries=int(settings.get("max_entries", 1024)),
+            ttl_seconds=settings.get("ttl_seconds", 300),
+            max_bytes=settings.get("max_bytes"),
+        )
+    return response_cache
+
+
+def get_single_flight(proc: OrchaelChatProcessor) -> Optional[SingleFlight[ChatOutput]]:
+    """Get the request coalescer enabled by 'server.coalesce', if the processor allows"""
+    global in_flight
+    if not get_server_config().get("coalesce", False):
+        return None
+    # Sharing a result is only valid when it depends on the input and history
+    if not getattr(proc, "cacheable", True):
+        return None
+
+    if in_flight is None:
+        in_flight = SingleFlight()
+    return in_flight
+
+
+def chat_key(proc: OrchaelChatProcessor, chat_input: ChatInput) -> str:
+    """Digest identifying a chat request to this processor and config"""
+    processor_class = f"{type(proc).__module__}.{type(proc).__qualname__}"
+    return cache_key(processor_class, (config or {}).get("env"), chat_input)
+
+
+def record_processor_history(proc: OrchaelChatProcessor, result: ChatOutput) -> None:
+    """Record a turn the processor did not answer itself, e.g. a cache hit"""
+    record = getattr(proc, "record_history", None)
+    if record is not None:
+        record({"input": result["input"], "output": result["output"]})
+
+
+def get_admission_limiter() -> Optional[AdaptiveLimiter]:
+    """Get the concurrency limiter configured by 'server.admission', if any"""
+    global admission_limiter
+    settings = get_server_config().get("admission")
+    if not isinstance(settings, dict) or not settings.get("enabled", True):
+        return None
+
+    if admission_limiter is None:
+        admission_limiter = AdaptiveLimiter(
+            initial_limit=int(settings.get("initial_limit", 8)),
+            min_limit=int(settings.get("min_limit", 1)),
+            max_limit=int(settings.get("max_limit", 256)),
+            max_queue=int(settings.get("max_queue", 64)),
+            queue_timeout_ms=settings.get("queue_timeout_ms"),
+            target_latency_ms=settings.get("target_latency_ms"),
+            tolerance=float(settings.get("tolerance", 2.0)),
+            backoff=float(settings.get("backoff", 0.9)),
+        )
+    return admission_limiter
+
+
+@asynccontextmanager
+async def admitted(requests: int = 1) -> AsyncIterator[None]:
+    """Hold an admission slot when admission control is enabled"""
+    limiter = get_admission_limiter()
+    if limiter is None:
+        yield
+    else:
+        waiting = time.perf_counter()
+        async with limiter.slot(requests):
+            record_phase("queue_wait", time.perf_counter() - waiting)
+            yield
+
+
+@asynccontextmanager
+async def processing() -> AsyncIterator[None]:
+    """Count a processor call as in flight and time it as the process phase"""
+    processor_calls_in_flight.inc()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        processor_calls_in_flight.dec()
+        record_phase("process", time.perf_counter() - start)
+
+
+async def dispatch_chat(
+    proc: OrchaelChatProcessor, chat_input: ChatInput
+) -> ChatOutput:
+    """Process a single chat input through admission control and micro-batching"""
+    async with admitted(), processing():
+        batcher = get_micro_batcher(proc)
+        if batcher is not None:
+            return await batcher.submit(chat_input)
+        return await call_process_chat(proc, chat_input)
+
+
+async def answer_chat(proc: OrchaelChatProcessor, chat_input: ChatInput) -> ChatOutput:
+    """
+    Answer a /chat request from the cache, a shared in-flight call or the processor.
+
+    Turns answered without the processor running for this request are still
+    recorded to its history.
+    """
+    cache = get_response_cache(proc)
+    flights = get_single_flight(proc)
+    if cache is None and flights is None:
+        return await dispatch_chat(proc, chat_input)
+
+    key = chat_key(proc, chat_input)
+    if cache is not None:
+        cached = cache.get(key)
+        if cached is not None:
+            record_processor_history(proc, cached)
+            return cached
+
+    if flights is None:
+        result = await dispatch_chat(proc, chat_input)
+    else:
+        result, shared = await flights.do(key, lambda: dispatch_chat(proc, chat_input))
+        if shared:
+            record_processor_history(proc, result)
+            return result
+
+    if cache is not None:
+        cache.set(key, result)
+    return result
+
+
+async def stream_process_chat(
+    proc: OrchaelChatProcessor, chat_input: ChatInput
+) -> AsyncIterator[str]:
+    """Yield output chunks from the processor's streaming hooks"""
+    if overrides(proc, "astream_chat"):
+        async for chunk in proc.astream_chat(chat_input):
+            yield chunk
+    elif overrides(proc, "stream_chat"):
+        # Pull each chunk on the worker pool so a blocking generator never
+        # stalls the event loop
+        chunks = proc.stream_chat(chat_input)
+        while True:
+            chunk = await run_in_worker(next, chunks, None)
+            if chunk is None:
+                break
+            yield chunk
+    else:
+        # Processors that cannot stream produce the whole output as one chunk
+        yield (await call_process_chat(proc, chat_input))["output"]
+
+
+def format_sse(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """Format a payload as a Server-Sent Events message"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+class ReleasingStreamingResponse(StreamingResponse):
+    """
+    Streaming response that calls ``release`` once it is over, however it ends.
+
+    Unlike a finally block in the body generator, this also runs when the
+    client disconnects before the body has started.
+    """
+
+    def __init__(
+        self, content: AsyncIterator[str], release: Callable[[], None], **kwargs: Any
+    ) -> None:
+        super().__init__(content, **kwargs)
+        self.release = release
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            self.release()
+
 
 def get_processor() -> OrchaelChatProcessor:
     """Get or create the processor instance"""
-    global processor
-    if processor is None:
-        # Load configuration
-        config_data = load_config()
-        processor_class_path = config_data["processor_class"]
+    global processor, config, hedged_processor
+    if processor is not None:
+        return processor
 
-        # Set environment variables from config before loading processor
-        set_env_vars_from_config(config_data)
+    # Concurrent first callers must not build several instances
+    with processor_lock:
+        if processor is None:
+            # Load configuration
+            config_data = load_config()
+            config = config_data
+            processor_class_path = config_data["processor_class"]
 
-        # Load processor class
-        config_file = os.getenv("ORCHAEL_CONFIG_FILE", "config.yaml")
-        processor_class = load_processor_class(processor_class_path, config_file)
+            # Set environment variables from config before loading processor
+            set_env_vars_from_config(config_data)
 
-        # Create processor instance
-        try:
-            processor = processor_class()
-        except Exception as e:
-            raise HTTPException(
-                status_code=500, detail=f"Error creating processor instance: {e}"
+            # Load processor class
+            config_file = os.getenv("ORCHAEL_CONFIG_FILE", "config.yaml")
+            processor_class = load_processor_class(processor_class_path, config_file)
+
+            # Create processor instance
+            start = time.perf_counter()
+            try:
+                processor = processor_class()
+            except Exception as e:
+                raise HTTPException(
+                    status_code=500, detail=f"Error creating processor instance: {e}"
+                )
+            processor_init_seconds.set(time.perf_counter() - start)
+
+            # A configured history store replaces the processor's default
+            history_settings = config_data.get("history")
+            if isinstance(history_settings, dict):
+                processor.history_store = create_history_store(history_settings)
+
+            # Middleware runs once per request, outside any hedged calls
+            processor = apply_hedging(processor, config_data.get("hedging"))
+            hedged_processor = (
+                processor if isinstance(processor, HedgedChatProcessor) else None
             )
+            processor = apply_middleware(processor, config_data.get("middleware"))
 
     return processor
 
 
+def close_history_store() -> None:
+    """Write out history the processor's store still has buffered"""
+    store = getattr(processor, "history_store", None)
+    if store is not None:
+        store.close()
+
+
+async def start_processor() -> None:
+    """Load, instantiate and warm up the processor before serving traffic"""
+    global ready
+    # Load outside the worker pool, whose size comes from the config
+    proc = await asyncio.to_thread(get_processor)
+    # Hedged and parallel calls to synchronous processors share the worker pool
+    wrapped = proc
+    while True:
+        if isinstance(wrapped, (HedgedChatProcessor, ParallelChatProcessor)):
+            wrapped.executor = get_executor()
+        if not isinstance(wrapped, WrapperChatProcessor):
+            break
+        wrapped = wrapped.processor
+    if overrides(proc, "warmup"):
+        start = time.perf_counter()
+        await run_in_worker(proc.warmup)
+        processor_warmup_seconds.set(time.perf_counter() - start)
+    ready = True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    """Start the processor eagerly and release resources on shutdown"""
+    global ready
+    await start_processor()
+    yield
+    # Report not ready first so load balancers stop routing new traffic
+    ready = False
+    shutdown_executor()
+    close_history_store()
+
+
 # Create FastAPI app
 app = FastAPI(
     title="Orchael SDK API",
     description="FastAPI server for Orchael SDK chat processing",
     version="0.1.0",
+    lifespan=lifespan,
 )
+app.add_middleware(
+    MetricsMiddleware,
+    requests=http_requests,
+    duration=http_request_duration,
+    in_flight=http_requests_in_flight,
+    phases=request_phase_duration,
+)
+
+
+@app.exception_handler(Overloaded)
+async def overloaded_handler(request: Request, exc: Overloaded) -> JSONResponse:
+    """Shed requests with 429 when the queue is full, 503 when they timed out"""
+    return JSONResponse(
+        status_code=429 if exc.queue_full else 503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
 
 
 @app.get("/health", response_model=HealthResponse)
@@ -146,39 +892,336 @@ async def health_check() -> HealthResponse:
     return HealthResponse()
 
 
-@app.post("/chat", response_model=ChatResponse)
+@app.get("/ready", response_model=HealthResponse)
+async def readiness_check() -> Any:
+    """Readiness endpoint that only succeeds once the processor is warmed up"""
+    if not ready:
+        return JSONResponse(status_code=503, content={"status": "starting"})
+    return HealthResponse(status="ready")
+
+
+@app.post("/chat", response_model=ChatResponse, response_model_exclude_none=True)
 async def process_chat(request: ChatRequest) -> ChatResponse:
     """Process chat input and return response"""
+    mark_handler_start()
     try:
         proc = get_processor()
-        chat_input = ChatInput(input=request.input, history=request.history)
-        result = proc.process_chat(chat_input)
+        chat_input = build_chat_input(request)
+        result = await answer_chat(proc, chat_input)
+        record_session_turn(request, result["output"])
 
-        return ChatResponse(input=result["input"], output=result["output"])
+        response = ChatResponse(
+            input=result["input"], output=result["output"], sessionid=request.sessionid
+        )
+        mark_handler_end()
+        return response
+    except Overloaded:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {e}")
 
 
-@app.get("/chat/history", response_model=ChatHistoryResponse)
-async def get_chat_history() -> ChatHistoryResponse:
-    """Get chat history"""
+@app.post(
+    "/chat/batch", response_model=BatchChatResponse, response_model_exclude_none=True
+)
+async def process_chat_batch(request: BatchChatRequest) -> BatchChatResponse:
+    """Process several chat inputs in one round trip"""
+    mark_handler_start()
+    try:
+        proc = get_processor()
+        chat_inputs = [build_chat_input(item) for item in request.requests]
+        async with admitted(len(chat_inputs)), processing():
+            results = await call_process_batch_items(proc, chat_inputs)
+        if len(results) != len(chat_inputs):
+            raise ValueError(
+                f"process_batch returned {len(results)} outputs "
+                f"for {len(chat_inputs)} inputs"
+            )
+
+        responses = []
+        for item, result in zip(request.requests, results):
+            if isinstance(result, Exception):
+                responses.append(
+                    BatchChatItem(
+                        input=item.input,
+                        sessionid=item.sessionid,
+                        error=f"Error processing chat: {result}",
+                    )
+                )
+                continue
+            record_session_turn(item, result["output"])
+            responses.append(
+                BatchChatItem(
+                    input=result["input"],
+                    output=result["output"],
+                    sessionid=item.sessionid,
+                )
+            )
+        mark_handler_end()
+        return BatchChatResponse(responses=responses)
+    except Overloaded:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing batch: {e}")
+
+
+@app.post("/chat/stream")
+async def stream_chat(request: ChatRequest) -> StreamingResponse:
+    """Process chat input and stream the output as Server-Sent Events"""
     try:
         proc = get_processor()
-        history = proc.get_history()
-        return ChatHistoryResponse(history=history)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat: {e}")
+
+    chat_input = build_chat_input(request)
+
+    # Admit before responding so a shed request gets a real 429/503 status
+    limiter = get_admission_limiter()
+    if limiter is not None:
+        waiting = time.perf_counter()
+        await limiter.acquire()
+        record_phase("queue_wait", time.perf_counter() - waiting)
+    start = time.monotonic()
+    # The limiter adapts to the time to the first chunk, not the whole stream
+    first_chunk_ms: Optional[float] = None
+
+    def release() -> None:
+        if limiter is not None:
+            limiter.release(first_chunk_ms)
+
+    async def events() -> AsyncIterator[str]:
+        nonlocal first_chunk_ms
+        chunks: List[str] = []
+        processor_calls_in_flight.inc()
+        try:
+            async for chunk in stream_process_chat(proc, chat_input):
+                if first_chunk_ms is None:
+                    first_chunk_ms = (time.monotonic() - start) * 1000
+                chunks.append(chunk)
+                yield format_sse({"chunk": chunk})
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            yield format_sse({"error": f"Error processing chat: {e}"}, "error")
+            return
+        finally:
+            processor_calls_in_flight.dec()
+            record_phase("process", time.monotonic() - start)
+
+        output = "".join(chunks)
+        record_session_turn(request, output)
+        done: Dict[str, Any] = {"input": request.input, "output": output}
+        if request.sessionid is not None:
+            done["sessionid"] = request.sessionid
+        yield format_sse(done, "done")
+
+    # The slot is held until the response is over, even if it never started
+    return ReleasingStreamingResponse(
+        events(),
+        release,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/chat/history", response_model=ChatHistoryPageResponse)
+async def get_chat_history(
+    cursor: int = Query(0, ge=0), limit: Optional[int] = Query(None, ge=1)
+) -> Any:
+    """
+    Get chat history.
+
+    With a ``limit`` a single page is returned along with the cursor of the
+    next one. Otherwise the history from ``cursor`` onwards is streamed a page
+    at a time, so the whole body is never built in memory.
+    """
+    try:
+        proc = get_processor()
+        if limit is not None:
+            page = await call_get_history_page(proc, cursor, limit)
+            return ChatHistoryPageResponse(
+                history=page["history"], next_cursor=page["next_cursor"]
+            )
+
+        pages = iter_history_pages(proc, cursor)
+        # Fetch the first page up front so errors still get a 500 status
+        first = await pages.__anext__()
+    except StopAsyncIteration:
+        return ChatHistoryResponse(history=[])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error getting chat history: {e}")
 
+    async def body() -> AsyncIterator[str]:
+        yield '{"history":[' + format_history_entries(first)
+        written = bool(first)
+        async for entries in pages:
+            if entries:
+                yield ("," if written else "") + format_history_entries(entries)
+                written = True
+        yield "]}"
+
+    return StreamingResponse(body(), media_type="application/json")
+
+
+@app.post("/sessions", response_model=SessionResponse)
+async def create_session() -> SessionResponse:
+    """Start a server-side conversation and return its session ID"""
+    sessionid = uuid.uuid4().hex
+    get_session_store().get_or_create(sessionid)
+    return SessionResponse(sessionid=sessionid)
+
+
+@app.get("/sessions/{sessionid}", response_model=ChatHistoryResponse)
+async def get_session_history(sessionid: str) -> ChatHistoryResponse:
+    """Get the history of a server-side conversation"""
+    history = get_session_store().get(sessionid)
+    if history is None:
+        raise HTTPException(status_code=404, detail=f"Session {sessionid} not found")
+    return ChatHistoryResponse(history=history)
+
+
+@app.delete("/sessions/{sessionid}", status_code=204)
+async def delete_session(sessionid: str) -> None:
+    """End a server-side conversation and free its history"""
+    if not get_session_store().delete(sessionid):
+        raise HTTPException(status_code=404, detail=f"Session {sessionid} not found")
+
+
+@app.get("/cache/stats")
+async def get_cache_stats() -> Dict[str, int]:
+    """Get response cache hit/miss counters and size"""
+    if response_cache is None:
+        raise HTTPException(status_code=404, detail="Response cache is not enabled")
+    return response_cache.stats()
+
+
+@app.get("/admission/stats")
+async def get_admission_stats() -> Dict[str, int]:
+    """Get the adaptive concurrency limit, queue depth and shed count"""
+    if admission_limiter is None:
+        raise HTTPException(status_code=404, detail="Admission control is not enabled")
+    return admission_limiter.stats()
+
+
+@app.get("/hedging/stats")
+async def get_hedging_stats() -> Dict[str, float]:
+    """Get how often processor calls were hedged and the hedge won"""
+    if hedged_processor is None:
+        raise HTTPException(status_code=404, detail="Request hedging is not enabled")
+    return hedged_processor.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    """Expose server metrics in the Prometheus text format"""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def create_listen_socket(host: str, port: int) -> socket.socket:
+    """Bind the listening socket shared by all worker processes"""
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve_worker(sock: socket.socket, host: str, port: int) -> None:
+    """Serve requests from an inherited listening socket in a worker process"""
+    uvicorn.Server(uvicorn.Config(app, host=host, port=port)).run(sockets=[sock])
+
+
+def fork_worker(sock: socket.socket, host: str, port: int) -> int:
+    """Fork a worker process and return its pid in the parent"""
+    pid = os.fork()
+    if pid == 0:
+        exit_code = 0
+        try:
+            serve_worker(sock, host, port)
+        except BaseException:
+            exit_code = 1
+        finally:
+            os._exit(exit_code)
+    return pid
+
+
+def run_prefork(host: str, port: int, workers: int) -> None:
+    """
+    Run several worker processes that share a processor built once in the master.
+
+    The processor module and its dependencies are imported and instantiated
+    before forking, and the resulting heap is frozen out of the garbage
+    collector so collections in the workers never write to (and copy) the
+    shared pages.
+    """
+    if not hasattr(os, "fork"):
+        raise ValueError("Multiple workers require a platform that supports fork")
+
+    get_processor()
+    # The worker pool's threads would not survive the fork
+    shutdown_executor()
+    gc.collect()
+    gc.freeze()
+
+    sock = create_listen_socket(host, port)
+    children = {fork_worker(sock, host, port) for _ in range(workers)}
+    stopping = False
+
+    def stop(signum: int, frame: Any) -> None:
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    previous_handlers = {
+        sig: signal.signal(sig, stop) for sig in (signal.SIGINT, signal.SIGTERM)
+    }
+    try:
+        while children:
+            try:
+                pid, status = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            children.discard(pid)
+
+            # Replace workers that crashed; a clean exit means shutdown
+            if not stopping and os.waitstatus_to_exitcode(status) != 0:
+                click.echo(f"Worker {pid} exited unexpectedly, restarting", err=True)
+                children.add(fork_worker(sock, host, port))
+    finally:
+        for sig, handler in previous_handlers.items():
+            signal.signal(sig, handler)
+        sock.close()
+
 
 def run_server(
-    host: str = "0.0.0.0", port: int = 8000, config_file: str = "config.yaml"
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    config_file: str = "config.yaml",
+    max_workers: Optional[int] = None,
+    workers: int = 1,
 ) -> None:
     """Run the FastAPI server"""
     # Set config file path for loading
     os.environ["ORCHAEL_CONFIG_FILE"] = config_file
 
+    # A worker pool size given on the command line overrides the config file
+    if max_workers is not None:
+        os.environ["ORCHAEL_MAX_WORKERS"] = str(max_workers)
+
     # Start the server
-    uvicorn.run(app, host=host, port=port)
+    if workers > 1:
+        run_prefork(host, port, workers)
+    else:
+        uvicorn.run(app, host=host, port=port)
 
 
 @click.command()
@@ -194,7 +1237,22 @@ def run_server(
     default="config.yaml",
     help="Path to YAML configuration file (default: config.yaml)",
 )
-def server_cli(host: str, port: int, config: str) -> None:
+@click.option(
+    "--max-workers",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Threads used for synchronous processor calls (default: config or 8)",
+)
+@click.option(
+    "--workers",
+    "-w",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Worker processes sharing a preloaded processor (default: 1)",
+)
+def server_cli(
+    host: str, port: int, config: str, max_workers: Optional[int], workers: int
+) -> None:
     """Run the Orchael SDK FastAPI server"""
     # Check if config file exists
     if not os.path.exists(config):
@@ -207,10 +1265,18 @@ def server_cli(host: str, port: int, config: str) -> None:
 
     click.echo(f"Starting Orchael SDK server on {host}:{port}")
     click.echo(f"Using config file: {config}")
+    if workers > 1:
+        click.echo(f"Running {workers} worker processes")
     click.echo("Press Ctrl+C to stop the server")
 
     try:
-        run_server(host=host, port=port, config_file=config)
+        run_server(
+            host=host,
+            port=port,
+            config_file=config,
+            max_workers=max_workers,
+            workers=workers,
+        )
     except KeyboardInterrupt:
         click.echo("\nServer stopped by user")
     except Exception as e:
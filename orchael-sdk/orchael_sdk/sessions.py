@@ -0,0 +1,151 @@
+"""
+Server-side conversation sessions for Orchael SDK
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+from .chat_types import ChatHistoryEntry
+from .history import entry_size
+
+
+@dataclass
+class Session:
+    """History and bookkeeping for a single conversation"""
+
+    history: List[ChatHistoryEntry] = field(default_factory=list)
+    size: int = 0
+    last_access: float = 0.0
+
+
+class SessionStore:
+    """
+    In-memory conversation histories keyed by session ID.
+
+    Sessions expire after ``ttl_seconds`` without being used and the least
+    recently used sessions are evicted once ``max_sessions`` or ``max_bytes``
+    is exceeded. ``max_entries`` caps the number of turns kept per session,
+    dropping the oldest first.
+
+    The store is not thread-safe; the server only uses it from the event loop.
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = 1000,
+        ttl_seconds: Optional[float] = 3600,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        if max_entries is not None and max_entries < 1:
+            raise ValueError("max_entries must be at least 1")
+
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._clock = clock
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+        self._size = 0
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    @property
+    def size(self) -> int:
+        """Approximate number of characters held across all sessions"""
+        return self._size
+
+    def get(self, session_id: str) -> Optional[List[ChatHistoryEntry]]:
+        """Return the history of a live session, refreshing its TTL"""
+        session = self._touch(session_id)
+        return session.history if session is not None else None
+
+    def get_or_create(
+        self, session_id: str, seed: Optional[List[ChatHistoryEntry]] = None
+    ) -> List[ChatHistoryEntry]:
+        """Return a session's history, starting it from ``seed`` if it is new"""
+        session = self._touch(session_id)
+        if session is None:
+            session = Session(last_access=self._clock())
+            self._sessions[session_id] = session
+            for entry in seed or []:
+                self._add(session, entry)
+            self._trim(session)
+            self._evict(keep=session_id)
+        return session.history
+
+    def append(self, session_id: str, entry: ChatHistoryEntry) -> None:
+        """Add a turn to a session, creating the session if needed"""
+        self.get_or_create(session_id)
+        session = self._sessions[session_id]
+        self._add(session, entry)
+        self._trim(session)
+        self._evict(keep=session_id)
+
+    def delete(self, session_id: str) -> bool:
+        """Remove a session, returning whether it existed"""
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        self._size -= session.size
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of sessions and the characters they hold"""
+        return {"sessions": len(self._sessions), "bytes": self._size}
+
+    def _expired(self, session: Session) -> bool:
+        return (
+            self.ttl_seconds is not None
+            and self._clock() - session.last_access > self.ttl_seconds
+        )
+
+    def _touch(self, session_id: str) -> Optional[Session]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._expired(session):
+            self.delete(session_id)
+            return None
+        session.last_access = self._clock()
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def _add(self, session: Session, entry: ChatHistoryEntry) -> None:
+        size = entry_size(entry)
+        session.history.append(entry)
+        session.size += size
+        self._size += size
+
+    def _trim(self, session: Session) -> None:
+        if self.max_entries is None or len(session.history) <= self.max_entries:
+            return
+        excess = len(session.history) - self.max_entries
+        removed = sum(entry_size(entry) for entry in session.history[:excess])
+        del session.history[:excess]
+        session.size -= removed
+        self._size -= removed
+
+    def _evict(self, keep: str) -> None:
+        """Drop expired sessions, then least recently used ones over the caps"""
+        # Sessions are ordered by last access, so expired ones are at the front
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if oldest_id == keep or not self._expired(oldest):
+                break
+            self.delete(oldest_id)
+
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions
+            or (self.max_bytes is not None and self._size > self.max_bytes)
+        ):
+            oldest_id = next(iter(self._sessions))
+            if oldest_id == keep:
+                break
+            self.delete(oldest_id)
@@ -0,0 +1,58 @@
+"""
+Single-flight coalescing of identical in-flight requests for Orchael SDK
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight(Generic[T]):
+    """
+    Share one in-flight call between concurrent callers with the same key.
+
+    The first caller for a key starts the call; callers arriving before it
+    finishes wait for the same result instead of starting their own. The call
+    runs as a separate task, so a caller that gives up (e.g. a disconnected
+    client) does not cancel it for the others.
+
+    Instances must only be used from a single event loop.
+    """
+
+    def __init__(self) -> None:
+        self._calls: Dict[str, "asyncio.Task[T]"] = {}
+        self.calls = 0
+        self.shared = 0
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+    async def do(self, key: str, func: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Return the result of ``func`` for ``key`` and whether it was shared.
+
+        ``shared`` is True for callers that joined a call started by another.
+        """
+        task = self._calls.get(key)
+        shared = task is not None
+        if task is None:
+            task = asyncio.ensure_future(func())
+            self._calls[key] = task
+            task.add_done_callback(lambda done: self._finish(key, done))
+            self.calls += 1
+        else:
+            self.shared += 1
+
+        return await asyncio.shield(task), shared
+
+    def stats(self) -> Dict[str, int]:
+        """Return the number of calls made, callers that shared one and in-flight"""
+        return {"calls": self.calls, "shared": self.shared, "in_flight": len(self)}
+
+    def _finish(self, key: str, task: "asyncio.Task[T]") -> None:
+        if self._calls.get(key) is task:
+            del self._calls[key]
+        # Mark the exception as retrieved in case every caller gave up
+        if not task.cancelled():
+            task.exception()
@@ -0,0 +1,160 @@
+"""
+Tests for admission control
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from orchael_sdk.admission import AdaptiveLimiter, Overloaded
+
+
+class TestAdaptiveLimiter:
+    """Test AdaptiveLimiter"""
+
+    def test_admits_up_to_limit_then_queues(self) -> None:
+        """Test requests beyond the limit wait for a free slot"""
+        limiter = AdaptiveLimiter(initial_limit=2, max_queue=5)
+        order: List[str] = []
+
+        async def request(name: str) -> None:
+            async with limiter.slot():
+                order.append(f"start {name}")
+                await asyncio.sleep(0.01)
+                order.append(f"end {name}")
+
+        async def run() -> None:
+            tasks = [asyncio.ensure_future(request(str(i))) for i in range(3)]
+            await asyncio.sleep(0.001)
+            assert limiter.in_flight == 2
+            assert limiter.queue_depth == 1
+            await asyncio.gather(*tasks)
+
+        asyncio.run(run())
+
+        assert order.index("start 2") > order.index("end 0")
+        assert limiter.stats()["accepted"] == 3
+        assert limiter.in_flight == 0
+
+    def test_sheds_when_queue_is_full(self) -> None:
+        """Test requests beyond the queue are rejected immediately"""
+        limiter = AdaptiveLimiter(initial_limit=1, max_queue=1)
+
+        async def run() -> Overloaded:
+            await limiter.acquire()
+            queued = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            with pytest.raises(Overloaded) as excinfo:
+                await limiter.acquire()
+            limiter.release()
+            await queued
+            limiter.release()
+            return excinfo.value
+
+        error = asyncio.run(run())
+
+        assert error.queue_full is True
+        assert error.retry_after >= 1
+        assert limiter.stats()["shed"] == 1
+        assert limiter.in_flight == 0
+
+    def test_queue_timeout(self) -> None:
+        """Test queued requests are shed after the queue timeout"""
+        limiter = AdaptiveLimiter(initial_limit=1, max_queue=5, queue_timeout_ms=10)
+
+        async def run() -> Overloaded:
+            await limiter.acquire()
+            with pytest.raises(Overloaded) as excinfo:
+                await limiter.acquire()
+            limiter.release()
+            return excinfo.value
+
+        error = asyncio.run(run())
+
+        assert error.queue_full is False
+        assert limiter.queue_depth == 0
+        assert limiter.in_flight == 0
+
+    def test_cancelled_waiter_leaves_queue(self) -> None:
+        """Test a cancelled queued request does not hold a slot"""
+        limiter = AdaptiveLimiter(initial_limit=1, max_queue=5)
+
+        async def run() -> None:
+            await limiter.acquire()
+            waiter = asyncio.ensure_future(limiter.acquire())
+            await asyncio.sleep(0)
+            waiter.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await waiter
+            limiter.release()
+
+        asyncio.run(run())
+
+        assert limiter.queue_depth == 0
+        assert limiter.in_flight == 0
+
+    def test_limit_grows_when_latency_is_low(self) -> None:
+        """Test the limit increases additively while latency stays on target"""
+        limiter = AdaptiveLimiter(initial_limit=4, target_latency_ms=100)
+
+        for _ in range(8):
+            limiter.in_flight += 1
+            limiter.release(50)
+
+        assert 5 <= limiter.limit < 6
+
+    def test_limit_backs_off_when_latency_is_high(self) -> None:
+        """Test the limit shrinks multiplicatively on slow requests"""
+        limiter = AdaptiveLimiter(
+            initial_limit=10, min_limit=2, target_latency_ms=100, backoff=0.5
+        )
+
+        limiter.in_flight += 1
+        limiter.release(500)
+        assert limiter.limit == 5
+
+        for _ in range(5):
+            limiter.in_flight += 1
+            limiter.release(500)
+        assert limiter.limit == 2
+
+    def test_limit_adapts_to_baseline_latency(self) -> None:
+        """Test without a target the threshold follows the lowest latency seen"""
+        limiter = AdaptiveLimiter(initial_limit=10, tolerance=2.0, backoff=0.5)
+
+        limiter.in_flight += 1
+        limiter.release(10)
+        limiter.in_flight += 1
+        limiter.release(15)
+        assert limiter.limit > 10
+
+        limiter.in_flight += 1
+        limiter.release(100)
+        assert limiter.limit < 10
+
+    def test_slot_times_each_request(self) -> None:
+        """Test a slot serving several requests is timed per request"""
+        ticks = iter([0.0, 1.0])
+        limiter = AdaptiveLimiter(
+            initial_limit=4, target_latency_ms=200, clock=lambda: next(ticks)
+        )
+
+        async def run() -> None:
+            async with limiter.slot(requests=10):
+                pass
+
+        asyncio.run(run())
+
+        assert limiter.limit == 4.25
+
+    def test_invalid_settings(self) -> None:
+        """Test invalid settings are rejected"""
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(initial_limit=0)
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(initial_limit=5, max_limit=4)
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(max_queue=-1)
+        with pytest.raises(ValueError):
+            AdaptiveLimiter(backoff=1.5)
@@ -0,0 +1,121 @@
+"""
+Tests for streaming JSONL batch runs
+"""
+
+import io
+import json
+import threading
+import time
+from typing import Any, Dict, Iterator, List
+
+import pytest
+
+from orchael_sdk.batch_runner import run_batch
+from orchael_sdk.chat_types import ChatInput, ChatOutput
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor
+
+
+class DelayProcessor(OrchaelChatProcessor):
+    """Processor that sleeps for the number of milliseconds in its input"""
+
+    def __init__(self) -> None:
+        self.running = 0
+        self.max_running = 0
+        self._lock = threading.Lock()
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        with self._lock:
+            self.running += 1
+            self.max_running = max(self.max_running, self.running)
+        try:
+            if chat_input["input"] == "fail":
+                raise RuntimeError("boom")
+            time.sleep(int(chat_input["input"]) / 1000)
+            history = chat_input.get("history") or []
+            return ChatOutput(
+                input=chat_input["input"],
+                output=f"{chat_input['input']}/{len(history)}",
+            )
+        finally:
+            with self._lock:
+                self.running -= 1
+
+
+def records(*inputs: str) -> List[str]:
+    """Build JSONL lines for inputs"""
+    return [json.dumps({"input": text}) + "\n" for text in inputs]
+
+
+def results(out: io.StringIO) -> List[Dict[str, Any]]:
+    """Parse the JSONL results written to out"""
+    return [json.loads(line) for line in out.getvalue().splitlines()]
+
+
+class TestRunBatch:
+    """Test run_batch"""
+
+    def test_writes_results_as_they_complete(self) -> None:
+        """Test fast records are written before slow ones"""
+        out = io.StringIO()
+
+        stats = run_batch(DelayProcessor(), records("100", "0"), out, concurrency=2)
+
+        assert [result["output"] for result in results(out)] == ["0/0", "100/0"]
+        assert stats.completed == 2 and stats.errors == 0
+
+    def test_ordered(self) -> None:
+        """Test ordered runs write results in input order"""
+        out = io.StringIO()
+
+        run_batch(
+            DelayProcessor(),
+            records("100", "0", "20"),
+            out,
+            concurrency=3,
+            ordered=True,
+        )
+
+        assert [result["line"] for result in results(out)] == [1, 2, 3]
+
+    def test_errors_are_recorded(self) -> None:
+        """Test failures, bad JSON and bad records become error results"""
+        lines = records("fail") + ["not json\n", "\n", "[1]\n"]
+        lines.append(json.dumps({"id": 7, "input": "0", "history": [{}]}) + "\n")
+        out = io.StringIO()
+
+        stats = run_batch(DelayProcessor(), lines, out, ordered=True)
+
+        fail, bad_json, bad_record, ok = results(out)
+        assert fail["error"] == "boom" and fail["input"] == "fail"
+        assert bad_json["line"] == 2 and bad_json["error"].startswith("Invalid JSON")
+        assert bad_record["line"] == 4 and "error" in bad_record
+        assert ok["id"] == 7 and ok["output"] == "0/1" and "latency_ms" in ok
+        assert stats.completed == 4 and stats.errors == 3
+
+    def test_reads_lazily_with_bounded_concurrency(self) -> None:
+        """Test records are read only as workers free up"""
+        processor = DelayProcessor()
+        read = 0
+
+        def lines() -> Iterator[str]:
+            nonlocal read
+            for line in records(*["5"] * 50):
+                read += 1
+                yield line
+
+        progress: List[int] = []
+
+        def report(stats: object) -> None:
+            # Records read but not yet written never exceed the window
+            progress.append(read - len(progress) - 1)
+
+        run_batch(processor, lines(), io.StringIO(), concurrency=3, progress=report)
+
+        assert processor.max_running <= 3
+        assert max(progress) <= 6
+        assert len(progress) == 50
+
+    def test_invalid_concurrency(self) -> None:
+        """Test concurrency must be positive"""
+        with pytest.raises(ValueError):
+            run_batch(DelayProcessor(), [], io.StringIO(), concurrency=0)
@@ -0,0 +1,108 @@
+"""
+Tests for dynamic micro-batching
+"""
+
+import asyncio
+from typing import List
+
+import pytest
+
+from orchael_sdk.batching import MicroBatcher
+from orchael_sdk.chat_types import ChatInput, ChatOutput
+
+
+class RecordingBatchFunction:
+    """Batch function that records the batches it receives"""
+
+    def __init__(self) -> None:
+        self.batches: List[List[str]] = []
+
+    async def __call__(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        self.batches.append([chat_input["input"] for chat_input in chat_inputs])
+        return [
+            ChatOutput(input=chat_input["input"], output=chat_input["input"].upper())
+            for chat_input in chat_inputs
+        ]
+
+
+async def submit_all(batcher: MicroBatcher, inputs: List[str]) -> List[ChatOutput]:
+    """Submit inputs concurrently and gather their outputs"""
+    return list(
+        await asyncio.gather(
+            *(batcher.submit(ChatInput(input=text, history=None)) for text in inputs)
+        )
+    )
+
+
+class TestMicroBatcher:
+    """Test MicroBatcher"""
+
+    def test_coalesces_concurrent_requests(self) -> None:
+        """Test concurrent requests share a batch and get their own outputs"""
+        batch_function = RecordingBatchFunction()
+        batcher = MicroBatcher(batch_function, max_batch_size=10, max_wait_ms=5)
+
+        results = asyncio.run(submit_all(batcher, ["a", "b", "c"]))
+
+        assert batch_function.batches == [["a", "b", "c"]]
+        assert [result["output"] for result in results] == ["A", "B", "C"]
+        assert batcher.stats()["mean_batch_size"] == 3
+
+    def test_flushes_at_max_batch_size(self) -> None:
+        """Test a full batch is flushed without waiting for the timer"""
+        batch_function = RecordingBatchFunction()
+        batcher = MicroBatcher(batch_function, max_batch_size=2, max_wait_ms=10_000)
+
+        results = asyncio.run(submit_all(batcher, ["a", "b", "c", "d"]))
+
+        assert batch_function.batches == [["a", "b"], ["c", "d"]]
+        assert len(results) == 4
+
+    def test_flushes_after_max_wait(self) -> None:
+        """Test a partial batch is flushed once the wait time passes"""
+        batch_function = RecordingBatchFunction()
+        batcher = MicroBatcher(batch_function, max_batch_size=100, max_wait_ms=1)
+
+        result = asyncio.run(batcher.submit(ChatInput(input="a", history=None)))
+
+        assert result["output"] == "A"
+        assert batch_function.batches == [["a"]]
+
+    def test_errors_reach_every_caller(self) -> None:
+        """Test a failing batch raises in every waiting caller"""
+
+        async def failing(chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+            raise RuntimeError("backend down")
+
+        batcher = MicroBatcher(failing, max_batch_size=2)
+
+        async def run() -> List[object]:
+            return list(
+                await asyncio.gather(
+                    batcher.submit(ChatInput(input="a", history=None)),
+                    batcher.submit(ChatInput(input="b", history=None)),
+                    return_exceptions=True,
+                )
+            )
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    def test_mismatched_batch_output(self) -> None:
+        """Test a batch function returning too few outputs is an error"""
+
+        async def short(chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+            return []
+
+        batcher = MicroBatcher(short, max_batch_size=1)
+
+        with pytest.raises(ValueError, match="0 outputs for 1 inputs"):
+            asyncio.run(batcher.submit(ChatInput(input="a", history=None)))
+
+    def test_invalid_settings(self) -> None:
+        """Test invalid limits are rejected"""
+        with pytest.raises(ValueError):
+            MicroBatcher(RecordingBatchFunction(), max_batch_size=0)
+        with pytest.raises(ValueError):
+            MicroBatcher(RecordingBatchFunction(), max_wait_ms=-1)
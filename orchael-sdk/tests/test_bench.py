@@ -0,0 +1,165 @@
+"""
+Tests for the benchmark load generator
+"""
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator, List, Optional
+
+import pytest
+
+from orchael_sdk.bench import (
+    http_target,
+    percentile,
+    processor_target,
+    run_bench,
+    synthetic_history,
+)
+from orchael_sdk.chat_types import ChatInput, ChatOutput
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor
+
+
+class ChunkedProcessor(OrchaelChatProcessor):
+    """Processor that streams two chunks with a pause between them"""
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        return ChatOutput(input=chat_input["input"], output="ab")
+
+    def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+        yield "a"
+        time.sleep(0.02)
+        yield "b"
+
+
+class ChatHandler(BaseHTTPRequestHandler):
+    """Minimal /chat and /chat/stream server; inputs of 'fail' are rejected"""
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if body["input"] == "fail":
+            self.send_error(503, "overloaded")
+            return
+        self.send_response(200)
+        self.end_headers()
+        if self.path == "/chat":
+            self.wfile.write(json.dumps({"output": "ok"}).encode())
+        elif body["input"] == "broken":
+            self.wfile.write(b'event: error\ndata: {"error": "boom"}\n\n')
+        else:
+            self.wfile.write(b'data: {"chunk": "ok"}\n\n')
+            self.wfile.write(b'event: done\ndata: {"output": "ok"}\n\n')
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url() -> Iterator[str]:
+    """Run ChatHandler on a free port"""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def ask(text: str = "hi") -> ChatInput:
+    """Build an input with two turns of history"""
+    return ChatInput(input=text, history=synthetic_history(2))
+
+
+class TestRunBench:
+    """Test run_bench"""
+
+    def test_closed_loop(self) -> None:
+        """Test requests are sent back to back and latencies summarized"""
+        calls: List[ChatInput] = []
+
+        def target(chat_input: ChatInput) -> Optional[float]:
+            calls.append(chat_input)
+            time.sleep(0.01)
+            return None
+
+        result = run_bench(target, ask(), concurrency=2, duration=0.2)
+        report = result.report()
+
+        assert report["requests"] == len(calls) >= 10
+        assert report["errors"] == 0 and report["error_rate"] == 0.0
+        assert report["latency_ms"]["p50"] >= 10
+        assert report["latency_ms"]["max"] >= report["latency_ms"]["p99"]
+        assert "first_chunk_ms" not in report
+        assert len(calls[0]["history"] or []) == 2
+
+    def test_rate(self) -> None:
+        """Test a fixed rate sends the scheduled number of requests"""
+        result = run_bench(lambda chat_input: None, ask(), duration=0.5, rate=20)
+
+        assert result.requests == 10
+
+    def test_late_requests_count_waiting_time(self) -> None:
+        """Test requests waiting for a busy thread include that wait"""
+
+        def target(chat_input: ChatInput) -> Optional[float]:
+            time.sleep(0.05)
+            return None
+
+        result = run_bench(target, ask(), concurrency=1, duration=0.1, rate=100)
+
+        assert max(result.latencies) > 0.1
+
+    def test_errors(self) -> None:
+        """Test failures are counted and sampled"""
+
+        def target(chat_input: ChatInput) -> Optional[float]:
+            raise RuntimeError("down")
+
+        report = run_bench(target, ask(), duration=0.05, rate=100).report()
+
+        assert report["errors"] == report["requests"] == 5
+        assert report["error_rate"] == 1.0
+        assert report["error_samples"] == ["down"] * 5
+        assert report["latency_ms"] is None
+
+    def test_invalid_settings(self) -> None:
+        """Test concurrency, duration and rate must be positive"""
+        for settings in ({"concurrency": 0}, {"duration": 0}, {"rate": -1}):
+            with pytest.raises(ValueError):
+                run_bench(lambda chat_input: None, ask(), **settings)
+
+    def test_percentile(self) -> None:
+        """Test nearest-rank percentiles"""
+        values = [float(i) for i in range(1, 101)]
+
+        assert percentile(values, 0.5) == 50
+        assert percentile(values, 0.99) == 99
+        assert percentile([3.0], 0.95) == 3
+
+
+class TestTargets:
+    """Test the in-process and HTTP targets"""
+
+    def test_processor_stream_times_first_chunk(self) -> None:
+        """Test streaming reports the first chunk before the stream ends"""
+        report = run_bench(
+            processor_target(ChunkedProcessor(), stream=True),
+            ask(),
+            concurrency=1,
+            duration=0.1,
+        ).report()
+
+        assert report["first_chunk_ms"]["p50"] < 20 <= report["latency_ms"]["p50"]
+
+    def test_http(self, server_url: str) -> None:
+        """Test plain and streaming requests to a server"""
+        assert http_target(server_url)(ask()) is None
+        assert http_target(server_url, stream=True)(ask()) is not None
+
+    def test_http_errors(self, server_url: str) -> None:
+        """Test error statuses and error events raise"""
+        with pytest.raises(RuntimeError, match="HTTP 503"):
+            http_target(server_url)(ask("fail"))
+        with pytest.raises(RuntimeError, match="boom"):
+            http_target(server_url, stream=True)(ask("broken"))
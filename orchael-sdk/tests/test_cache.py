@@ -0,0 +1,115 @@
+"""
+Tests for the response cache
+"""
+
+import pytest
+
+from orchael_sdk.cache import ResponseCache, cache_key
+from orchael_sdk.chat_types import ChatInput, ChatOutput
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def output(text: str) -> ChatOutput:
+    """Build a ChatOutput echoing the text"""
+    return ChatOutput(input=text, output=text)
+
+
+class TestCacheKey:
+    """Test cache_key"""
+
+    def test_key_is_stable(self) -> None:
+        """Test equal requests produce equal keys"""
+        chat_input = ChatInput(input="hi", history=[{"input": "a", "output": "b"}])
+        assert cache_key("m.C", {"A": "1"}, chat_input) == cache_key(
+            "m.C", {"A": "1"}, dict(chat_input)  # type: ignore[arg-type]
+        )
+
+    def test_key_covers_every_component(self) -> None:
+        """Test the class, env, input and history all change the key"""
+        base = cache_key("m.C", {"A": "1"}, ChatInput(input="hi", history=None))
+        assert base != cache_key("m.D", {"A": "1"}, ChatInput(input="hi", history=None))
+        assert base != cache_key("m.C", {"A": "2"}, ChatInput(input="hi", history=None))
+        assert base != cache_key("m.C", {"A": "1"}, ChatInput(input="ho", history=None))
+        assert base != cache_key(
+            "m.C",
+            {"A": "1"},
+            ChatInput(input="hi", history=[{"input": "a", "output": "b"}]),
+        )
+
+
+class TestResponseCache:
+    """Test ResponseCache"""
+
+    def test_hit_and_miss_counters(self) -> None:
+        """Test hits and misses are counted"""
+        cache = ResponseCache()
+
+        assert cache.get("k") is None
+        cache.set("k", output("hello"))
+        assert cache.get("k") == output("hello")
+
+        assert cache.stats() == {"hits": 1, "misses": 1, "entries": 1, "bytes": 10}
+
+    def test_ttl_expiry(self) -> None:
+        """Test entries expire after the TTL"""
+        clock = FakeClock()
+        cache = ResponseCache(ttl_seconds=10, clock=clock)
+        cache.set("k", output("hello"))
+
+        clock.now = 9
+        assert cache.get("k") is not None
+
+        clock.now = 10
+        assert cache.get("k") is None
+        assert len(cache) == 0
+
+    def test_lru_eviction(self) -> None:
+        """Test the least recently used entry is evicted first"""
+        cache = ResponseCache(max_entries=2)
+        cache.set("a", output("a"))
+        cache.set("b", output("b"))
+        cache.get("a")
+        cache.set("c", output("c"))
+
+        assert cache.get("b") is None
+        assert cache.get("a") is not None
+        assert cache.get("c") is not None
+
+    def test_max_bytes(self) -> None:
+        """Test entries are evicted to stay under max_bytes"""
+        cache = ResponseCache(max_bytes=10)
+        cache.set("a", output("aaaa"))
+        cache.set("b", output("bbbb"))
+        cache.set("huge", output("x" * 100))
+
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+        assert cache.get("huge") is None
+        assert cache.stats()["bytes"] == 8
+
+    def test_overwrite_and_clear(self) -> None:
+        """Test re-setting a key replaces it and clear empties the cache"""
+        cache = ResponseCache()
+        cache.set("k", output("old"))
+        cache.set("k", output("newer"))
+
+        assert cache.get("k") == output("newer")
+        assert cache.stats()["bytes"] == 10
+
+        cache.clear()
+        assert len(cache) == 0
+        assert cache.stats()["bytes"] == 0
+
+    def test_invalid_max_entries(self) -> None:
+        """Test invalid limits are rejected"""
+        with pytest.raises(ValueError):
+            ResponseCache(max_entries=0)
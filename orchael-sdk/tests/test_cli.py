@@ -2,9 +2,11 @@
 Tests for CLI module
 """
 
+import json
 import os
 import tempfile
 import yaml
+from typing import Any
 from unittest.mock import patch, MagicMock
 
 from orchael_sdk.cli import (
@@ -277,3 +279,236 @@ class TestCLIGroup:
         # Should show help when no args provided (Click exits with 2 for help)
         assert result.exit_code == 2
         assert "Usage:" in result.output
+
+
+class TestChatHistoryStore:
+    """Test the chat command with a configured history store"""
+
+    def test_history_persists_between_runs(self, tmp_path: Any) -> None:
+        """Test turns recorded by one chat run are shown by the next"""
+        from click.testing import CliRunner
+
+        (tmp_path / "cli_store_processor.py").write_text(
+            "from orchael_sdk import OrchaelChatProcessor, ChatOutput\n"
+            "\n"
+            "class StoreProcessor(OrchaelChatProcessor):\n"
+            "    def process_chat(self, chat_input):\n"
+            "        self.record_history({'input': chat_input['input'], 'output': 'ok'})\n"
+            "        return ChatOutput(input=chat_input['input'], output='ok')\n"
+        )
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            yaml.dump(
+                {
+                    "processor_class": "cli_store_processor.StoreProcessor",
+                    "history": {
+                        "backend": "log",
+                        "path": str(tmp_path / "history.jsonl"),
+                    },
+                }
+            )
+        )
+        runner = CliRunner()
+
+        result = runner.invoke(cli, ["chat", "-c", str(config_file), "-i", "hello"])
+        assert result.exit_code == 0
+        assert "Output: ok" in result.output
+
+        result = runner.invoke(cli, ["chat", "-c", str(config_file), "--history"])
+        assert result.exit_code == 0
+        assert "1. Input: hello" in result.output
+
+
+class TestChatRepl:
+    """Test the interactive chat mode"""
+
+    def write_config(self, tmp_path: Any) -> str:
+        """Write a processor that reports the history it receives"""
+        (tmp_path / "cli_repl_processor.py").write_text(
+            "from orchael_sdk import OrchaelChatProcessor, ChatOutput\n"
+            "\n"
+            "class ReplProcessor(OrchaelChatProcessor):\n"
+            "    def process_chat(self, chat_input):\n"
+            "        if chat_input['input'] == 'fail':\n"
+            "            raise RuntimeError('boom')\n"
+            "        history = chat_input['history'] or []\n"
+            "        turns = ','.join(entry['input'] for entry in history)\n"
+            "        output = f\"{chat_input['input']} after [{turns}]\"\n"
+            "        return ChatOutput(input=chat_input['input'], output=output)\n"
+        )
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            yaml.dump({"processor_class": "cli_repl_processor.ReplProcessor"})
+        )
+        return str(config_file)
+
+    def test_keeps_history_between_turns(self, tmp_path: Any) -> None:
+        """Test each turn sees the earlier turns of the conversation"""
+        from click.testing import CliRunner
+
+        result = CliRunner().invoke(
+            cli,
+            ["chat", "-c", self.write_config(tmp_path), "--repl"],
+            input="hello\nagain\n/history\n/exit\n",
+        )
+
+        assert result.exit_code == 0
+        assert "Loaded cli_repl_processor.ReplProcessor in" in result.output
+        assert "hello after []" in result.output
+        assert "again after [hello]" in result.output
+        assert "2. Input: again" in result.output
+        assert "2 turns: mean" in result.output
+
+    def test_errors_and_reset(self, tmp_path: Any) -> None:
+        """Test failing turns are reported and /reset clears the conversation"""
+        from click.testing import CliRunner
+
+        result = CliRunner().invoke(
+            cli,
+            ["chat", "-c", self.write_config(tmp_path), "--repl"],
+            input="fail\nhello\n/reset\nagain\n/stats\n/bogus\n",
+        )
+
+        assert result.exit_code == 0
+        assert "Error processing chat: boom" in result.output
+        assert "Unknown command /bogus" in result.output
+        assert "again after []" in result.output
+        assert "2 turns: mean" in result.output
+
+    def test_rejects_input_with_repl(self, tmp_path: Any) -> None:
+        """Test --repl cannot be combined with a single input"""
+        from click.testing import CliRunner
+
+        result = CliRunner().invoke(
+            cli, ["chat", "-c", self.write_config(tmp_path), "--repl", "-i", "hi"]
+        )
+
+        assert result.exit_code == 1
+
+
+class TestChatBatch:
+    """Test the JSONL batch mode of the chat command"""
+
+    def test_batch_file(self, tmp_path: Any) -> None:
+        """Test every input record gets a result record"""
+        from click.testing import CliRunner
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            yaml.dump({"processor_class": "tests.test_cli.MockChatProcessor"})
+        )
+        inputs = tmp_path / "inputs.jsonl"
+        inputs.write_text('{"input": "a"}\n{"input": "b"}\n{"input": 1}\n')
+        results = tmp_path / "results.jsonl"
+
+        result = CliRunner().invoke(
+            cli,
+            [
+                "chat",
+                "-c",
+                str(config_file),
+                "--batch",
+                str(inputs),
+                "--out",
+                str(results),
+                "--concurrency",
+                "2",
+                "--ordered",
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert "Processed 3 records (1 errors)" in result.output
+        records = [json.loads(line) for line in results.read_text().splitlines()]
+        assert [record.get("output") for record in records] == [
+            "Mock response to: a",
+            "Mock response to: b",
+            None,
+        ]
+
+    def test_batch_rejects_input(self, tmp_path: Any) -> None:
+        """Test --batch cannot be combined with --input"""
+        from click.testing import CliRunner
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            yaml.dump({"processor_class": "tests.test_cli.MockChatProcessor"})
+        )
+
+        result = CliRunner().invoke(
+            cli, ["chat", "-c", str(config_file), "--batch", "-", "-i", "hi"]
+        )
+
+        assert result.exit_code == 1
+
+
+class TestBench:
+    """Test the bench command"""
+
+    def test_json_report(self, tmp_path: Any) -> None:
+        """Test an in-process benchmark prints a JSON report"""
+        from click.testing import CliRunner
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            yaml.dump({"processor_class": "tests.test_cli.MockChatProcessor"})
+        )
+
+        result = CliRunner().invoke(
+            cli,
+            [
+                "bench",
+                "-c",
+                str(config_file),
+                "--duration",
+                "0.1",
+                "--rate",
+                "50",
+                "--history-turns",
+                "3",
+                "--json",
+            ],
+        )
+
+        assert result.exit_code == 0
+        report = json.loads(result.output)
+        assert report["requests"] == 5 and report["errors"] == 0
+        assert report["history_turns"] == 3
+        assert set(report["latency_ms"]) == {"mean", "p50", "p95", "p99", "max"}
+
+
+class TestProfile:
+    """Test the profile command"""
+
+    def test_profile_workload(self, tmp_path: Any) -> None:
+        """Test a workload is profiled into a report and collapsed stacks"""
+        from click.testing import CliRunner
+
+        config_file = tmp_path / "config.yaml"
+        config_file.write_text(
+            yaml.dump({"processor_class": "tests.test_cli.MockChatProcessor"})
+        )
+        workload = tmp_path / "prompts.jsonl"
+        workload.write_text('{"input": "a"}\n{"input": "b"}\nnot json\n')
+        collapsed = tmp_path / "profile.collapsed"
+
+        result = CliRunner().invoke(
+            cli,
+            [
+                "profile",
+                "-c",
+                str(config_file),
+                "-w",
+                str(workload),
+                "--collapsed",
+                str(collapsed),
+                "--interval",
+                "0.5",
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert "Import:" in result.output and "Init:" in result.output
+        assert "Requests: 3 (1 errors)" in result.output
+        assert "Top allocations during requests" in result.output
+        assert collapsed.exists()
@@ -0,0 +1,118 @@
+"""
+Startup time budget for the CLI
+"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List
+
+import pytest
+import yaml
+
+import orchael_sdk
+
+# Milliseconds the CLI may spend importing and running a quick command, on top
+# of starting Python and importing click. Slow CI machines can raise it.
+BUDGET_MS = float(os.environ.get("ORCHAEL_CLI_STARTUP_BUDGET_MS", "50"))
+
+# Modules that only some commands need, and that a quick command must not load
+HEAVY_MODULES = [
+    "asyncio",
+    "fastapi",
+    "pydantic",
+    "uvicorn",
+    "urllib.request",
+    "sqlite3",
+    "orchael_sdk.history_store",
+    "orchael_sdk.middleware",
+    "orchael_sdk.bench",
+    "orchael_sdk.profiling",
+    "orchael_sdk.server",
+]
+
+# Runs the CLI in a fresh interpreter and reports its time and loaded modules
+MEASURE = """
+import json, sys, time
+import click
+
+start = time.perf_counter()
+from orchael_sdk.cli import cli
+
+try:
+    cli(sys.argv[1:])
+except SystemExit:
+    pass
+elapsed = time.perf_counter() - start
+print(json.dumps({"ms": elapsed * 1000, "modules": sorted(sys.modules)}))
+"""
+
+
+def measure(args: List[str], cwd: Any, runs: int = 3) -> Dict[str, Any]:
+    """Return the fastest of several CLI runs and the modules it loaded"""
+    env = dict(os.environ)
+    package_root = os.path.dirname(os.path.dirname(orchael_sdk.__file__))
+    env["PYTHONPATH"] = os.pathsep.join(
+        filter(None, [package_root, env.get("PYTHONPATH")])
+    )
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, "-c", MEASURE, *args],
+            cwd=cwd,
+            env=env,
+            capture_output=True,
+            text=True,
+            timeout=60,
+            check=True,
+        )
+        results.append(json.loads(completed.stdout.splitlines()[-1]))
+    return min(results, key=lambda result: result["ms"])
+
+
+@pytest.fixture
+def agent_dir(tmp_path: Any) -> Any:
+    """Write a minimal Python agent to build"""
+    (tmp_path / "startup_processor.py").write_text(
+        "from orchael_sdk import OrchaelChatProcessor, ChatOutput\n"
+        "\n"
+        "class StartupProcessor(OrchaelChatProcessor):\n"
+        "    def process_chat(self, chat_input):\n"
+        "        return ChatOutput(input=chat_input['input'], output='ok')\n"
+    )
+    (tmp_path / "config.yaml").write_text(
+        yaml.dump(
+            {
+                "processor_class": "startup_processor.StartupProcessor",
+                "agent_type": "python",
+                "runtime_version": "3.10",
+            }
+        )
+    )
+    return tmp_path
+
+
+class TestCLIStartup:
+    """Test quick commands stay fast and import only what they need"""
+
+    @pytest.mark.parametrize(
+        "args", [["--help"], ["build", "-o", "agent.zip"]], ids=["help", "build"]
+    )
+    def test_startup_budget(self, args: List[str], agent_dir: Any) -> None:
+        """Test the command loads no heavy modules and runs within budget"""
+        result = measure(args, agent_dir)
+
+        loaded = [module for module in HEAVY_MODULES if module in result["modules"]]
+        assert loaded == []
+        assert result["ms"] < BUDGET_MS, (
+            f"orchael-sdk-cli {' '.join(args)} took {result['ms']:.1f} ms, "
+            f"over the {BUDGET_MS:g} ms budget"
+        )
+
+    def test_help_skips_yaml_and_processor_base(self, agent_dir: Any) -> None:
+        """Test --help does not even load YAML or the processor base class"""
+        modules = measure(["--help"], agent_dir, runs=1)["modules"]
+
+        assert "yaml" not in modules
+        assert "orchael_sdk.orchael_chat_processor" not in modules
@@ -0,0 +1,257 @@
+"""
+Tests for incremental history compaction
+"""
+
+import asyncio
+import hashlib
+from typing import AsyncIterator, List, Tuple
+
+import pytest
+
+from orchael_sdk.chat_types import ChatHistoryEntry, ChatInput, ChatOutput
+from orchael_sdk.compaction import SUMMARY_INPUT, Compactor, ProcessorSummarizer
+from orchael_sdk.context import ContextWindow
+from orchael_sdk.history_store import MemoryHistoryStore
+from orchael_sdk.middleware import CompactingChatProcessor
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor
+
+
+def turn(i: int) -> ChatHistoryEntry:
+    """Build a history entry numbered i"""
+    return {"input": f"in{i}", "output": f"out{i}"}
+
+
+class RecordingSummarizer:
+    """Summarizer that lists the inputs of the turns it has folded in"""
+
+    def __init__(self) -> None:
+        self.calls: List[Tuple[str, List[str]]] = []
+
+    def __call__(self, summary: str, turns: List[ChatHistoryEntry]) -> str:
+        inputs = [entry["input"] for entry in turns]
+        self.calls.append((summary, inputs))
+        return " ".join(filter(None, [summary] + inputs))
+
+
+class SeenProcessor(OrchaelChatProcessor):
+    """Processor that answers with the history it was given"""
+
+    def __init__(self) -> None:
+        self.history_store = MemoryHistoryStore()
+        self.seen: List[ChatInput] = []
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.seen.append(chat_input)
+        output = ChatOutput(input=chat_input["input"], output="ok")
+        self.record_history({"input": output["input"], "output": output["output"]})
+        return output
+
+
+class AsyncSeenProcessor(SeenProcessor):
+    """SeenProcessor with native async hooks"""
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        await asyncio.sleep(0)
+        return self.process_chat(chat_input)
+
+    async def astream_chat(self, chat_input: ChatInput) -> AsyncIterator[str]:
+        yield (await self.aprocess_chat(chat_input))["output"]
+
+
+class TestCompactor:
+    """Test Compactor"""
+
+    def test_short_history_is_unchanged(self) -> None:
+        """Test nothing is summarized until older turns fill a block"""
+        summarizer = RecordingSummarizer()
+        compactor = Compactor(summarizer, every=2, keep_turns=3)
+        history = [turn(i) for i in range(4)]
+
+        chat_input = compactor.apply(ChatInput(input="hi", history=history))
+
+        assert chat_input == {"input": "hi", "history": history}
+        assert summarizer.calls == []
+
+    def test_summary_replaces_older_turns(self) -> None:
+        """Test whole blocks of older turns are replaced by the summary"""
+        summarizer = RecordingSummarizer()
+        compactor = Compactor(summarizer, every=2, keep_turns=2)
+        history = [turn(i) for i in range(7)]
+
+        chat_input = compactor.apply(ChatInput(input="hi", history=history))
+
+        # Five turns are older than keep_turns, of which two whole blocks
+        assert chat_input["history"] == [
+            {"input": SUMMARY_INPUT, "output": "in0 in1 in2 in3"},
+            turn(4),
+            turn(5),
+            turn(6),
+        ]
+        assert summarizer.calls == [("", ["in0", "in1"]), ("in0 in1", ["in2", "in3"])]
+
+    def test_summary_is_updated_incrementally(self) -> None:
+        """Test a growing conversation only summarizes each block once"""
+        summarizer = RecordingSummarizer()
+        compactor = Compactor(summarizer, every=2, keep_turns=1)
+        history: List[ChatHistoryEntry] = []
+
+        for i in range(9):
+            compactor.apply(ChatInput(input=f"in{i}", history=list(history)))
+            history.append(turn(i))
+
+        assert [inputs for _, inputs in summarizer.calls] == [
+            ["in0", "in1"],
+            ["in2", "in3"],
+            ["in4", "in5"],
+        ]
+        assert compactor.summaries == 3
+
+    def test_only_new_turns_are_hashed(self, monkeypatch: pytest.MonkeyPatch) -> None:
+        """Test a history kept in memory only has its new blocks hashed"""
+        hashed: List[bytes] = []
+        sha256 = hashlib.sha256
+
+        def recording_sha256(data: bytes) -> "hashlib._Hash":
+            hashed.append(data)
+            return sha256(data)
+
+        monkeypatch.setattr(hashlib, "sha256", recording_sha256)
+        compactor = Compactor(RecordingSummarizer(), every=2, keep_turns=0)
+        history: List[ChatHistoryEntry] = []
+
+        for i in range(10):
+            history.append(turn(i))
+            compactor.apply(ChatInput(input="", history=list(history)))
+
+        # One hash per block, although every request sends the whole history
+        assert len(hashed) == 5
+
+        # Equal turns in new objects are hashed again and find the summaries
+        copied = [turn(i) for i in range(10)]
+        compacted = compactor.apply(ChatInput(input="", history=copied))
+        assert len(hashed) == 10
+        assert compactor.summaries == 5
+        assert (compacted["history"] or [])[0]["input"] == SUMMARY_INPUT
+
+    def test_different_conversations_do_not_share_summaries(self) -> None:
+        """Test summaries are looked up by the turns they cover"""
+        summarizer = RecordingSummarizer()
+        compactor = Compactor(summarizer, every=2, keep_turns=0)
+
+        first = compactor.apply(ChatInput(input="", history=[turn(0), turn(1)]))
+        second = compactor.apply(ChatInput(input="", history=[turn(0), turn(2)]))
+
+        assert first["history"] == [{"input": SUMMARY_INPUT, "output": "in0 in1"}]
+        assert second["history"] == [{"input": SUMMARY_INPUT, "output": "in0 in2"}]
+        assert len(summarizer.calls) == 2
+
+    def test_window_trims_recent_turns(self) -> None:
+        """Test the context window applies to the turns kept after the summary"""
+        compactor = Compactor(
+            RecordingSummarizer(),
+            every=2,
+            keep_turns=4,
+            window=ContextWindow(max_turns=2),
+        )
+        history = [turn(i) for i in range(6)]
+
+        chat_input = compactor.apply(ChatInput(input="hi", history=history))
+
+        assert chat_input["history"] == [
+            {"input": SUMMARY_INPUT, "output": "in0 in1"},
+            turn(4),
+            turn(5),
+        ]
+
+    def test_aapply_matches_apply(self) -> None:
+        """Test the async variant compacts the same way"""
+        history = [turn(i) for i in range(5)]
+        chat_input = ChatInput(input="hi", history=history)
+
+        expected = Compactor(RecordingSummarizer(), every=2, keep_turns=1).apply(
+            chat_input
+        )
+        actual = asyncio.run(
+            Compactor(RecordingSummarizer(), every=2, keep_turns=1).aapply(chat_input)
+        )
+
+        assert actual == expected
+        assert actual["history"] == [
+            {"input": SUMMARY_INPUT, "output": "in0 in1 in2 in3"},
+            turn(4),
+        ]
+
+    def test_invalid_arguments(self) -> None:
+        """Test block size, kept turns and cache size are validated"""
+        with pytest.raises(ValueError):
+            Compactor(RecordingSummarizer(), every=0)
+        with pytest.raises(ValueError):
+            Compactor(RecordingSummarizer(), keep_turns=-1)
+        with pytest.raises(ValueError):
+            Compactor(RecordingSummarizer(), cache_size=0)
+
+
+class TestProcessorSummarizer:
+    """Test ProcessorSummarizer"""
+
+    def test_asks_processor_for_summary(self) -> None:
+        """Test the previous summary and new turns are sent in the prompt"""
+        processor = SeenProcessor()
+        summarizer = ProcessorSummarizer(processor, prompt="{summary}|{turns}")
+
+        assert summarizer("before", [turn(0)]) == "ok"
+        assert processor.seen == [
+            ChatInput(input="before|User: in0\nAssistant: out0", history=[])
+        ]
+
+
+class TestCompactingChatProcessor:
+    """Test CompactingChatProcessor"""
+
+    def test_processor_sees_compacted_history(self) -> None:
+        """Test inputs are compacted before reaching the wrapped processor"""
+        inner = SeenProcessor()
+        processor = CompactingChatProcessor(
+            inner, Compactor(RecordingSummarizer(), every=2, keep_turns=1)
+        )
+
+        output = processor.process_chat(
+            ChatInput(input="hi", history=[turn(0), turn(1), turn(2)])
+        )
+
+        assert output == {"input": "hi", "output": "ok"}
+        assert inner.seen[0]["history"] == [
+            {"input": SUMMARY_INPUT, "output": "in0 in1"},
+            turn(2),
+        ]
+
+    def test_history_is_the_wrapped_processors(self) -> None:
+        """Test history and the history store belong to the wrapped processor"""
+        inner = SeenProcessor()
+        processor = CompactingChatProcessor(inner, Compactor(RecordingSummarizer()))
+        processor.process_chat(ChatInput(input="hi", history=[]))
+
+        assert processor.get_history() == [{"input": "hi", "output": "ok"}]
+        assert processor.get_history_page(0, 1)["history"] == processor.get_history()
+        assert asyncio.run(processor.aget_history()) == processor.get_history()
+
+        store = MemoryHistoryStore()
+        processor.history_store = store
+        assert inner.history_store is store
+
+    @pytest.mark.parametrize("inner_class", [SeenProcessor, AsyncSeenProcessor])
+    def test_async_hooks(self, inner_class: type) -> None:
+        """Test the async hooks compact for sync and async wrapped processors"""
+        inner = inner_class()
+        processor = CompactingChatProcessor(
+            inner, Compactor(RecordingSummarizer(), every=2, keep_turns=0)
+        )
+        chat_input = ChatInput(input="hi", history=[turn(0), turn(1)])
+
+        async def run() -> List[str]:
+            await processor.aprocess_chat(chat_input)
+            return [chunk async for chunk in processor.astream_chat(chat_input)]
+
+        assert asyncio.run(run()) == ["ok"]
+        for seen in inner.seen:
+            assert seen["history"] == [{"input": SUMMARY_INPUT, "output": "in0 in1"}]
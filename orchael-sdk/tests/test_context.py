@@ -0,0 +1,124 @@
+"""
+Tests for context-window management
+"""
+
+from typing import List
+
+import pytest
+
+from orchael_sdk.chat_types import ChatHistoryEntry, ChatInput
+from orchael_sdk.context import ContextWindow, estimate_tokens
+
+
+def turn(i: int, size: int = 8) -> ChatHistoryEntry:
+    """Build a history entry numbered i with size characters in each field"""
+    return {"input": f"{i}".ljust(size, "i"), "output": f"{i}".ljust(size, "o")}
+
+
+class TestEstimateTokens:
+    """Test estimate_tokens"""
+
+    def test_rounds_up(self) -> None:
+        """Test partial tokens count as whole tokens"""
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("abcd") == 1
+        assert estimate_tokens("abcde") == 2
+
+
+class TestContextWindow:
+    """Test ContextWindow"""
+
+    def test_keeps_newest_turns_within_token_budget(self) -> None:
+        """Test the newest turns that fit are returned in chronological order"""
+        history = [turn(i) for i in range(10)]
+
+        # Each turn is 16 characters, i.e. 4 tokens
+        window = ContextWindow(max_tokens=12)
+
+        assert window.select(history) == history[-3:]
+
+    def test_input_counts_against_budget(self) -> None:
+        """Test the new input is counted before any history"""
+        history = [turn(i) for i in range(10)]
+        window = ContextWindow(max_tokens=12)
+
+        assert window.select(history, "x" * 20) == history[-1:]
+        assert window.select(history, "x" * 100) == []
+
+    def test_char_budget(self) -> None:
+        """Test max_chars limits the characters of input and turns"""
+        history = [turn(i) for i in range(10)]
+        window = ContextWindow(max_chars=40)
+
+        assert window.select(history, "hi") == history[-2:]
+
+    def test_turn_limit(self) -> None:
+        """Test max_turns caps the turns regardless of their size"""
+        history = [turn(i) for i in range(10)]
+
+        assert ContextWindow(max_turns=4).select(history) == history[-4:]
+        assert ContextWindow(max_turns=0).select(history) == []
+        assert ContextWindow(max_tokens=1000, max_turns=2).select(history) == (
+            history[-2:]
+        )
+
+    def test_stops_at_first_turn_that_does_not_fit(self) -> None:
+        """Test an older, smaller turn is not taken past a larger one"""
+        history = [turn(0), turn(1, size=100), turn(2)]
+        window = ContextWindow(max_tokens=20)
+
+        assert window.select(history) == [turn(2)]
+
+    def test_empty_history(self) -> None:
+        """Test missing or empty history selects nothing"""
+        window = ContextWindow(max_tokens=10)
+
+        assert window.select(None, "hi") == []
+        assert window.select([], "hi") == []
+
+    def test_turn_costs_are_cached(self) -> None:
+        """Test turns seen in an earlier request are not counted again"""
+        counted: List[str] = []
+
+        def count_tokens(text: str) -> int:
+            counted.append(text)
+            return len(text.split())
+
+        window = ContextWindow(max_tokens=1000, count_tokens=count_tokens)
+        history = [turn(i) for i in range(5)]
+        window.select(history, "first")
+        counted.clear()
+
+        # The next request repeats the conversation with one more turn
+        history.append(turn(5))
+        assert window.select(history, "second") == history
+
+        assert counted == ["second", turn(5)["input"], turn(5)["output"]]
+        assert window.stats() == {"hits": 5, "misses": 6, "entries": 6}
+
+    def test_default_estimate_is_not_cached(self) -> None:
+        """Test the built-in estimate is computed directly, without a cache"""
+        window = ContextWindow(max_tokens=1000)
+        history = [turn(i) for i in range(5)]
+
+        assert window.select(history, "hi") == history
+        assert window.stats() == {"hits": 0, "misses": 0, "entries": 0}
+
+    def test_apply(self) -> None:
+        """Test apply trims the history of a chat input"""
+        history = [turn(i) for i in range(10)]
+        window = ContextWindow(max_tokens=8)
+
+        chat_input = window.apply(ChatInput(input="", history=history))
+
+        assert chat_input == {"input": "", "history": history[-2:]}
+        assert len(history) == 10
+
+    def test_invalid_arguments(self) -> None:
+        """Test a window needs a limit and limits must not be negative"""
+        with pytest.raises(ValueError):
+            ContextWindow()
+        with pytest.raises(ValueError):
+            ContextWindow(max_tokens=-1)
+        with pytest.raises(ValueError):
+            ContextWindow(max_chars=10, max_turns=-2)
@@ -0,0 +1,262 @@
+"""
+Tests for hedged requests
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+import pytest
+
+from orchael_sdk.chat_types import ChatInput, ChatOutput
+from orchael_sdk.hedging import HedgedChatProcessor, LatencyTracker, apply_hedging
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor, overrides
+
+
+class DelayedProcessor(OrchaelChatProcessor):
+    """Async processor answering after a delay, recording if it was cancelled"""
+
+    def __init__(
+        self, output: str, delay: float = 0.0, error: Optional[Exception] = None
+    ) -> None:
+        self.output = output
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return ChatOutput(input=chat_input["input"], output=self.output)
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error is not None:
+            raise self.error
+        return ChatOutput(input=chat_input["input"], output=self.output)
+
+
+class SyncReplica(OrchaelChatProcessor):
+    """Synchronous replica referenced by import path from config"""
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        return ChatOutput(input=chat_input["input"], output="replica")
+
+
+def trained(processor: HedgedChatProcessor, seconds: float = 0.01) -> None:
+    """Fill the processor's latency window with fast observations"""
+    for _ in range(processor.latency.min_samples):
+        processor.latency.observe(seconds)
+
+
+def ask(processor: OrchaelChatProcessor) -> ChatOutput:
+    """Process an input asynchronously"""
+    return asyncio.run(processor.aprocess_chat(ChatInput(input="hi", history=None)))
+
+
+class TestLatencyTracker:
+    """Test LatencyTracker"""
+
+    def test_quantile(self) -> None:
+        """Test the quantile of the window is reported once there are enough"""
+        tracker = LatencyTracker(quantile=0.9, window=10, min_samples=5, refresh=1)
+        for value in range(1, 5):
+            tracker.observe(value)
+        assert tracker.value is None
+
+        for value in range(5, 11):
+            tracker.observe(value)
+        assert tracker.value == 9
+
+        # Old observations fall out of the window
+        for _ in range(10):
+            tracker.observe(1)
+        assert tracker.value == 1
+
+    def test_refresh_interval(self) -> None:
+        """Test the quantile is only recomputed every refresh observations"""
+        tracker = LatencyTracker(quantile=1, min_samples=1, refresh=3)
+        tracker.observe(1)
+        tracker.observe(5)
+        tracker.observe(5)
+        assert tracker.value == 1
+
+        tracker.observe(5)
+        assert tracker.value == 5
+
+    def test_invalid_arguments(self) -> None:
+        """Test the quantile and sizes are validated"""
+        with pytest.raises(ValueError):
+            LatencyTracker(quantile=0)
+        with pytest.raises(ValueError):
+            LatencyTracker(window=0)
+
+
+class TestHedgedChatProcessor:
+    """Test HedgedChatProcessor"""
+
+    def test_no_hedging_while_learning(self) -> None:
+        """Test calls are not hedged before enough latencies are observed"""
+        primary = DelayedProcessor("primary", delay=0.05)
+        processor = HedgedChatProcessor(primary, min_samples=5)
+
+        assert ask(processor)["output"] == "primary"
+        assert processor.hedge_delay() is None
+        assert processor.stats() == {
+            "requests": 1,
+            "hedges": 0,
+            "hedge_wins": 0,
+            "delay_ms": 0.0,
+        }
+
+    def test_hedge_wins_against_slow_call(self) -> None:
+        """Test a stuck call is hedged to a replica and cancelled"""
+        primary = DelayedProcessor("primary", delay=5)
+        replica = DelayedProcessor("replica")
+        processor = HedgedChatProcessor(primary, [replica], min_delay_ms=1)
+        trained(processor)
+
+        start = time.perf_counter()
+        assert ask(processor)["output"] == "replica"
+
+        assert time.perf_counter() - start < 1
+        assert primary.cancelled
+        assert processor.stats()["hedges"] == 1
+        assert processor.stats()["hedge_wins"] == 1
+
+    def test_first_call_can_still_win(self) -> None:
+        """Test the first call wins when it answers before the hedge"""
+        primary = DelayedProcessor("primary", delay=0.05)
+        replica = DelayedProcessor("replica", delay=5)
+        processor = HedgedChatProcessor(primary, [replica], min_delay_ms=1)
+        trained(processor)
+
+        assert ask(processor)["output"] == "primary"
+        assert replica.cancelled
+        assert (processor.hedges, processor.hedge_wins) == (1, 0)
+
+    def test_retries_on_processor_without_replicas(self) -> None:
+        """Test the hedge goes to the processor itself without replicas"""
+        primary = DelayedProcessor("primary", delay=0.1)
+        processor = HedgedChatProcessor(primary, min_delay_ms=1)
+        trained(processor)
+
+        assert ask(processor)["output"] == "primary"
+        assert primary.calls == 2
+
+    def test_errors_are_not_hedged(self) -> None:
+        """Test a call failing before the hedge delay fails the request"""
+        primary = DelayedProcessor("", error=RuntimeError("down"))
+        replica = DelayedProcessor("replica")
+        processor = HedgedChatProcessor(primary, [replica], min_delay_ms=1000)
+        trained(processor)
+
+        with pytest.raises(RuntimeError):
+            ask(processor)
+        assert replica.calls == 0
+
+    def test_sync_call(self) -> None:
+        """Test synchronous calls are hedged too"""
+        primary = DelayedProcessor("primary", delay=0.5)
+        processor = HedgedChatProcessor(primary, [SyncReplica()], min_delay_ms=1)
+        trained(processor)
+
+        output = processor.process_chat(ChatInput(input="hi", history=None))
+
+        assert output["output"] == "replica"
+        assert processor.hedge_wins == 1
+
+    def test_sync_calls_share_one_loop(self) -> None:
+        """Test synchronous calls run on a long-lived loop, not a new one each"""
+        loops = []
+
+        class LoopRecording(OrchaelChatProcessor):
+            def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+                raise AssertionError("aprocess_chat should be used")
+
+            async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+                loops.append(asyncio.get_running_loop())
+                return ChatOutput(input=chat_input["input"], output="ok")
+
+        processor = HedgedChatProcessor(LoopRecording())
+        for _ in range(2):
+            processor.process_chat(ChatInput(input="hi", history=None))
+
+        assert loops[0] is loops[1]
+        assert not loops[0].is_closed()
+
+    def test_sync_processors_run_on_executor(self) -> None:
+        """Test synchronous processors are called on the configured executor"""
+        threads = []
+
+        class ThreadRecording(OrchaelChatProcessor):
+            def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+                threads.append(threading.current_thread().name)
+                return ChatOutput(input=chat_input["input"], output="ok")
+
+        processor = HedgedChatProcessor(ThreadRecording())
+        with ThreadPoolExecutor(1, thread_name_prefix="hedging-test") as executor:
+            processor.executor = executor
+            ask(processor)
+
+        assert threads[0].startswith("hedging-test")
+        assert overrides(processor, "aprocess_chat")
+
+    def test_delay_is_clamped(self) -> None:
+        """Test the hedge delay stays within min_delay_ms and max_delay_ms"""
+        processor = HedgedChatProcessor(
+            DelayedProcessor("p"), min_delay_ms=20, max_delay_ms=100
+        )
+        trained(processor, seconds=0.001)
+        assert processor.hedge_delay() == pytest.approx(0.02)
+
+        processor = HedgedChatProcessor(DelayedProcessor("p"), max_delay_ms=100)
+        trained(processor, seconds=10)
+        assert processor.hedge_delay() == pytest.approx(0.1)
+
+
+class TestApplyHedging:
+    """Test configuring hedging"""
+
+    def test_disabled(self) -> None:
+        """Test the processor is returned as is without the section"""
+        processor = DelayedProcessor("p")
+
+        assert apply_hedging(processor, None) is processor
+        assert apply_hedging(processor, {"enabled": False}) is processor
+
+    def test_settings(self) -> None:
+        """Test settings and replicas are read from the section"""
+        processor = apply_hedging(
+            DelayedProcessor("p"),
+            {
+                "quantile": 0.99,
+                "min_delay_ms": 5,
+                "max_delay_ms": 2000,
+                "min_samples": 10,
+                "replicas": ["tests.test_hedging.SyncReplica"],
+            },
+        )
+
+        assert isinstance(processor, HedgedChatProcessor)
+        assert processor.latency.quantile == 0.99
+        assert processor.latency.min_samples == 10
+        assert (processor.min_delay_ms, processor.max_delay_ms) == (5, 2000)
+        assert isinstance(processor.replicas[0], SyncReplica)
+
+    def test_invalid_replica(self) -> None:
+        """Test replicas must be processor classes"""
+        with pytest.raises(ValueError):
+            apply_hedging(
+                DelayedProcessor("p"), {"replicas": ["tests.test_hedging.trained"]}
+            )
@@ -0,0 +1,122 @@
+"""
+Tests for bounded chat history
+"""
+
+import threading
+
+import pytest
+
+from orchael_sdk.chat_types import ChatHistoryEntry
+from orchael_sdk.history import HistoryBuffer, history_page
+
+
+def turn(i: int) -> ChatHistoryEntry:
+    """Build a history entry numbered i"""
+    return {"input": f"in{i}", "output": f"out{i}"}
+
+
+class TestHistoryPage:
+    """Test history_page"""
+
+    def test_pages_through_entries(self) -> None:
+        """Test following next_cursor visits every entry once"""
+        entries = [turn(i) for i in range(5)]
+
+        assert history_page(entries, 0, 2) == {
+            "history": [turn(0), turn(1)],
+            "next_cursor": 2,
+        }
+        assert history_page(entries, 2, 2)["next_cursor"] == 4
+        assert history_page(entries, 4, 2) == {
+            "history": [turn(4)],
+            "next_cursor": None,
+        }
+        assert history_page(entries) == {"history": entries, "next_cursor": None}
+
+    def test_cursor_past_end(self) -> None:
+        """Test a cursor past the end returns an empty last page"""
+        assert history_page([turn(0)], 5, 2) == {"history": [], "next_cursor": None}
+
+    def test_invalid_arguments(self) -> None:
+        """Test negative cursors and non-positive limits are rejected"""
+        with pytest.raises(ValueError):
+            history_page([], -1)
+        with pytest.raises(ValueError):
+            history_page([], 0, 0)
+
+
+class TestHistoryBuffer:
+    """Test HistoryBuffer"""
+
+    def test_keeps_most_recent_entries(self) -> None:
+        """Test the oldest entries are dropped beyond max_entries"""
+        buffer = HistoryBuffer(max_entries=3)
+        for i in range(5):
+            buffer.append(turn(i))
+
+        assert len(buffer) == 3
+        assert buffer.entries() == [turn(2), turn(3), turn(4)]
+        assert buffer.size == 3 * len("in0out0")
+
+    def test_max_bytes(self) -> None:
+        """Test the oldest entries are dropped beyond max_bytes"""
+        buffer = HistoryBuffer(max_entries=None, max_bytes=15)
+        buffer.extend([turn(0), turn(1), turn(2)])
+
+        # Each entry is 7 characters, so only two fit
+        assert buffer.entries() == [turn(1), turn(2)]
+
+        # An entry larger than the limit is still kept on its own
+        buffer.append({"input": "x" * 20, "output": ""})
+        assert len(buffer) == 1
+
+    def test_cursors_survive_eviction(self) -> None:
+        """Test cursors count dropped entries so pages stay stable"""
+        buffer = HistoryBuffer(max_entries=4)
+        buffer.extend([turn(i) for i in range(4)])
+
+        page = buffer.page(0, 2)
+        assert page == {"history": [turn(0), turn(1)], "next_cursor": 2}
+
+        # Two new turns push out the first two
+        buffer.extend([turn(4), turn(5)])
+        assert buffer.page(2, 2) == {"history": [turn(2), turn(3)], "next_cursor": 4}
+        assert buffer.page(4) == {"history": [turn(4), turn(5)], "next_cursor": None}
+
+        # A cursor into dropped history resumes at the oldest entry held
+        assert buffer.page(0, 1) == {"history": [turn(2)], "next_cursor": 3}
+
+    def test_clear(self) -> None:
+        """Test clearing keeps later cursors consistent"""
+        buffer = HistoryBuffer()
+        buffer.extend([turn(0), turn(1)])
+        buffer.clear()
+        buffer.append(turn(2))
+
+        assert buffer.size == len("in2out2")
+        assert buffer.page(2) == {"history": [turn(2)], "next_cursor": None}
+
+    def test_concurrent_appends(self) -> None:
+        """Test appends from several threads are all counted"""
+        buffer = HistoryBuffer(max_entries=50)
+
+        def append_many() -> None:
+            for i in range(100):
+                buffer.append(turn(i))
+
+        threads = [threading.Thread(target=append_many) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(buffer) == 50
+        assert buffer.page(0)["history"] == buffer.entries()
+        assert buffer.size == sum(
+            len(e["input"]) + len(e["output"]) for e in buffer.entries()
+        )
+
+    def test_invalid_max_entries(self) -> None:
+        """Test max_entries must be positive"""
+        with pytest.raises(ValueError):
+            HistoryBuffer(max_entries=0)
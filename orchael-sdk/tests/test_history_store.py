@@ -0,0 +1,419 @@
+"""
+Tests for pluggable history stores
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional
+
+import pytest
+
+from orchael_sdk.chat_types import (
+    ChatHistoryEntry,
+    ChatHistoryPage,
+    ChatInput,
+    ChatOutput,
+)
+from orchael_sdk.history_store import (
+    BatchedHistoryStore,
+    HistoryStore,
+    LogHistoryStore,
+    MemoryHistoryStore,
+    MmapHistoryStore,
+    SQLiteHistoryStore,
+    create_history_store,
+    locked,
+)
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor
+
+
+def turn(i: int) -> ChatHistoryEntry:
+    """Build a history entry numbered i"""
+    return {"input": f"in{i}", "output": f"out{i}"}
+
+
+StoreFactory = Callable[[Path], HistoryStore]
+
+STORES: Dict[str, StoreFactory] = {
+    "memory": lambda path: MemoryHistoryStore(),
+    "sqlite": lambda path: SQLiteHistoryStore(str(path / "history.db")),
+    "log": lambda path: LogHistoryStore(str(path / "history.jsonl")),
+    "mmap": lambda path: MmapHistoryStore(str(path / "history.jsonl")),
+}
+
+
+@pytest.fixture(params=list(STORES))
+def store(request: pytest.FixtureRequest, tmp_path: Path) -> Iterator[HistoryStore]:
+    """Each history store backend"""
+    store = STORES[request.param](tmp_path)
+    yield store
+    store.close()
+
+
+class TestHistoryStores:
+    """Behaviour shared by every backend"""
+
+    def test_append_and_page(self, store: HistoryStore) -> None:
+        """Test appended entries are read back in order, a page at a time"""
+        for i in range(5):
+            store.append(turn(i))
+
+        assert store.entries() == [turn(i) for i in range(5)]
+        assert store.page(0, 2) == {"history": [turn(0), turn(1)], "next_cursor": 2}
+        assert store.page(2, 2) == {"history": [turn(2), turn(3)], "next_cursor": 4}
+        assert store.page(4, 2) == {"history": [turn(4)], "next_cursor": None}
+        assert store.page(9) == {"history": [], "next_cursor": None}
+
+    def test_invalid_page(self, store: HistoryStore) -> None:
+        """Test negative cursors and non-positive limits are rejected"""
+        with pytest.raises(ValueError):
+            store.page(-1)
+        with pytest.raises(ValueError):
+            store.page(0, 0)
+
+    def test_concurrent_appends(self, store: HistoryStore) -> None:
+        """Test appends from several threads are all stored"""
+
+        def append_many(thread: int) -> None:
+            for i in range(50):
+                store.append({"input": str(thread), "output": str(i)})
+
+        threads = [threading.Thread(target=append_many, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        entries = store.entries()
+        assert len(entries) == 200
+        # Each thread's entries keep their relative order
+        for n in range(4):
+            outputs = [e["output"] for e in entries if e["input"] == str(n)]
+            assert outputs == [str(i) for i in range(50)]
+
+
+class RecordingStore(BatchedHistoryStore):
+    """Batched store that records the batches it writes"""
+
+    def __init__(self, batch_size: int, flush_interval_ms: float) -> None:
+        super().__init__(batch_size, flush_interval_ms)
+        self.batches: List[List[ChatHistoryEntry]] = []
+        self.written = threading.Event()
+        self._check_process()
+
+    def _open(self) -> None:
+        pass
+
+    def _write(self, entries: List[ChatHistoryEntry]) -> None:
+        self.batches.append(entries)
+        self.written.set()
+
+    def _read(self, cursor: int, limit: Optional[int]) -> ChatHistoryPage:
+        return {
+            "history": [e for batch in self.batches for e in batch],
+            "next_cursor": None,
+        }
+
+
+class TestBatchedHistoryStore:
+    """Test background batching of writes"""
+
+    def test_full_batch_is_written_by_writer(self) -> None:
+        """Test a full batch is written without waiting for the interval"""
+        store = RecordingStore(batch_size=3, flush_interval_ms=60_000)
+        for i in range(3):
+            store.append(turn(i))
+
+        assert store.written.wait(5)
+        assert store.batches == [[turn(0), turn(1), turn(2)]]
+        store.close()
+
+    def test_partial_batch_is_written_after_interval(self) -> None:
+        """Test queued entries are written once the flush interval passes"""
+        store = RecordingStore(batch_size=100, flush_interval_ms=10)
+        store.append(turn(0))
+
+        assert store.written.wait(5)
+        assert store.batches == [[turn(0)]]
+        store.close()
+
+    def test_close_writes_pending_entries(self) -> None:
+        """Test closing flushes entries still queued"""
+        store = RecordingStore(batch_size=100, flush_interval_ms=60_000)
+        store.append(turn(0))
+        assert store.batches == []
+
+        store.close()
+        assert store.batches == [[turn(0)]]
+        with pytest.raises(ValueError):
+            store.append(turn(1))
+
+    def test_failed_writes_are_retried(self) -> None:
+        """Test a batch that fails to write stays queued"""
+        store = RecordingStore(batch_size=100, flush_interval_ms=60_000)
+        store.append(turn(0))
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(store, "_write", lambda entries: 1 / 0)
+            with pytest.raises(ZeroDivisionError):
+                store.flush()
+
+        store.flush()
+        assert store.batches == [[turn(0)]]
+        store.close()
+
+    def test_failing_backend_is_retried_with_backoff(self) -> None:
+        """Test the writer backs off from a failing backend instead of spinning"""
+        store = RecordingStore(batch_size=1, flush_interval_ms=10)
+        attempts = []
+
+        def fail(entries: List[ChatHistoryEntry]) -> None:
+            attempts.append(time.monotonic())
+            raise OSError("disk full")
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(store, "_write", fail)
+            store.append(turn(0))
+            time.sleep(0.3)
+            assert isinstance(store.write_error, OSError)
+
+        # 10, 20, 40, 80 and 160 ms apart, not back to back
+        assert 1 <= len(attempts) <= 6
+        assert all(b - a >= 0.005 for a, b in zip(attempts, attempts[1:]))
+
+        store.flush()
+        assert store.batches == [[turn(0)]]
+        store.close()
+
+    def test_invalid_settings(self) -> None:
+        """Test batch sizes and intervals must be positive"""
+        with pytest.raises(ValueError):
+            RecordingStore(batch_size=0, flush_interval_ms=10)
+        with pytest.raises(ValueError):
+            RecordingStore(batch_size=1, flush_interval_ms=0)
+
+
+class TestSQLiteHistoryStore:
+    """Test SQLiteHistoryStore"""
+
+    def test_history_survives_restart(self, tmp_path: Path) -> None:
+        """Test a new store on the same database sees earlier entries"""
+        path = str(tmp_path / "history.db")
+        store = SQLiteHistoryStore(path)
+        store.append(turn(0))
+        store.close()
+
+        reopened = SQLiteHistoryStore(path)
+        reopened.append(turn(1))
+        assert reopened.entries() == [turn(0), turn(1)]
+        reopened.close()
+
+        journal_mode = sqlite3.connect(path).execute("PRAGMA journal_mode").fetchone()
+        assert journal_mode == ("wal",)
+
+    def test_max_entries_prunes_oldest(self, tmp_path: Path) -> None:
+        """Test old rows are pruned and cursors keep counting them"""
+        store = SQLiteHistoryStore(str(tmp_path / "history.db"), max_entries=2)
+        for i in range(4):
+            store.append(turn(i))
+
+        assert store.entries() == [turn(2), turn(3)]
+        assert store.page(0, 1) == {"history": [turn(2)], "next_cursor": 3}
+        store.close()
+
+    def test_stores_share_a_database(self, tmp_path: Path) -> None:
+        """Test two stores, e.g. in two workers, see each other's entries"""
+        path = str(tmp_path / "history.db")
+        first, second = SQLiteHistoryStore(path), SQLiteHistoryStore(path)
+        first.append(turn(0))
+        first.flush()
+        second.append(turn(1))
+
+        assert second.entries() == [turn(0), turn(1)]
+        first.close()
+        second.close()
+
+
+class TestLogHistoryStore:
+    """Test LogHistoryStore"""
+
+    def test_history_survives_restart(self, tmp_path: Path) -> None:
+        """Test a new store on the same file sees earlier entries"""
+        path = str(tmp_path / "history.jsonl")
+        store = LogHistoryStore(path, fsync=True)
+        store.append(turn(0))
+        store.close()
+
+        reopened = LogHistoryStore(path)
+        reopened.append(turn(1))
+        assert reopened.entries() == [turn(0), turn(1)]
+        reopened.close()
+
+    def test_partial_last_line_is_dropped(self, tmp_path: Path) -> None:
+        """Test a line torn by a crash is cut off when the log is reopened"""
+        path = tmp_path / "history.jsonl"
+        path.write_bytes(b'{"input": "a", "output": "b"}\n{"input": "tor')
+
+        store = LogHistoryStore(str(path))
+        store.append(turn(1))
+
+        assert store.entries() == [{"input": "a", "output": "b"}, turn(1)]
+        store.close()
+
+    def test_repair_waits_for_writer(self, tmp_path: Path) -> None:
+        """Test a line another process is still appending is not cut off"""
+        path = tmp_path / "history.jsonl"
+        path.write_bytes(b'{"input": "a", "output": "b"}\n{"input": "c", ')
+        opened: List[LogHistoryStore] = []
+
+        with open(path, "ab") as writer:
+            with locked(writer):
+                thread = threading.Thread(
+                    target=lambda: opened.append(LogHistoryStore(str(path)))
+                )
+                thread.start()
+                time.sleep(0.05)
+                assert not opened
+                writer.write(b'"output": "d"}\n')
+                writer.flush()
+            thread.join()
+
+        store = opened[0]
+        assert store.entries() == [
+            {"input": "a", "output": "b"},
+            {"input": "c", "output": "d"},
+        ]
+        store.close()
+
+
+class TestMmapHistoryStore:
+    """Test MmapHistoryStore"""
+
+    def test_index_tracks_entries(self, tmp_path: Path) -> None:
+        """Test the index holds one 8-byte end offset per entry"""
+        path = tmp_path / "history.jsonl"
+        store = MmapHistoryStore(str(path))
+        store.append(turn(0))
+        store.append({"input": "é", "output": "ß"})
+
+        assert len(store) == 2
+        assert store.entries() == [turn(0), {"input": "é", "output": "ß"}]
+        assert (tmp_path / "history.jsonl.idx").stat().st_size == 16
+        store.close()
+
+    def test_tail(self, tmp_path: Path) -> None:
+        """Test tail returns the newest entries, oldest first"""
+        store = MmapHistoryStore(str(tmp_path / "history.jsonl"))
+        for i in range(10):
+            store.append(turn(i))
+
+        assert store.tail(3) == [turn(7), turn(8), turn(9)]
+        assert store.tail(50) == [turn(i) for i in range(10)]
+        with pytest.raises(ValueError):
+            store.tail(0)
+        store.close()
+
+    def test_sees_appends_from_another_store(self, tmp_path: Path) -> None:
+        """Test reads remap the files after another writer appends"""
+        path = str(tmp_path / "history.jsonl")
+        first, second = MmapHistoryStore(path), MmapHistoryStore(path)
+        first.append(turn(0))
+        assert second.entries() == []
+        first.flush()
+        second.append(turn(1))
+
+        assert second.entries() == [turn(0), turn(1)]
+        assert first.page(1) == {"history": [turn(1)], "next_cursor": None}
+        first.close()
+        second.close()
+
+    def test_repairs_index_on_open(self, tmp_path: Path) -> None:
+        """Test unindexed data is indexed and dangling index records dropped"""
+        path = tmp_path / "history.jsonl"
+        # A log written by LogHistoryStore, with a line torn by a crash
+        path.write_bytes(
+            b'{"input": "in0", "output": "out0"}\n'
+            b'{"input": "in1", "output": "out1"}\n{"inp'
+        )
+        store = MmapHistoryStore(str(path))
+        assert store.entries() == [turn(0), turn(1)]
+        store.close()
+
+        # An index record whose data never made it to disk
+        index = tmp_path / "history.jsonl.idx"
+        index.write_bytes(index.read_bytes() + (10_000).to_bytes(8, "little") + b"x")
+        store = MmapHistoryStore(str(path))
+        store.append(turn(2))
+        assert store.entries() == [turn(0), turn(1), turn(2)]
+        assert index.stat().st_size == 24
+        store.close()
+
+
+class TestCreateHistoryStore:
+    """Test selecting a backend from config"""
+
+    def test_backends(self, tmp_path: Path) -> None:
+        """Test each backend name creates the matching store"""
+        memory = create_history_store({"max_entries": 5})
+        assert isinstance(memory, MemoryHistoryStore)
+        assert memory.buffer.max_entries == 5
+
+        sqlite_store = create_history_store(
+            {"backend": "sqlite", "path": str(tmp_path / "h.db"), "batch_size": 8}
+        )
+        assert isinstance(sqlite_store, SQLiteHistoryStore)
+        assert sqlite_store.batch_size == 8
+        sqlite_store.close()
+
+        log_store = create_history_store(
+            {"backend": "log", "path": str(tmp_path / "h.jsonl")}
+        )
+        assert isinstance(log_store, LogHistoryStore)
+        log_store.close()
+
+        mmap_store = create_history_store(
+            {"backend": "mmap", "path": str(tmp_path / "m.jsonl")}
+        )
+        assert isinstance(mmap_store, MmapHistoryStore)
+        mmap_store.close()
+
+    def test_invalid_settings(self) -> None:
+        """Test unknown backends and missing paths are rejected"""
+        with pytest.raises(ValueError, match="Unknown history backend"):
+            create_history_store({"backend": "redis"})
+        with pytest.raises(ValueError, match="requires a 'path'"):
+            create_history_store({"backend": "sqlite"})
+
+
+class StoreProcessor(OrchaelChatProcessor):
+    """Processor relying on the default history hooks"""
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        output = ChatOutput(input=chat_input["input"], output="ok")
+        self.record_history({"input": output["input"], "output": output["output"]})
+        return output
+
+
+class TestProcessorHistoryStore:
+    """Test the processor's default history hooks"""
+
+    def test_default_hooks_use_store(self, tmp_path: Path) -> None:
+        """Test record_history, get_history and pages go through the store"""
+        processor = StoreProcessor()
+        assert processor.get_history() == []
+
+        processor.history_store = SQLiteHistoryStore(str(tmp_path / "h.db"))
+        processor.process_chat(ChatInput(input="a", history=None))
+        processor.process_chat(ChatInput(input="b", history=None))
+
+        assert processor.get_history() == [
+            {"input": "a", "output": "ok"},
+            {"input": "b", "output": "ok"},
+        ]
+        assert processor.get_history_page(1, 1) == {
+            "history": [{"input": "b", "output": "ok"}],
+            "next_cursor": None,
+        }
+        processor.history_store.close()
@@ -80,9 +80,26 @@ class TestMainPackage:
 
         expected_items = {
             "OrchaelChatProcessor",
+            "WrapperChatProcessor",
             "ChatInput",
             "ChatOutput",
             "ChatHistoryEntry",
+            "ChatHistoryPage",
+            "ContextWindow",
+            "Compactor",
+            "CompactingChatProcessor",
+            "ProcessorSummarizer",
+            "HistoryBuffer",
+            "HistoryStore",
+            "MemoryHistoryStore",
+            "SQLiteHistoryStore",
+            "LogHistoryStore",
+            "MmapHistoryStore",
+            "ChatMiddleware",
+            "MiddlewareChatProcessor",
+            "ParallelChatProcessor",
+            "ParallelStrategy",
+            "HedgedChatProcessor",
             "set_env_vars_from_config",
         }
 
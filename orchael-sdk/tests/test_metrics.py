@@ -0,0 +1,126 @@
+"""
+Tests for the Prometheus-style metrics
+"""
+
+from typing import Dict, Optional
+
+import pytest
+
+from orchael_sdk.metrics import Counter, Gauge, Histogram, Registry
+
+
+class TestCounter:
+    """Test Counter and Gauge"""
+
+    def test_counter_without_labels(self) -> None:
+        """Test an unlabelled counter starts at zero and is rendered"""
+        counter = Counter("requests_total", "Requests")
+        assert list(counter.samples()) == ["requests_total 0"]
+
+        counter.inc()
+        counter.inc(2)
+        assert counter.value() == 3
+        assert counter.render() == [
+            "# HELP requests_total Requests",
+            "# TYPE requests_total counter",
+            "requests_total 3",
+        ]
+
+    def test_counter_with_labels(self) -> None:
+        """Test each set of label values gets its own series"""
+        counter = Counter("requests_total", "Requests", ("endpoint", "status"))
+        counter.inc(endpoint="/chat", status="200")
+        counter.inc(endpoint="/chat", status="200")
+        counter.inc(endpoint="/chat", status="500")
+
+        assert counter.value(endpoint="/chat", status="200") == 2
+        assert list(counter.samples()) == [
+            'requests_total{endpoint="/chat",status="200"} 2',
+            'requests_total{endpoint="/chat",status="500"} 1',
+        ]
+
+    def test_wrong_labels_are_rejected(self) -> None:
+        """Test label names must match the declared ones"""
+        counter = Counter("requests_total", "Requests", ("endpoint",))
+        with pytest.raises(ValueError):
+            counter.inc(status="200")
+
+    def test_label_values_are_escaped(self) -> None:
+        """Test quotes and backslashes in label values are escaped"""
+        counter = Counter("requests_total", "Requests", ("endpoint",))
+        counter.inc(endpoint='a"b\\c')
+        assert list(counter.samples()) == ['requests_total{endpoint="a\\"b\\\\c"} 1']
+
+    def test_gauge(self) -> None:
+        """Test gauges go up, down and can be set"""
+        gauge = Gauge("in_flight", "In flight")
+        gauge.inc()
+        gauge.inc()
+        gauge.dec()
+        assert gauge.value() == 1
+
+        gauge.set(0.25)
+        assert list(gauge.samples()) == ["in_flight 0.25"]
+
+
+class TestHistogram:
+    """Test Histogram"""
+
+    def test_observations_fill_cumulative_buckets(self) -> None:
+        """Test bucket counts are cumulative and include +Inf, sum and count"""
+        histogram = Histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in [0.05, 0.1, 0.5, 2.0]:
+            histogram.observe(value)
+
+        assert histogram.count() == 4
+        assert list(histogram.samples()) == [
+            'latency_seconds_bucket{le="0.1"} 2',
+            'latency_seconds_bucket{le="1"} 3',
+            'latency_seconds_bucket{le="+Inf"} 4',
+            "latency_seconds_sum 2.65",
+            "latency_seconds_count 4",
+        ]
+
+    def test_histogram_with_labels(self) -> None:
+        """Test labelled histograms only render series that were observed"""
+        histogram = Histogram("phase_seconds", "Phases", ("phase",), buckets=(1.0,))
+        assert list(histogram.samples()) == []
+
+        histogram.observe(0.5, phase="process")
+        assert histogram.count(phase="process") == 1
+        assert histogram.count(phase="queue_wait") == 0
+        assert list(histogram.samples()) == [
+            'phase_seconds_bucket{phase="process",le="1"} 1',
+            'phase_seconds_bucket{phase="process",le="+Inf"} 1',
+            'phase_seconds_sum{phase="process"} 0.5',
+            'phase_seconds_count{phase="process"} 1',
+        ]
+
+
+class TestRegistry:
+    """Test Registry"""
+
+    def test_render_all_metrics(self) -> None:
+        """Test every registered metric is rendered in registration order"""
+        registry = Registry()
+        registry.counter("a_total", "A").inc()
+        registry.gauge("b", "B").set(2)
+
+        assert registry.render() == (
+            "# HELP a_total A\n"
+            "# TYPE a_total counter\n"
+            "a_total 1\n"
+            "# HELP b B\n"
+            "# TYPE b gauge\n"
+            "b 2\n"
+        )
+
+    def test_callback_metrics_are_read_at_render(self) -> None:
+        """Test callback metrics report the current value, or nothing for None"""
+        registry = Registry()
+        values: Dict[str, Optional[int]] = {"hits": None}
+        registry.callback("hits_total", "Hits", lambda: values["hits"], "counter")
+        assert registry.render().splitlines()[-1] == "# TYPE hits_total counter"
+
+        values["hits"] = 5
+        assert "# TYPE hits_total counter\nhits_total 5\n" in registry.render()
@@ -0,0 +1,346 @@
+"""
+Tests for the middleware pipeline
+"""
+
+import asyncio
+from typing import Any, AsyncIterator, Iterator, List
+
+import pytest
+
+from orchael_sdk.chat_types import ChatHistoryEntry, ChatInput, ChatOutput
+from orchael_sdk.compaction import SUMMARY_INPUT, ProcessorSummarizer
+from orchael_sdk.history_store import MemoryHistoryStore
+from orchael_sdk.middleware import (
+    ChatMiddleware,
+    CompactionMiddleware,
+    ContextWindowMiddleware,
+    MiddlewareChatProcessor,
+    apply_middleware,
+    create_middleware,
+)
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor, overrides
+
+
+def turn(i: int) -> ChatHistoryEntry:
+    """Build a history entry numbered i"""
+    return {"input": f"in{i}", "output": f"out{i}"}
+
+
+class EchoProcessor(OrchaelChatProcessor):
+    """Processor that echoes its input and the length of its history"""
+
+    def __init__(self) -> None:
+        self.history_store = MemoryHistoryStore()
+        self.seen: List[ChatInput] = []
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.seen.append(chat_input)
+        history = chat_input.get("history") or []
+        output = ChatOutput(
+            input=chat_input["input"], output=f"{chat_input['input']}/{len(history)}"
+        )
+        self.record_history({"input": output["input"], "output": output["output"]})
+        return output
+
+
+class AsyncEchoProcessor(EchoProcessor):
+    """EchoProcessor with native async and streaming hooks"""
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        await asyncio.sleep(0)
+        return self.process_chat(chat_input)
+
+    async def astream_chat(self, chat_input: ChatInput) -> AsyncIterator[str]:
+        output = (await self.aprocess_chat(chat_input))["output"]
+        for char in output:
+            yield char
+
+
+class StreamingEchoProcessor(EchoProcessor):
+    """EchoProcessor that streams one character at a time"""
+
+    def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+        yield from self.process_chat(chat_input)["output"]
+
+
+class BatchingEchoProcessor(EchoProcessor):
+    """EchoProcessor that records the batches it is called with"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches: List[List[str]] = []
+
+    def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        self.batches.append([chat_input["input"] for chat_input in chat_inputs])
+        return [self.process_chat(chat_input) for chat_input in chat_inputs]
+
+
+class AsyncBatchingEchoProcessor(BatchingEchoProcessor):
+    """BatchingEchoProcessor with a native async batch hook"""
+
+    async def aprocess_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+        await asyncio.sleep(0)
+        return self.process_batch(chat_inputs)
+
+
+class TaggingMiddleware(ChatMiddleware):
+    """Middleware that appends its tag to inputs and outputs"""
+
+    def __init__(self, tag: str, log: List[str]) -> None:
+        self.tag = tag
+        self.log = log
+
+    def before(self, chat_input: ChatInput) -> ChatInput:
+        self.log.append(f"before {self.tag}")
+        return ChatInput(
+            input=chat_input["input"] + self.tag, history=chat_input["history"]
+        )
+
+    def after(self, chat_input: ChatInput, output: ChatOutput) -> ChatOutput:
+        self.log.append(f"after {self.tag}")
+        return ChatOutput(input=output["input"], output=output["output"] + self.tag)
+
+
+class RejectingMiddleware(ChatMiddleware):
+    """Middleware that rejects empty inputs"""
+
+    def before(self, chat_input: ChatInput) -> ChatInput:
+        if not chat_input["input"]:
+            raise ValueError("input must not be empty")
+        return chat_input
+
+
+class AsyncOnlyAfterMiddleware(ChatMiddleware):
+    """Middleware whose after hook has a separate async implementation"""
+
+    def after(self, chat_input: ChatInput, output: ChatOutput) -> ChatOutput:
+        return ChatOutput(input=output["input"], output="sync")
+
+    async def aafter(self, chat_input: ChatInput, output: ChatOutput) -> ChatOutput:
+        return ChatOutput(input=output["input"], output="async")
+
+
+class OptionsMiddleware(ChatMiddleware):
+    """Middleware created from config settings"""
+
+    def __init__(self, suffix: str = "") -> None:
+        self.suffix = suffix
+
+
+def summarize(summary: str, turns: List[ChatHistoryEntry]) -> str:
+    """Summarizer referenced by import path from config"""
+    return " ".join(filter(None, [summary] + [entry["input"] for entry in turns]))
+
+
+class TestMiddlewareChatProcessor:
+    """Test MiddlewareChatProcessor"""
+
+    def test_hooks_wrap_the_processor_in_order(self) -> None:
+        """Test before hooks run in order and after hooks in reverse"""
+        log: List[str] = []
+        inner = EchoProcessor()
+        processor = MiddlewareChatProcessor(
+            inner, [TaggingMiddleware("a", log), TaggingMiddleware("b", log)]
+        )
+
+        output = processor.process_chat(ChatInput(input="x", history=None))
+
+        assert inner.seen[0]["input"] == "xab"
+        assert output == {"input": "xab", "output": "xab/0ba"}
+        assert log == ["before a", "before b", "after b", "after a"]
+
+    def test_only_overridden_hooks_are_called(self) -> None:
+        """Test middleware without a hook adds no call for it"""
+        processor = MiddlewareChatProcessor(
+            EchoProcessor(), [RejectingMiddleware(), ChatMiddleware()]
+        )
+
+        assert len(processor._before) == 1
+        assert processor._after == []
+        with pytest.raises(ValueError):
+            processor.process_chat(ChatInput(input="", history=None))
+
+    @pytest.mark.parametrize("inner_class", [EchoProcessor, AsyncEchoProcessor])
+    def test_async_calls(self, inner_class: type) -> None:
+        """Test the async hooks wrap sync and async processors alike"""
+        log: List[str] = []
+        processor = MiddlewareChatProcessor(
+            inner_class(), [TaggingMiddleware("a", log)]
+        )
+
+        output = asyncio.run(processor.aprocess_chat(ChatInput(input="x", history=[])))
+
+        assert output == {"input": "xa", "output": "xa/0a"}
+        assert log == ["before a", "after a"]
+
+    def test_async_hooks_are_preferred(self) -> None:
+        """Test async processors use the async variant of a hook"""
+        chat_input = ChatInput(input="x", history=[])
+
+        sync_output = MiddlewareChatProcessor(
+            AsyncEchoProcessor(), [AsyncOnlyAfterMiddleware()]
+        ).process_chat(chat_input)
+        async_output = asyncio.run(
+            MiddlewareChatProcessor(
+                AsyncEchoProcessor(), [AsyncOnlyAfterMiddleware()]
+            ).aprocess_chat(chat_input)
+        )
+
+        assert sync_output["output"] == "sync"
+        assert async_output["output"] == "async"
+
+    @pytest.mark.parametrize(
+        "inner_class", [EchoProcessor, StreamingEchoProcessor, AsyncEchoProcessor]
+    )
+    def test_streaming_sees_whole_output(self, inner_class: type) -> None:
+        """Test streams pass through and after hooks see the complete output"""
+        seen: List[ChatOutput] = []
+
+        class Recording(ChatMiddleware):
+            def after(self, chat_input: ChatInput, output: ChatOutput) -> ChatOutput:
+                seen.append(output)
+                return output
+
+        processor = MiddlewareChatProcessor(inner_class(), [Recording()])
+        chat_input = ChatInput(input="hi", history=[turn(0)])
+
+        async def collect() -> List[str]:
+            return [chunk async for chunk in processor.astream_chat(chat_input)]
+
+        assert "".join(processor.stream_chat(chat_input)) == "hi/1"
+        assert "".join(asyncio.run(collect())) == "hi/1"
+        assert seen == [{"input": "hi", "output": "hi/1"}] * 2
+
+    @pytest.mark.parametrize(
+        "inner_class", [BatchingEchoProcessor, AsyncBatchingEchoProcessor]
+    )
+    def test_batches_pass_through_the_hooks(self, inner_class: type) -> None:
+        """Test batches reach the wrapped batch hooks with every input wrapped"""
+        inner = inner_class()
+        processor = MiddlewareChatProcessor(inner, [TaggingMiddleware("a", [])])
+        chat_inputs = [ChatInput(input=str(i), history=[]) for i in range(2)]
+
+        outputs = asyncio.run(processor.aprocess_batch(chat_inputs))
+
+        assert outputs == [
+            {"input": "0a", "output": "0a/0a"},
+            {"input": "1a", "output": "1a/0a"},
+        ]
+        assert processor.process_batch(chat_inputs) == outputs
+        assert inner.batches == [["0a", "1a"]] * 2
+
+    def test_wrapped_hooks_decide_what_is_overridden(self) -> None:
+        """Test the wrapper reports the optional hooks of the processor it wraps"""
+        sync_processor = MiddlewareChatProcessor(EchoProcessor(), [])
+        async_processor = MiddlewareChatProcessor(AsyncBatchingEchoProcessor(), [])
+
+        assert not overrides(sync_processor, "aprocess_chat")
+        assert not overrides(sync_processor, "process_batch")
+        assert overrides(async_processor, "aprocess_batch")
+        assert overrides(sync_processor, "get_history")
+
+    def test_history_is_the_wrapped_processors(self) -> None:
+        """Test history, warmup and the store are delegated"""
+        inner = EchoProcessor()
+        processor = MiddlewareChatProcessor(inner, [])
+        processor.process_chat(ChatInput(input="x", history=None))
+
+        assert processor.get_history() == [{"input": "x", "output": "x/0"}]
+        assert processor.get_history_page(0, 1)["history"] == processor.get_history()
+        assert asyncio.run(processor.aget_history()) == processor.get_history()
+
+        store = MemoryHistoryStore()
+        processor.history_store = store
+        assert inner.history_store is store
+
+
+class TestBuiltinMiddleware:
+    """Test the context window and compaction middleware"""
+
+    def test_context_window(self) -> None:
+        """Test the context window trims history before the processor"""
+        inner = EchoProcessor()
+        processor = apply_middleware(inner, [{"context_window": {"max_turns": 2}}])
+
+        output = processor.process_chat(
+            ChatInput(input="x", history=[turn(i) for i in range(5)])
+        )
+
+        assert output["output"] == "x/2"
+        assert inner.seen[0]["history"] == [turn(3), turn(4)]
+
+    def test_compaction(self) -> None:
+        """Test compaction loads its summarizer from an import path"""
+        middleware = create_middleware(
+            "compaction",
+            {
+                "summarizer": "tests.test_middleware.summarize",
+                "every": 2,
+                "keep_turns": 1,
+                "window": {"max_turns": 1},
+            },
+        )
+        assert isinstance(middleware, CompactionMiddleware)
+
+        chat_input = middleware.before(
+            ChatInput(input="x", history=[turn(i) for i in range(4)])
+        )
+
+        assert chat_input["history"] == [
+            {"input": SUMMARY_INPUT, "output": "in0 in1"},
+            turn(3),
+        ]
+
+    def test_processor_summarizer_from_config(self) -> None:
+        """Test a processor class is used to summarize through a prompt"""
+        middleware = create_middleware(
+            "compaction", {"summarizer": "tests.test_middleware.EchoProcessor"}
+        )
+
+        assert isinstance(middleware, CompactionMiddleware)
+        assert isinstance(middleware.compactor.summarizer, ProcessorSummarizer)
+
+
+class TestApplyMiddleware:
+    """Test building the pipeline from config"""
+
+    def test_no_middleware_returns_processor(self) -> None:
+        """Test the processor itself is used when nothing is configured"""
+        processor = EchoProcessor()
+
+        assert apply_middleware(processor, None) is processor
+        assert apply_middleware(processor, []) is processor
+
+    def test_custom_middleware(self) -> None:
+        """Test middleware classes are created from their import path"""
+        processor = apply_middleware(
+            EchoProcessor(),
+            [
+                "tests.test_middleware.RejectingMiddleware",
+                {"tests.test_middleware.OptionsMiddleware": {"suffix": "!"}},
+                {"context_window": {"max_tokens": 100}},
+            ],
+        )
+
+        assert isinstance(processor, MiddlewareChatProcessor)
+        rejecting, options, window = processor.middlewares
+        assert isinstance(rejecting, RejectingMiddleware)
+        assert isinstance(options, OptionsMiddleware) and options.suffix == "!"
+        assert isinstance(window, ContextWindowMiddleware)
+
+    @pytest.mark.parametrize(
+        "settings",
+        [
+            {"middleware": "context_window"},
+            ["context_window"],
+            ["tests.test_middleware.EchoProcessor"],
+            ["tests.test_middleware.Missing"],
+            ["no_module_path"],
+            [{"a": {}, "b": {}}],
+            [{"compaction": {}}],
+        ],
+    )
+    def test_invalid_config(self, settings: Any) -> None:
+        """Test invalid middleware sections are rejected"""
+        with pytest.raises(ValueError):
+            apply_middleware(EchoProcessor(), settings)
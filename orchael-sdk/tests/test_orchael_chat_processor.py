@@ -2,9 +2,10 @@
 Tests for OrchaelChatProcessor abstract base class
 """
 
+import asyncio
 from abc import ABC
-from typing import List, Set
-from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor
+from typing import AsyncIterator, Iterator, List, Set
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor, overrides
 from orchael_sdk.chat_types import ChatInput, ChatOutput, ChatHistoryEntry
 
 
@@ -29,6 +30,32 @@ class ConcreteChatProcessor(OrchaelChatProcessor):
         return self._history
 
 
+class AsyncChatProcessor(ConcreteChatProcessor):
+    """Processor with a native async implementation"""
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        """Async echo implementation for testing"""
+        await asyncio.sleep(0)
+        return ChatOutput(input=chat_input["input"], output="Async echo")
+
+
+class StreamingChatProcessor(ConcreteChatProcessor):
+    """Processor that streams its output word by word"""
+
+    def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+        """Stream the echo one word at a time"""
+        chunks = []
+        for word in f"Echo: {chat_input['input']}".split(" "):
+            chunks.append(word)
+            yield word + " "
+        self._history.append({"input": chat_input["input"], "output": " ".join(chunks)})
+
+
+async def collect(chunks: AsyncIterator[str]) -> List[str]:
+    """Collect an async iterator into a list"""
+    return [chunk async for chunk in chunks]
+
+
 class TestOrchaelChatProcessor:
     """Test OrchaelChatProcessor abstract base class"""
 
@@ -76,3 +103,110 @@ class TestOrchaelChatProcessor:
         # Check get_history signature
         get_history_sig = OrchaelChatProcessor.get_history.__annotations__
         assert get_history_sig["return"] == List[ChatHistoryEntry]
+
+    def test_default_aprocess_chat_adapts_process_chat(self) -> None:
+        """Test the default async adapter delegates to process_chat"""
+        processor = ConcreteChatProcessor()
+
+        result = asyncio.run(
+            processor.aprocess_chat(ChatInput(input="Hello", history=None))
+        )
+
+        assert result["output"] == "Echo: Hello"
+        assert asyncio.run(processor.aget_history()) == processor.get_history()
+
+    def test_overrides(self) -> None:
+        """Test detection of processors with their own async implementation"""
+        assert not overrides(ConcreteChatProcessor(), "aprocess_chat")
+        assert overrides(AsyncChatProcessor(), "aprocess_chat")
+        assert not overrides(AsyncChatProcessor(), "aget_history")
+        assert not overrides(object(), "aprocess_chat")
+
+    def test_default_stream_chat_yields_single_chunk(self) -> None:
+        """Test non-streaming processors yield their whole output once"""
+        processor = ConcreteChatProcessor()
+
+        chunks = list(processor.stream_chat(ChatInput(input="Hello", history=None)))
+
+        assert chunks == ["Echo: Hello"]
+        assert len(processor.get_history()) == 1
+
+    def test_default_astream_chat_single_chunk(self) -> None:
+        """Test the async stream falls back to aprocess_chat"""
+        processor = AsyncChatProcessor()
+
+        chunks = asyncio.run(
+            collect(processor.astream_chat(ChatInput(input="Hello", history=None)))
+        )
+
+        assert chunks == ["Async echo"]
+
+    def test_default_astream_chat_adapts_stream_chat(self) -> None:
+        """Test the async stream iterates an overridden stream_chat"""
+        processor = StreamingChatProcessor()
+
+        chunks = asyncio.run(
+            collect(processor.astream_chat(ChatInput(input="Hi there", history=None)))
+        )
+
+        assert chunks == ["Echo: ", "Hi ", "there "]
+        assert processor.get_history()[0]["output"] == "Echo: Hi there"
+
+    def test_default_warmup_is_noop(self) -> None:
+        """Test the default warmup hook does nothing"""
+        processor = ConcreteChatProcessor()
+        processor.warmup()
+        assert processor.get_history() == []
+
+    def test_default_process_batch_preserves_order(self) -> None:
+        """Test the default batch fans out and keeps input order"""
+        processor = ConcreteChatProcessor()
+        inputs = [ChatInput(input=str(i), history=None) for i in range(20)]
+
+        results = processor.process_batch(inputs)
+
+        assert [result["output"] for result in results] == [
+            f"Echo: {i}" for i in range(20)
+        ]
+        assert len(processor.get_history()) == 20
+
+    def test_default_aprocess_batch_uses_aprocess_chat(self) -> None:
+        """Test the async batch awaits aprocess_chat for each input"""
+        processor = AsyncChatProcessor()
+        inputs = [ChatInput(input=str(i), history=None) for i in range(3)]
+
+        results = asyncio.run(processor.aprocess_batch(inputs))
+
+        assert [result["input"] for result in results] == ["0", "1", "2"]
+        assert all(result["output"] == "Async echo" for result in results)
+
+    def test_default_aprocess_batch_uses_overridden_process_batch(self) -> None:
+        """Test the async batch delegates to an overridden process_batch"""
+
+        class BatchingProcessor(ConcreteChatProcessor):
+            def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+                return [
+                    ChatOutput(input=chat_input["input"], output="batched")
+                    for chat_input in chat_inputs
+                ]
+
+        results = asyncio.run(
+            BatchingProcessor().aprocess_batch([ChatInput(input="a", history=None)])
+        )
+
+        assert results == [{"input": "a", "output": "batched"}]
+
+    def test_default_get_history_page_slices_history(self) -> None:
+        """Test the default paging hook slices get_history"""
+        processor = ConcreteChatProcessor()
+        processor.process_batch(
+            [ChatInput(input=str(i), history=None) for i in range(3)]
+        )
+
+        page = processor.get_history_page(cursor=1, limit=1)
+
+        assert page == {
+            "history": [{"input": "1", "output": "Echo: 1"}],
+            "next_cursor": 2,
+        }
+        assert processor.get_history_page(cursor=2)["next_cursor"] is None
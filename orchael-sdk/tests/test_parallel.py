@@ -0,0 +1,235 @@
+"""
+Tests for parallel fan-out over processors
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+
+import pytest
+
+from orchael_sdk.chat_types import ChatInput, ChatOutput
+from orchael_sdk.history_store import MemoryHistoryStore
+from orchael_sdk.orchael_chat_processor import OrchaelChatProcessor
+from orchael_sdk.parallel import (
+    BestScored,
+    MergeAll,
+    ParallelChatProcessor,
+    create_strategy,
+)
+
+
+class SleepyProcessor(OrchaelChatProcessor):
+    """Synchronous processor that answers after a delay, or fails"""
+
+    def __init__(
+        self, output: str, delay: float = 0.0, error: Optional[Exception] = None
+    ) -> None:
+        self.output = output
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.warmed_up = False
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        return ChatOutput(input=chat_input["input"], output=self.output)
+
+    def warmup(self) -> None:
+        self.warmed_up = True
+
+
+class AsyncSleepyProcessor(SleepyProcessor):
+    """Async processor that records whether it was cancelled"""
+
+    def __init__(self, output: str, delay: float = 0.0) -> None:
+        super().__init__(output, delay)
+        self.cancelled = False
+
+    async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        return ChatOutput(input=chat_input["input"], output=self.output)
+
+
+class BlockedProcessor(OrchaelChatProcessor):
+    """Synchronous processor that blocks until released"""
+
+    def __init__(self) -> None:
+        self.release = threading.Event()
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.release.wait(5)
+        return ChatOutput(input=chat_input["input"], output="blocked")
+
+
+def ask(processor: OrchaelChatProcessor, text: str = "hi") -> ChatOutput:
+    """Process an input without history"""
+    return processor.process_chat(ChatInput(input=text, history=None))
+
+
+class TestFirstSuccess:
+    """Test the default first_success strategy"""
+
+    def test_returns_fastest_output(self) -> None:
+        """Test the first processor to answer wins"""
+        processor = ParallelChatProcessor(
+            [SleepyProcessor("slow", delay=0.2), SleepyProcessor("fast")]
+        )
+
+        assert ask(processor) == {"input": "hi", "output": "fast"}
+
+    def test_skips_failures(self) -> None:
+        """Test a failing processor does not decide the result"""
+        processor = ParallelChatProcessor(
+            [
+                SleepyProcessor("", error=RuntimeError("down")),
+                SleepyProcessor("ok", delay=0.05),
+            ]
+        )
+
+        assert ask(processor)["output"] == "ok"
+
+    def test_raises_when_all_fail(self) -> None:
+        """Test the first error is raised when no processor succeeds"""
+        processor = ParallelChatProcessor(
+            [
+                SleepyProcessor("", error=RuntimeError("first")),
+                SleepyProcessor("", delay=0.05, error=ValueError("second")),
+            ]
+        )
+
+        with pytest.raises(RuntimeError, match="first"):
+            ask(processor)
+
+    def test_does_not_wait_for_slow_sync_processor(self) -> None:
+        """Test the sync call returns without waiting for losing threads"""
+        blocked = BlockedProcessor()
+        processor = ParallelChatProcessor([blocked, SleepyProcessor("fast")])
+
+        start = time.perf_counter()
+        try:
+            assert ask(processor)["output"] == "fast"
+            assert time.perf_counter() - start < 2
+        finally:
+            blocked.release.set()
+
+    def test_cancels_async_losers(self) -> None:
+        """Test async processors still running are cancelled"""
+        slow = AsyncSleepyProcessor("slow", delay=5)
+        processor = ParallelChatProcessor([slow, AsyncSleepyProcessor("fast")])
+
+        output = asyncio.run(processor.aprocess_chat(ChatInput(input="hi", history=[])))
+
+        assert output["output"] == "fast"
+        assert slow.cancelled
+
+
+class TestMergeAndScore:
+    """Test the merge_all and best_scored strategies"""
+
+    def test_merge_all(self) -> None:
+        """Test successful outputs are merged in processor order"""
+        processor = ParallelChatProcessor(
+            [
+                SleepyProcessor("a", delay=0.05),
+                SleepyProcessor("", error=RuntimeError("down")),
+                SleepyProcessor("b"),
+            ],
+            strategy="merge_all",
+        )
+
+        assert ask(processor)["output"] == "a\n\nb"
+
+    def test_merge_timeout_leaves_out_slow_processors(self) -> None:
+        """Test processors still running after the timeout are left out"""
+        blocked = BlockedProcessor()
+        processor = ParallelChatProcessor(
+            [blocked, SleepyProcessor("a"), SleepyProcessor("b")],
+            strategy=MergeAll(timeout=0.1),
+        )
+
+        try:
+            assert ask(processor)["output"] == "a\n\nb"
+        finally:
+            blocked.release.set()
+
+    def test_timeout_waits_for_first_success(self) -> None:
+        """Test the first later success is used when none arrive in time"""
+        processor = ParallelChatProcessor(
+            [SleepyProcessor("late", delay=0.1), SleepyProcessor("later", delay=0.3)],
+            strategy=BestScored(lambda chat_input, output: 0, timeout=0.01),
+        )
+
+        assert ask(processor)["output"] == "late"
+
+    def test_best_scored(self) -> None:
+        """Test the output with the highest score wins"""
+        processor = ParallelChatProcessor(
+            [SleepyProcessor("short"), SleepyProcessor("much longer", delay=0.05)],
+            strategy="best_scored",
+            scorer=lambda chat_input, output: len(output["output"]),
+        )
+
+        assert ask(processor)["output"] == "much longer"
+
+    def test_invalid_strategy(self) -> None:
+        """Test unknown strategies and missing scorers are rejected"""
+        with pytest.raises(ValueError):
+            create_strategy("fastest")
+        with pytest.raises(ValueError):
+            create_strategy("best_scored")
+        with pytest.raises(ValueError):
+            ParallelChatProcessor([])
+
+
+class TestParallelChatProcessor:
+    """Test the composite processor's other hooks"""
+
+    def test_records_chosen_turn(self) -> None:
+        """Test the returned output is recorded in the composite's history"""
+        processor = ParallelChatProcessor([SleepyProcessor("a"), SleepyProcessor("b")])
+        processor.history_store = MemoryHistoryStore()
+
+        output = ask(processor)
+
+        assert processor.get_history() == [{"input": "hi", "output": output["output"]}]
+
+    def test_sync_processors_run_on_executor(self) -> None:
+        """Test synchronous processors are called on the configured executor"""
+        threads = []
+
+        class ThreadRecording(OrchaelChatProcessor):
+            def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+                threads.append(threading.current_thread().name)
+                return ChatOutput(input=chat_input["input"], output="ok")
+
+        processor = ParallelChatProcessor([ThreadRecording(), ThreadRecording()])
+        with ThreadPoolExecutor(2, thread_name_prefix="parallel-test") as executor:
+            processor.executor = executor
+            ask(processor)
+
+        assert threads and all(name.startswith("parallel-test") for name in threads)
+
+    def test_warms_up_every_processor(self) -> None:
+        """Test warmup reaches all processors"""
+        children: List[SleepyProcessor] = [SleepyProcessor("a"), SleepyProcessor("b")]
+        ParallelChatProcessor(children).warmup()
+
+        assert all(child.warmed_up for child in children)
+
+    def test_cacheable_only_if_all_processors_are(self) -> None:
+        """Test one uncacheable processor makes the composite uncacheable"""
+        uncacheable = SleepyProcessor("b")
+        uncacheable.cacheable = False
+
+        assert ParallelChatProcessor([SleepyProcessor("a")]).cacheable
+        assert not ParallelChatProcessor([SleepyProcessor("a"), uncacheable]).cacheable
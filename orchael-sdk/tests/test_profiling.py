@@ -0,0 +1,97 @@
+"""
+Tests for sampling CPU and allocation profiling
+"""
+
+import threading
+import time
+import tracemalloc
+from typing import Iterator, List
+
+import pytest
+
+from orchael_sdk.profiling import StackSampler, top_allocations
+
+
+def spin(seconds: float) -> None:
+    """Keep the CPU busy"""
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+
+@pytest.fixture
+def tracing() -> Iterator[None]:
+    """Trace allocations for the duration of a test"""
+    tracemalloc.start()
+    yield
+    tracemalloc.stop()
+
+
+class TestStackSampler:
+    """Test StackSampler"""
+
+    def test_samples_stacks_by_phase(self) -> None:
+        """Test busy functions are sampled under the phase they ran in"""
+        with StackSampler(interval=0.001) as sampler:
+            sampler.phase = "request"
+            spin(0.1)
+
+        assert sampler.samples["request"] > 10
+        lines = sampler.collapsed()
+        spinning = [line for line in lines if ";spin (" in line]
+        assert spinning and all(line.startswith("request;") for line in spinning)
+        stack, count = spinning[0].rsplit(" ", 1)
+        assert int(count) > 0
+        assert "test_samples_stacks_by_phase" in stack
+
+    def test_waiting_threads_are_left_out(self) -> None:
+        """Test threads parked in a wait are counted as idle, not sampled"""
+        stop = threading.Event()
+        waiter = threading.Thread(target=stop.wait)
+        waiter.start()
+        try:
+            with StackSampler(interval=0.001) as sampler:
+                spin(0.05)
+            with StackSampler(interval=0.001, include_idle=True) as everything:
+                spin(0.05)
+        finally:
+            stop.set()
+            waiter.join()
+
+        assert sampler.idle["main"] > 0
+        assert not any(";wait (" in line for line in sampler.collapsed())
+        assert any(";wait (" in line for line in everything.collapsed())
+        assert any(";spin (" in line for line in sampler.collapsed())
+
+    def test_invalid_interval(self) -> None:
+        """Test the interval must be positive"""
+        with pytest.raises(ValueError):
+            StackSampler(interval=0)
+
+
+class TestTopAllocations:
+    """Test top_allocations"""
+
+    def test_reports_largest_sites(self, tracing: None) -> None:
+        """Test the largest allocation site comes first"""
+        kept = [bytearray(100_000) for _ in range(3)]
+
+        allocations = top_allocations(tracemalloc.take_snapshot(), limit=3)
+
+        assert len(allocations) == 3
+        assert allocations[0]["size"] >= 300_000
+        assert allocations[0]["count"] >= 3
+        assert allocations[0]["location"].startswith(__file__)
+        del kept
+
+    def test_baseline_counts_new_memory_only(self, tracing: None) -> None:
+        """Test memory allocated before the baseline is left out"""
+        before = [bytearray(200_000)]
+        baseline = tracemalloc.take_snapshot()
+        after: List[bytearray] = [bytearray(50_000)]
+
+        allocations = top_allocations(tracemalloc.take_snapshot(), baseline)
+
+        assert 50_000 <= allocations[0]["size"] < 200_000
+        assert all(allocation["size"] > 0 for allocation in allocations)
+        del before, after
@@ -2,10 +2,29 @@
 Tests for the FastAPI server
 """
 
+import asyncio
+import itertools
+import os
+import threading
+import json
+from typing import Any, Dict, Generator, Iterator, List, Optional
+
 import pytest
 from unittest.mock import MagicMock, patch
 from fastapi.testclient import TestClient
 
+from orchael_sdk import server, OrchaelChatProcessor
+from orchael_sdk.admission import AdaptiveLimiter
+from orchael_sdk.chat_types import (
+    ChatHistoryEntry,
+    ChatHistoryPage,
+    ChatInput,
+    ChatOutput,
+)
+from orchael_sdk.history import HistoryBuffer
+from orchael_sdk.history_store import SQLiteHistoryStore
+from orchael_sdk.middleware import ChatMiddleware, MiddlewareChatProcessor
+from orchael_sdk.parallel import ParallelChatProcessor
 from orchael_sdk.server import app
 
 
@@ -25,12 +44,44 @@ class MockProcessor:
         ]
 
 
+class MockChatProcessor(OrchaelChatProcessor):
+    """MockProcessor as a real OrchaelChatProcessor, for tests using its hooks"""
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        return ChatOutput(
+            input=chat_input["input"],
+            output=f"Mock response to: {chat_input['input']}",
+        )
+
+    def get_history(self) -> List[ChatHistoryEntry]:
+        return [
+            {"input": "test input 1", "output": "test output 1"},
+            {"input": "test input 2", "output": "test output 2"},
+        ]
+
+
 @pytest.fixture
 def client() -> TestClient:
     """Test client for FastAPI app"""
     return TestClient(app)
 
 
+@pytest.fixture
+def reset_worker_pool() -> Generator[None, None, None]:
+    """Reset the server's worker pool and config around a test"""
+    original_config = server.config
+    original_env = os.environ.pop("ORCHAEL_MAX_WORKERS", None)
+    server.shutdown_executor()
+
+    yield
+
+    server.shutdown_executor()
+    server.config = original_config
+    os.environ.pop("ORCHAEL_MAX_WORKERS", None)
+    if original_env is not None:
+        os.environ["ORCHAEL_MAX_WORKERS"] = original_env
+
+
 @pytest.fixture
 def mock_processor() -> MockProcessor:
     """Mock processor instance"""
@@ -100,3 +151,1376 @@ def test_chat_endpoint_with_history(
         data = response.json()
         assert data["input"] == "Hello, world!"
         assert data["output"] == "Mock response to: Hello, world!"
+
+
+@pytest.mark.usefixtures("reset_worker_pool")
+class TestWorkerPool:
+    """Test dispatching synchronous processor calls onto the worker pool"""
+
+    def test_default_max_workers(self) -> None:
+        """Test the pool size falls back to the default"""
+        server.config = None
+        assert server.get_max_workers() == server.DEFAULT_MAX_WORKERS
+
+    def test_max_workers_from_config(self) -> None:
+        """Test the pool size is read from the 'server' config section"""
+        server.config = {"processor_class": "m.C", "server": {"max_workers": 3}}
+        assert server.get_max_workers() == 3
+
+    def test_max_workers_env_overrides_config(self) -> None:
+        """Test ORCHAEL_MAX_WORKERS (set by the CLI flag) wins over config"""
+        server.config = {"processor_class": "m.C", "server": {"max_workers": 3}}
+        os.environ["ORCHAEL_MAX_WORKERS"] = "5"
+        assert server.get_max_workers() == 5
+
+    @pytest.mark.parametrize("value", ["zero", 0, -1])
+    def test_invalid_max_workers(self, value: object) -> None:
+        """Test invalid pool sizes are rejected"""
+        server.config = {"processor_class": "m.C", "server": {"max_workers": value}}
+        with pytest.raises(ValueError):
+            server.get_max_workers()
+
+    def test_executor_is_bounded(self) -> None:
+        """Test the executor is created once with the configured size"""
+        os.environ["ORCHAEL_MAX_WORKERS"] = "2"
+        executor = server.get_executor()
+        assert executor is server.get_executor()
+        assert executor._max_workers == 2
+
+    def test_run_in_worker_uses_pool_thread(self) -> None:
+        """Test blocking calls run on a pool thread, not the event loop thread"""
+        thread_name = asyncio.run(
+            server.run_in_worker(lambda: threading.current_thread().name)
+        )
+        assert thread_name.startswith("orchael-worker")
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_chat_runs_processor_off_event_loop(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test the chat endpoint runs process_chat on the worker pool"""
+        seen_threads = []
+
+        class ThreadRecordingProcessor(MockProcessor):
+            def process_chat(self, chat_input: dict) -> dict:  # type: ignore[type-arg]
+                seen_threads.append(threading.current_thread().name)
+                return super().process_chat(chat_input)
+
+        mock_get_processor.return_value = ThreadRecordingProcessor()
+
+        response = client.post("/chat", json={"input": "hi", "history": []})
+
+        assert response.status_code == 200
+        assert seen_threads[0].startswith("orchael-worker")
+
+
+@pytest.mark.usefixtures("reset_worker_pool")
+@patch("orchael_sdk.server.get_processor")
+def test_chat_awaits_native_async_processor(
+    mock_get_processor: MagicMock, client: TestClient
+) -> None:
+    """Test processors implementing aprocess_chat are awaited on the event loop"""
+    seen_threads = []
+
+    class AsyncProcessor(OrchaelChatProcessor):
+        def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+            raise AssertionError("sync path should not be used")
+
+        async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+            seen_threads.append(threading.current_thread().name)
+            return ChatOutput(input=chat_input["input"], output="async")
+
+        def get_history(self) -> List[ChatHistoryEntry]:
+            return []
+
+    mock_get_processor.return_value = AsyncProcessor()
+
+    response = client.post("/chat", json={"input": "hi", "history": []})
+
+    assert response.status_code == 200
+    assert response.json()["output"] == "async"
+    assert not seen_threads[0].startswith("orchael-worker")
+
+
+def parse_sse(body: str) -> List[Dict[str, Any]]:
+    """Parse a Server-Sent Events body into a list of events"""
+    events = []
+    for message in body.strip().split("\n\n"):
+        event: Dict[str, Any] = {"event": "message"}
+        for line in message.split("\n"):
+            field, _, value = line.partition(": ")
+            if field == "event":
+                event["event"] = value
+            elif field == "data":
+                event["data"] = json.loads(value)
+        events.append(event)
+    return events
+
+
+@pytest.mark.usefixtures("reset_worker_pool")
+class TestChatStream:
+    """Test the Server-Sent Events streaming endpoint"""
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_stream_falls_back_to_single_chunk(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test non-streaming processors produce one chunk and a done event"""
+        mock_get_processor.return_value = mock_processor
+
+        response = client.post("/chat/stream", json={"input": "Hello"})
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.text)
+        assert events == [
+            {"event": "message", "data": {"chunk": "Mock response to: Hello"}},
+            {
+                "event": "done",
+                "data": {"input": "Hello", "output": "Mock response to: Hello"},
+            },
+        ]
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_stream_sync_generator(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test chunks from stream_chat are forwarded as they are produced"""
+
+        class StreamingProcessor(MockChatProcessor):
+            def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+                yield "Hello"
+                yield ", world"
+
+        mock_get_processor.return_value = StreamingProcessor()
+
+        response = client.post("/chat/stream", json={"input": "hi"})
+
+        events = parse_sse(response.text)
+        assert [e["data"].get("chunk") for e in events[:-1]] == ["Hello", ", world"]
+        assert events[-1]["event"] == "done"
+        assert events[-1]["data"]["output"] == "Hello, world"
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_stream_reports_errors_in_band(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test errors raised while streaming are sent as an error event"""
+
+        class FailingProcessor(MockChatProcessor):
+            def stream_chat(self, chat_input: ChatInput) -> Iterator[str]:
+                yield "partial"
+                raise RuntimeError("model crashed")
+
+        mock_get_processor.return_value = FailingProcessor()
+
+        response = client.post("/chat/stream", json={"input": "hi"})
+
+        events = parse_sse(response.text)
+        assert events[0]["data"] == {"chunk": "partial"}
+        assert events[-1]["event"] == "error"
+        assert "model crashed" in events[-1]["data"]["error"]
+
+
+@pytest.fixture
+def reset_processor() -> Generator[None, None, None]:
+    """Reset the server's processor instance and readiness around a test"""
+    original = (
+        server.processor,
+        server.config,
+        server.ready,
+        server.hedged_processor,
+    )
+    server.processor, server.ready = None, False
+
+    yield
+
+    (
+        server.processor,
+        server.config,
+        server.ready,
+        server.hedged_processor,
+    ) = original
+
+
+@pytest.mark.usefixtures("reset_processor", "reset_worker_pool")
+class TestStartup:
+    """Test eager processor startup and the readiness probe"""
+
+    def test_ready_before_startup(self, client: TestClient) -> None:
+        """Test /ready fails until the processor has been warmed up"""
+        response = client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"status": "starting"}
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_lifespan_warms_up_processor(self, mock_get_processor: MagicMock) -> None:
+        """Test startup creates the processor and runs warmup before ready"""
+        warmed_up = []
+
+        class WarmupProcessor(MockChatProcessor):
+            def warmup(self) -> None:
+                warmed_up.append(server.ready)
+
+        mock_get_processor.return_value = WarmupProcessor()
+
+        with TestClient(app) as client:
+            response = client.get("/ready")
+            assert response.status_code == 200
+            assert response.json() == {"status": "ready"}
+
+        assert warmed_up == [False]
+        assert server.ready is False
+
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_get_processor_creates_single_instance(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test concurrent first callers share one processor instance"""
+        mock_load_config.return_value = {"processor_class": "m.MockProcessor"}
+        barrier = threading.Barrier(4)
+
+        class SlowProcessor(MockProcessor):
+            instances = 0
+
+            def __init__(self) -> None:
+                SlowProcessor.instances += 1
+
+        mock_load_class.return_value = SlowProcessor
+
+        results = []
+
+        def worker() -> None:
+            barrier.wait()
+            results.append(server.get_processor())
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert SlowProcessor.instances == 1
+        assert all(result is results[0] for result in results)
+
+
+@pytest.mark.usefixtures("reset_worker_pool")
+class TestPrefork:
+    """Test the pre-fork multi-worker mode"""
+
+    @patch("orchael_sdk.server.run_prefork")
+    @patch("orchael_sdk.server.uvicorn.run")
+    def test_run_server_single_worker(
+        self, mock_uvicorn_run: MagicMock, mock_run_prefork: MagicMock
+    ) -> None:
+        """Test a single worker runs uvicorn in-process"""
+        server.run_server(port=9000, config_file="config.yaml")
+
+        mock_uvicorn_run.assert_called_once_with(app, host="0.0.0.0", port=9000)
+        mock_run_prefork.assert_not_called()
+
+    @patch("orchael_sdk.server.run_prefork")
+    @patch("orchael_sdk.server.uvicorn.run")
+    def test_run_server_multiple_workers(
+        self, mock_uvicorn_run: MagicMock, mock_run_prefork: MagicMock
+    ) -> None:
+        """Test several workers use the pre-fork supervisor"""
+        server.run_server(port=9000, config_file="config.yaml", workers=3)
+
+        mock_run_prefork.assert_called_once_with("0.0.0.0", 9000, 3)
+        mock_uvicorn_run.assert_not_called()
+
+    @patch("orchael_sdk.server.create_listen_socket")
+    @patch("orchael_sdk.server.fork_worker")
+    @patch("orchael_sdk.server.os.waitpid")
+    @patch("orchael_sdk.server.gc.freeze")
+    @patch("orchael_sdk.server.get_processor")
+    def test_run_prefork_preloads_and_restarts_crashed_workers(
+        self,
+        mock_get_processor: MagicMock,
+        mock_freeze: MagicMock,
+        mock_waitpid: MagicMock,
+        mock_fork_worker: MagicMock,
+        mock_create_socket: MagicMock,
+    ) -> None:
+        """Test the master preloads once, freezes the heap and replaces crashes"""
+        mock_fork_worker.side_effect = [101, 102, 103]
+        # Worker 101 crashes with exit code 1, the others exit cleanly
+        mock_waitpid.side_effect = [(101, 1 << 8), (102, 0), (103, 0)]
+
+        server.run_prefork("127.0.0.1", 9000, 2)
+
+        mock_get_processor.assert_called_once()
+        mock_freeze.assert_called_once()
+        assert mock_fork_worker.call_count == 3
+        mock_create_socket.return_value.close.assert_called_once()
+
+
+@pytest.fixture
+def reset_sessions() -> Generator[None, None, None]:
+    """Reset the server's session store around a test"""
+    original = server.session_store
+    server.session_store = None
+
+    yield
+
+    server.session_store = original
+
+
+@pytest.mark.usefixtures("reset_sessions", "reset_worker_pool")
+class TestSessions:
+    """Test server-side conversation sessions"""
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_session_history_is_kept_on_server(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test clients only send new input and the server supplies history"""
+        seen_histories = []
+
+        class HistoryRecordingProcessor(MockProcessor):
+            def process_chat(self, chat_input: dict) -> dict:  # type: ignore[type-arg]
+                seen_histories.append(list(chat_input["history"]))
+                return super().process_chat(chat_input)
+
+        mock_get_processor.return_value = HistoryRecordingProcessor()
+
+        sessionid = client.post("/sessions").json()["sessionid"]
+        first = client.post("/chat", json={"input": "one", "sessionid": sessionid})
+        client.post("/chat", json={"input": "two", "sessionid": sessionid})
+
+        assert first.json()["sessionid"] == sessionid
+        assert seen_histories == [
+            [],
+            [{"input": "one", "output": "Mock response to: one"}],
+        ]
+
+        history = client.get(f"/sessions/{sessionid}").json()["history"]
+        assert [entry["input"] for entry in history] == ["one", "two"]
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_processor_gets_a_copy_of_session_history(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test changes the processor makes to its history stay out of the session"""
+        seen_histories = []
+
+        class HistoryMutatingProcessor(MockChatProcessor):
+            def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+                history = chat_input["history"]
+                assert history is not None
+                seen_histories.append(history)
+                history.append({"input": "injected", "output": "injected"})
+                return super().process_chat(chat_input)
+
+        mock_get_processor.return_value = HistoryMutatingProcessor()
+
+        client.post("/chat", json={"input": "one", "sessionid": "s1"})
+        client.post("/chat", json={"input": "two", "sessionid": "s1"})
+
+        history = server.get_session_store().get("s1")
+        assert [entry["input"] for entry in history or []] == ["one", "two"]
+        assert seen_histories[0] is not seen_histories[1]
+        assert [entry["input"] for entry in seen_histories[0]] == ["injected"]
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_chat_without_session_omits_sessionid(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test stateless requests keep the original response shape"""
+        mock_get_processor.return_value = mock_processor
+
+        response = client.post("/chat", json={"input": "hi"})
+
+        assert response.json() == {"input": "hi", "output": "Mock response to: hi"}
+        assert server.session_store is None
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_stream_records_session_turn(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test streamed turns are appended to the session"""
+        mock_get_processor.return_value = mock_processor
+
+        response = client.post("/chat/stream", json={"input": "hi", "sessionid": "s1"})
+
+        assert parse_sse(response.text)[-1]["data"]["sessionid"] == "s1"
+        assert server.get_session_store().get("s1") == [
+            {"input": "hi", "output": "Mock response to: hi"}
+        ]
+
+    def test_session_config(self) -> None:
+        """Test the store is configured from the 'server.sessions' section"""
+        original_config = server.config
+        server.config = {
+            "processor_class": "m.C",
+            "server": {"sessions": {"max_sessions": 5, "max_entries": 20}},
+        }
+        try:
+            store = server.get_session_store()
+        finally:
+            server.config = original_config
+
+        assert store.max_sessions == 5
+        assert store.max_entries == 20
+
+    def test_delete_session(self, client: TestClient) -> None:
+        """Test sessions can be deleted and unknown sessions return 404"""
+        sessionid = client.post("/sessions").json()["sessionid"]
+
+        assert client.delete(f"/sessions/{sessionid}").status_code == 204
+        assert client.delete(f"/sessions/{sessionid}").status_code == 404
+        assert client.get(f"/sessions/{sessionid}").status_code == 404
+
+
+@pytest.mark.usefixtures("reset_sessions", "reset_worker_pool")
+class TestChatBatch:
+    """Test the batch chat endpoint"""
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_batch_fans_out_to_process_chat(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test processors without batch hooks handle each request"""
+        mock_get_processor.return_value = mock_processor
+
+        response = client.post(
+            "/chat/batch",
+            json={"requests": [{"input": "a"}, {"input": "b", "sessionid": "s"}]},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "responses": [
+                {"input": "a", "output": "Mock response to: a"},
+                {"input": "b", "output": "Mock response to: b", "sessionid": "s"},
+            ]
+        }
+        assert server.get_session_store().get("s") == [
+            {"input": "b", "output": "Mock response to: b"}
+        ]
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_batch_uses_process_batch(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test processors overriding process_batch get the whole batch"""
+        batches = []
+
+        class BatchingProcessor(MockChatProcessor):
+            def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+                batches.append([chat_input["input"] for chat_input in chat_inputs])
+                return [
+                    ChatOutput(input=chat_input["input"], output="batched")
+                    for chat_input in chat_inputs
+                ]
+
+        mock_get_processor.return_value = BatchingProcessor()
+
+        response = client.post(
+            "/chat/batch", json={"requests": [{"input": "a"}, {"input": "b"}]}
+        )
+
+        assert batches == [["a", "b"]]
+        assert [item["output"] for item in response.json()["responses"]] == [
+            "batched",
+            "batched",
+        ]
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_batch_rejects_mismatched_outputs(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test a process_batch returning the wrong number of outputs fails"""
+
+        class BrokenProcessor(MockChatProcessor):
+            def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+                return []
+
+        mock_get_processor.return_value = BrokenProcessor()
+
+        response = client.post("/chat/batch", json={"requests": [{"input": "a"}]})
+
+        assert response.status_code == 500
+        assert "0 outputs for 1 inputs" in response.json()["detail"]
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_batch_reports_failing_items(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test an item failing in process_chat does not fail the others"""
+
+        class PickyProcessor(MockChatProcessor):
+            def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+                if chat_input["input"] == "bad":
+                    raise ValueError("unsupported input")
+                return super().process_chat(chat_input)
+
+        mock_get_processor.return_value = PickyProcessor()
+
+        response = client.post(
+            "/chat/batch",
+            json={"requests": [{"input": "a"}, {"input": "bad", "sessionid": "s"}]},
+        )
+
+        assert response.status_code == 200
+        assert response.json() == {
+            "responses": [
+                {"input": "a", "output": "Mock response to: a"},
+                {
+                    "input": "bad",
+                    "sessionid": "s",
+                    "error": "Error processing chat: unsupported input",
+                },
+            ]
+        }
+        # The failed turn is not added to the session
+        assert server.get_session_store().get("s") == []
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_failing_process_batch_fails_whole_batch(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test a batch hook that raises fails every item with 500"""
+
+        class FailingBatchProcessor(MockChatProcessor):
+            def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+                raise RuntimeError("backend down")
+
+        mock_get_processor.return_value = FailingBatchProcessor()
+
+        response = client.post(
+            "/chat/batch", json={"requests": [{"input": "a"}, {"input": "b"}]}
+        )
+
+        assert response.status_code == 500
+        assert response.json() == {"detail": "Error processing batch: backend down"}
+
+
+@pytest.fixture
+def reset_micro_batcher() -> Generator[None, None, None]:
+    """Reset the server's micro-batcher and config around a test"""
+    original = (server.micro_batcher, server.config)
+    server.micro_batcher = None
+
+    yield
+
+    server.micro_batcher, server.config = original
+
+
+@pytest.mark.usefixtures("reset_micro_batcher", "reset_sessions", "reset_worker_pool")
+class TestMicroBatching:
+    """Test coalescing concurrent /chat requests into batches"""
+
+    class BatchingProcessor(MockChatProcessor):
+        def __init__(self) -> None:
+            self.batches: List[List[str]] = []
+
+        async def aprocess_batch(
+            self, chat_inputs: List[ChatInput]
+        ) -> List[ChatOutput]:
+            self.batches.append([chat_input["input"] for chat_input in chat_inputs])
+            return [
+                ChatOutput(input=chat_input["input"], output="batched")
+                for chat_input in chat_inputs
+            ]
+
+    def test_concurrent_chats_are_batched(self) -> None:
+        """Test concurrent /chat requests reach aprocess_batch together"""
+        import httpx
+
+        server.config = {
+            "processor_class": "m.C",
+            "server": {"micro_batching": {"max_batch_size": 4, "max_wait_ms": 50}},
+        }
+        proc = self.BatchingProcessor()
+
+        async def run() -> List[httpx.Response]:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return list(
+                    await asyncio.gather(
+                        *(
+                            client.post("/chat", json={"input": str(i)})
+                            for i in range(4)
+                        )
+                    )
+                )
+
+        with patch("orchael_sdk.server.get_processor", return_value=proc):
+            responses = asyncio.run(run())
+
+        assert [response.json()["input"] for response in responses] == [
+            "0",
+            "1",
+            "2",
+            "3",
+        ]
+        assert proc.batches == [["0", "1", "2", "3"]]
+
+    class SyncBatchingProcessor(MockChatProcessor):
+        def __init__(self) -> None:
+            self.batches: List[List[str]] = []
+            self.threads: List[str] = []
+
+        def process_batch(self, chat_inputs: List[ChatInput]) -> List[ChatOutput]:
+            self.batches.append([chat_input["input"] for chat_input in chat_inputs])
+            self.threads.append(threading.current_thread().name)
+            return [
+                ChatOutput(input=chat_input["input"], output="batched")
+                for chat_input in chat_inputs
+            ]
+
+    @pytest.mark.usefixtures("reset_processor")
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_middleware_keeps_batching_on_worker_pool(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test wrapped processors are still batched, on the bounded worker pool"""
+        import httpx
+
+        mock_load_config.return_value = {
+            "processor_class": "m.SyncBatchingProcessor",
+            "server": {
+                "max_workers": 1,
+                "micro_batching": {"max_batch_size": 4, "max_wait_ms": 50},
+            },
+            "middleware": [{"context_window": {"max_turns": 4}}],
+        }
+        mock_load_class.return_value = self.SyncBatchingProcessor
+
+        async def run() -> List[httpx.Response]:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return list(
+                    await asyncio.gather(
+                        *(
+                            client.post("/chat", json={"input": str(i)})
+                            for i in range(4)
+                        )
+                    )
+                )
+
+        server.get_processor()
+        responses = asyncio.run(run())
+
+        assert [response.json()["output"] for response in responses] == ["batched"] * 4
+        assert isinstance(server.processor, MiddlewareChatProcessor)
+        proc = server.processor.processor
+        assert isinstance(proc, self.SyncBatchingProcessor)
+        assert proc.batches == [["0", "1", "2", "3"]]
+        assert proc.threads[0].startswith("orchael-worker")
+
+    @pytest.mark.usefixtures("reset_processor")
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_middleware_runs_sync_processor_on_worker_pool(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test a wrapped synchronous processor runs on the bounded worker pool"""
+        threads = []
+
+        class ThreadProcessor(MockChatProcessor):
+            def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+                threads.append(threading.current_thread().name)
+                return super().process_chat(chat_input)
+
+        mock_load_config.return_value = {
+            "processor_class": "m.ThreadProcessor",
+            "server": {"max_workers": 1},
+            "middleware": [{"context_window": {"max_turns": 4}}],
+        }
+        mock_load_class.return_value = ThreadProcessor
+
+        with TestClient(app) as client:
+            assert client.post("/chat", json={"input": "hi"}).status_code == 200
+
+        assert len(threads) == 1
+        assert threads[0].startswith("orchael-worker")
+
+    def test_processors_without_batch_hooks_are_not_batched(self) -> None:
+        """Test micro-batching is skipped for processors that cannot batch"""
+        server.config = {"processor_class": "m.C", "server": {"micro_batching": {}}}
+        assert server.get_micro_batcher(MockChatProcessor()) is None
+
+    def test_micro_batching_disabled_by_default(self) -> None:
+        """Test no batcher is created without the config section"""
+        server.config = {"processor_class": "m.C"}
+        assert server.get_micro_batcher(self.BatchingProcessor()) is None
+
+    def test_empty_micro_batching_section_uses_defaults(self) -> None:
+        """Test an empty config section enables batching with default limits"""
+        server.config = {"processor_class": "m.C", "server": {"micro_batching": {}}}
+        batcher = server.get_micro_batcher(self.BatchingProcessor())
+        assert batcher is not None
+        assert batcher.max_batch_size == 16
+
+
+@pytest.fixture
+def reset_response_cache() -> Generator[None, None, None]:
+    """Reset the server's response cache and config around a test"""
+    original = (server.response_cache, server.config)
+    server.response_cache = None
+
+    yield
+
+    server.response_cache, server.config = original
+
+
+class CountingProcessor(OrchaelChatProcessor):
+    """Processor that counts calls and records history"""
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.history: List[ChatHistoryEntry] = []
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.calls += 1
+        output = ChatOutput(input=chat_input["input"], output=f"answer {self.calls}")
+        self.record_history({"input": output["input"], "output": output["output"]})
+        return output
+
+    def record_history(self, entry: ChatHistoryEntry) -> None:
+        self.history.append(entry)
+
+    def get_history(self) -> List[ChatHistoryEntry]:
+        return self.history
+
+
+@pytest.mark.usefixtures("reset_response_cache", "reset_sessions", "reset_worker_pool")
+class TestResponseCaching:
+    """Test the opt-in /chat response cache"""
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_repeated_request_is_served_from_cache(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test exact repeats hit the cache and are still recorded to history"""
+        server.config = {"processor_class": "m.C", "server": {"cache": {}}}
+        proc = CountingProcessor()
+        mock_get_processor.return_value = proc
+
+        first = client.post("/chat", json={"input": "faq"})
+        second = client.post("/chat", json={"input": "faq"})
+        other = client.post("/chat", json={"input": "other"})
+
+        assert first.json()["output"] == second.json()["output"] == "answer 1"
+        assert other.json()["output"] == "answer 2"
+        assert proc.calls == 2
+        assert [entry["input"] for entry in proc.history] == ["faq", "faq", "other"]
+        assert client.get("/cache/stats").json() == {
+            "hits": 1,
+            "misses": 2,
+            "entries": 2,
+            "bytes": 24,
+        }
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_non_cacheable_processor_is_not_cached(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test processors can opt out of caching"""
+        server.config = {"processor_class": "m.C", "server": {"cache": {}}}
+        proc = CountingProcessor()
+        proc.cacheable = False
+        mock_get_processor.return_value = proc
+
+        client.post("/chat", json={"input": "faq"})
+        client.post("/chat", json={"input": "faq"})
+
+        assert proc.calls == 2
+        assert server.response_cache is None
+
+    def test_cache_disabled_by_default(self, client: TestClient) -> None:
+        """Test no cache is created without the config section"""
+        server.config = {"processor_class": "m.C"}
+        assert server.get_response_cache(CountingProcessor()) is None
+        assert client.get("/cache/stats").status_code == 404
+
+
+@pytest.fixture
+def reset_single_flight() -> Generator[None, None, None]:
+    """Reset the server's request coalescer and config around a test"""
+    original = (server.in_flight, server.config)
+    server.in_flight = None
+
+    yield
+
+    server.in_flight, server.config = original
+
+
+@pytest.mark.usefixtures(
+    "reset_single_flight", "reset_response_cache", "reset_sessions"
+)
+class TestRequestCoalescing:
+    """Test sharing one processor call between identical concurrent requests"""
+
+    class SlowProcessor(CountingProcessor):
+        async def aprocess_chat(self, chat_input: ChatInput) -> ChatOutput:
+            await asyncio.sleep(0.05)
+            return self.process_chat(chat_input)
+
+    def post_concurrently(self, proc: OrchaelChatProcessor, inputs: List[str]) -> Any:
+        """Send /chat requests for the inputs concurrently"""
+        import httpx
+
+        async def run() -> List[httpx.Response]:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://test"
+            ) as client:
+                return list(
+                    await asyncio.gather(
+                        *(client.post("/chat", json={"input": text}) for text in inputs)
+                    )
+                )
+
+        with patch("orchael_sdk.server.get_processor", return_value=proc):
+            return asyncio.run(run())
+
+    def test_identical_requests_share_one_call(self) -> None:
+        """Test identical concurrent requests reach the processor once"""
+        server.config = {"processor_class": "m.C", "server": {"coalesce": True}}
+        proc = self.SlowProcessor()
+
+        responses = self.post_concurrently(proc, ["popular"] * 5 + ["rare"])
+
+        assert proc.calls == 2
+        assert {response.json()["output"] for response in responses[:5]} == {
+            responses[0].json()["output"]
+        }
+        # Every caller's turn is still recorded to the processor's history
+        assert len(proc.history) == 6
+        assert server.in_flight is not None
+        assert server.in_flight.stats()["shared"] == 4
+
+    def test_coalescing_disabled_by_default(self) -> None:
+        """Test requests are not coalesced without the config flag"""
+        server.config = {"processor_class": "m.C"}
+        proc = self.SlowProcessor()
+
+        self.post_concurrently(proc, ["popular"] * 3)
+
+        assert proc.calls == 3
+
+
+@pytest.fixture
+def reset_admission() -> Generator[None, None, None]:
+    """Reset the server's admission limiter and config around a test"""
+    original = (server.admission_limiter, server.config)
+    server.admission_limiter = None
+
+    yield
+
+    server.admission_limiter, server.config = original
+
+
+@pytest.mark.usefixtures("reset_admission", "reset_sessions", "reset_worker_pool")
+class TestAdmissionControl:
+    """Test shedding load with an adaptive concurrency limit"""
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_overloaded_requests_get_429(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test requests beyond the queue are shed with 429 and Retry-After"""
+        server.config = {
+            "processor_class": "m.C",
+            "server": {
+                "admission": {
+                    "initial_limit": 1,
+                    "max_queue": 0,
+                    "target_latency_ms": 60000,
+                }
+            },
+        }
+        mock_get_processor.return_value = mock_processor
+        limiter = server.get_admission_limiter()
+        assert limiter is not None
+
+        # Occupy the only slot so the next request is shed
+        limiter.in_flight = 1
+        for path in ["/chat", "/chat/stream"]:
+            response = client.post(path, json={"input": "hi"})
+            assert response.status_code == 429
+            assert int(response.headers["Retry-After"]) >= 1
+
+        limiter.in_flight = 0
+        assert client.post("/chat", json={"input": "hi"}).status_code == 200
+        assert client.post("/chat/stream", json={"input": "hi"}).status_code == 200
+        # Both requests finished well within the target, growing the limit
+        assert client.get("/admission/stats").json() == {
+            "limit": 2,
+            "in_flight": 0,
+            "queue_depth": 0,
+            "accepted": 2,
+            "shed": 2,
+        }
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_batch_latency_counts_per_item(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test a batch slower than the target as a whole does not shrink the limit"""
+        server.config = {"processor_class": "m.C", "server": {"admission": {}}}
+        mock_get_processor.return_value = mock_processor
+        # Every reading of the clock moves it on by a second
+        ticks = itertools.count()
+        limiter = server.admission_limiter = AdaptiveLimiter(
+            initial_limit=4, target_latency_ms=200, clock=lambda: float(next(ticks))
+        )
+
+        response = client.post(
+            "/chat/batch", json={"requests": [{"input": str(i)} for i in range(10)]}
+        )
+        assert response.status_code == 200
+        # One second for ten items is 100ms each, within the target
+        assert limiter.limit > 4
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_stream_slot_released_when_body_never_starts(
+        self, mock_get_processor: MagicMock, mock_processor: MockProcessor
+    ) -> None:
+        """Test a client gone before the stream starts does not keep its slot"""
+        from starlette.requests import ClientDisconnect
+        from starlette.types import Message
+
+        server.config = {"processor_class": "m.C", "server": {"admission": {}}}
+        mock_get_processor.return_value = mock_processor
+        limiter = server.get_admission_limiter()
+        assert limiter is not None
+
+        async def receive() -> Message:
+            return {"type": "http.disconnect"}
+
+        async def send(message: Message) -> None:
+            raise OSError("client disconnected")
+
+        async def run() -> None:
+            response = await server.stream_chat(server.ChatRequest(input="hi"))
+            assert limiter.in_flight == 1
+            scope = {"type": "http", "asgi": {"spec_version": "2.4"}}
+            with pytest.raises(ClientDisconnect):
+                await response(scope, receive, send)
+
+        asyncio.run(run())
+        assert limiter.in_flight == 0
+
+    def test_admission_disabled_by_default(self, client: TestClient) -> None:
+        """Test no limiter is created without the config section"""
+        server.config = {"processor_class": "m.C"}
+        assert server.get_admission_limiter() is None
+        assert client.get("/admission/stats").status_code == 404
+
+
+@pytest.mark.usefixtures("reset_admission", "reset_sessions", "reset_worker_pool")
+class TestMetrics:
+    """Test the Prometheus-style /metrics endpoint"""
+
+    def count(self, name: str, **labels: str) -> int:
+        """Return the number of observations of a server histogram"""
+        histogram = getattr(server, name)
+        return int(histogram.count(**labels))
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_chat_phases_are_recorded(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test a /chat request records its count, latency and every phase"""
+        server.config = {"processor_class": "m.C", "server": {"admission": {}}}
+        mock_get_processor.return_value = mock_processor
+        requests_before = server.http_requests.value(endpoint="/chat", status="200")
+        phases_before = {
+            phase: self.count("request_phase_duration", endpoint="/chat", phase=phase)
+            for phase in ["queue_wait", "validation", "process", "serialization"]
+        }
+        history_before = self.count("chat_history_entries")
+
+        history = [{"input": "a", "output": "b"}]
+        response = client.post("/chat", json={"input": "hi", "history": history})
+        assert response.status_code == 200
+
+        assert (
+            server.http_requests.value(endpoint="/chat", status="200")
+            == requests_before + 1
+        )
+        for phase, before in phases_before.items():
+            assert (
+                self.count("request_phase_duration", endpoint="/chat", phase=phase)
+                == before + 1
+            )
+        assert self.count("chat_history_entries") == history_before + 1
+        assert server.http_requests_in_flight.value() == 0
+        assert server.processor_calls_in_flight.value() == 0
+
+    def test_metrics_endpoint_renders_text_format(self, client: TestClient) -> None:
+        """Test /metrics serves the Prometheus text format"""
+        server.config = {"processor_class": "m.C"}
+        client.get("/health")
+
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = response.text
+        assert "# TYPE orchael_http_requests_total counter" in body
+        assert 'orchael_http_requests_total{endpoint="/health",status="200"}' in body
+        assert "# TYPE orchael_request_phase_duration_seconds histogram" in body
+        assert "orchael_processor_init_seconds" in body
+
+    def test_path_parameters_use_route_template(self, client: TestClient) -> None:
+        """Test requests are labelled by route so IDs do not create new series"""
+        client.delete("/sessions/unknown")
+        assert (
+            server.http_requests.value(endpoint="/sessions/{sessionid}", status="404")
+            >= 1
+        )
+
+    def test_component_stats_are_exposed(self, client: TestClient) -> None:
+        """Test enabled components report their counters at scrape time"""
+        server.config = {"processor_class": "m.C", "server": {"admission": {}}}
+        assert "\norchael_admission_limit " not in client.get("/metrics").text
+
+        server.get_admission_limiter()
+        assert "\norchael_admission_limit 8\n" in client.get("/metrics").text
+
+
+class BufferedProcessor(CountingProcessor):
+    """Processor keeping its history in a HistoryBuffer"""
+
+    def __init__(self, entries: int) -> None:
+        super().__init__()
+        self.buffer = HistoryBuffer(max_entries=None)
+        self.buffer.extend({"input": str(i), "output": str(i)} for i in range(entries))
+
+    def get_history(self) -> List[ChatHistoryEntry]:
+        return self.buffer.entries()
+
+    def get_history_page(
+        self, cursor: int = 0, limit: Optional[int] = None
+    ) -> ChatHistoryPage:
+        return self.buffer.page(cursor, limit)
+
+
+@pytest.mark.usefixtures("reset_worker_pool")
+class TestChatHistoryPagination:
+    """Test paging and streaming /chat/history"""
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_paginate_with_cursor(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test a limit returns one page and the cursor of the next"""
+        mock_get_processor.return_value = mock_processor
+
+        response = client.get("/chat/history", params={"limit": 1})
+        assert response.json() == {
+            "history": [{"input": "test input 1", "output": "test output 1"}],
+            "next_cursor": 1,
+        }
+
+        response = client.get("/chat/history", params={"cursor": 1, "limit": 1})
+        assert response.json() == {
+            "history": [{"input": "test input 2", "output": "test output 2"}],
+            "next_cursor": None,
+        }
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_invalid_pagination(
+        self,
+        mock_get_processor: MagicMock,
+        client: TestClient,
+        mock_processor: MockProcessor,
+    ) -> None:
+        """Test negative cursors and zero limits are rejected"""
+        mock_get_processor.return_value = mock_processor
+
+        assert client.get("/chat/history", params={"cursor": -1}).status_code == 422
+        assert client.get("/chat/history", params={"limit": 0}).status_code == 422
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_stream_whole_history_in_pages(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test the full history is streamed using the processor's paging hook"""
+        entries = server.HISTORY_PAGE_SIZE * 2 + 3
+        proc = BufferedProcessor(entries)
+        mock_get_processor.return_value = proc
+        pages: List[int] = []
+        original_page = proc.get_history_page
+
+        def counting_page(
+            cursor: int = 0, limit: Optional[int] = None
+        ) -> ChatHistoryPage:
+            pages.append(cursor)
+            return original_page(cursor, limit)
+
+        with patch.object(proc, "get_history_page", counting_page):
+            response = client.get("/chat/history")
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "application/json"
+        history = response.json()["history"]
+        assert [entry["input"] for entry in history] == [str(i) for i in range(entries)]
+        assert len(pages) == 3
+
+        response = client.get("/chat/history", params={"cursor": entries - 1})
+        assert response.json() == {
+            "history": [{"input": str(entries - 1), "output": str(entries - 1)}]
+        }
+
+    @patch("orchael_sdk.server.get_processor")
+    def test_stream_empty_history(
+        self, mock_get_processor: MagicMock, client: TestClient
+    ) -> None:
+        """Test an empty history or a cursor past the end streams an empty list"""
+        mock_get_processor.return_value = BufferedProcessor(0)
+        assert client.get("/chat/history").json() == {"history": []}
+
+        mock_get_processor.return_value = BufferedProcessor(2)
+        response = client.get("/chat/history", params={"cursor": 5})
+        assert response.json() == {"history": []}
+
+
+class StoreBackedProcessor(OrchaelChatProcessor):
+    """Processor relying on the default history hooks"""
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        output = ChatOutput(input=chat_input["input"], output="stored")
+        self.record_history({"input": output["input"], "output": output["output"]})
+        return output
+
+
+@pytest.mark.usefixtures("reset_processor", "reset_worker_pool")
+class TestHistoryStoreConfig:
+    """Test selecting the processor's history store from config"""
+
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_configured_store_persists_history(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock, tmp_path: Any
+    ) -> None:
+        """Test the 'history' section selects the store and shutdown flushes it"""
+        path = str(tmp_path / "history.db")
+        mock_load_config.return_value = {
+            "processor_class": "m.StoreBackedProcessor",
+            "history": {"backend": "sqlite", "path": path, "batch_size": 100},
+        }
+        mock_load_class.return_value = StoreBackedProcessor
+
+        with TestClient(app) as client:
+            assert client.post("/chat", json={"input": "hi"}).status_code == 200
+            response = client.get("/chat/history", params={"limit": 10})
+            assert response.json() == {
+                "history": [{"input": "hi", "output": "stored"}],
+                "next_cursor": None,
+            }
+
+        # A new store on the same database sees the turn
+        store = SQLiteHistoryStore(path)
+        assert store.entries() == [{"input": "hi", "output": "stored"}]
+        store.close()
+
+
+class ShoutingMiddleware(ChatMiddleware):
+    """Middleware that upper-cases outputs"""
+
+    def after(self, chat_input: ChatInput, output: ChatOutput) -> ChatOutput:
+        return ChatOutput(input=output["input"], output=output["output"].upper())
+
+
+@pytest.mark.usefixtures("reset_processor", "reset_worker_pool")
+class TestMiddlewareConfig:
+    """Test wrapping the processor in the middleware declared in config"""
+
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_configured_middleware_runs(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test the 'middleware' section wraps every chat call"""
+        mock_load_config.return_value = {
+            "processor_class": "m.StoreBackedProcessor",
+            "history": {"backend": "memory"},
+            "middleware": [
+                {"context_window": {"max_turns": 1}},
+                "tests.test_server.ShoutingMiddleware",
+            ],
+        }
+        mock_load_class.return_value = StoreBackedProcessor
+
+        with TestClient(app) as client:
+            response = client.post("/chat", json={"input": "hi"})
+            assert response.json() == {"input": "hi", "output": "STORED"}
+
+            # History stays the wrapped processor's
+            response = client.get("/chat/history")
+            assert response.json() == {"history": [{"input": "hi", "output": "stored"}]}
+
+        assert isinstance(server.processor, MiddlewareChatProcessor)
+
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_no_middleware_uses_processor_directly(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test the processor is not wrapped when no middleware is configured"""
+        mock_load_config.return_value = {"processor_class": "m.StoreBackedProcessor"}
+        mock_load_class.return_value = StoreBackedProcessor
+
+        assert type(server.get_processor()) is StoreBackedProcessor
+
+
+class StuckProcessor(StoreBackedProcessor):
+    """Processor that does not answer until released"""
+
+    released = threading.Event()
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        self.released.wait(5)
+        return super().process_chat(chat_input)
+
+
+class ReplicaProcessor(OrchaelChatProcessor):
+    """Replica referenced by import path from the hedging config"""
+
+    def process_chat(self, chat_input: ChatInput) -> ChatOutput:
+        output = ChatOutput(input=chat_input["input"], output="replica")
+        self.record_history({"input": output["input"], "output": output["output"]})
+        return output
+
+
+@pytest.mark.usefixtures("reset_processor", "reset_worker_pool")
+class TestHedgingConfig:
+    """Test hedging processor calls when configured"""
+
+    def test_stats_not_enabled(self, client: TestClient) -> None:
+        """Test /hedging/stats is 404 without hedging"""
+        server.hedged_processor = None
+        assert client.get("/hedging/stats").status_code == 404
+
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_hedging_reports_stats(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test the 'hedging' section wraps the processor and reports counts"""
+        mock_load_config.return_value = {
+            "processor_class": "m.StoreBackedProcessor",
+            "hedging": {"min_samples": 100},
+            "middleware": ["tests.test_server.ShoutingMiddleware"],
+        }
+        mock_load_class.return_value = StoreBackedProcessor
+
+        with TestClient(app) as client:
+            response = client.post("/chat", json={"input": "hi"})
+            assert response.json() == {"input": "hi", "output": "STORED"}
+
+            assert client.get("/hedging/stats").json() == {
+                "requests": 1,
+                "hedges": 0,
+                "hedge_wins": 0,
+                "delay_ms": 0.0,
+            }
+            assert "orchael_hedges_total 0" in client.get("/metrics").text
+
+            # Hedged calls to the synchronous processor use the worker pool
+            assert server.hedged_processor is not None
+            assert server.hedged_processor.executor is server.get_executor()
+
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_replica_turns_reach_history(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test a turn answered by a replica is in the processor's history"""
+        mock_load_config.return_value = {
+            "processor_class": "m.StuckProcessor",
+            "history": {"backend": "memory"},
+            "hedging": {
+                "min_samples": 1,
+                "min_delay_ms": 1,
+                "max_delay_ms": 1,
+                "replicas": ["tests.test_server.ReplicaProcessor"],
+            },
+        }
+        mock_load_class.return_value = StuckProcessor
+
+        try:
+            with TestClient(app) as client:
+                assert server.hedged_processor is not None
+                server.hedged_processor.latency.observe(0.001)
+
+                response = client.post("/chat", json={"input": "hi"})
+                assert response.json() == {"input": "hi", "output": "replica"}
+
+                response = client.get("/chat/history")
+                assert response.json() == {
+                    "history": [{"input": "hi", "output": "replica"}]
+                }
+                StuckProcessor.released.set()
+        finally:
+            StuckProcessor.released.set()
+
+
+class FanOutProcessor(ParallelChatProcessor):
+    """Parallel processor over two store-backed processors"""
+
+    def __init__(self) -> None:
+        super().__init__([StoreBackedProcessor(), StoreBackedProcessor()])
+
+
+@pytest.mark.usefixtures("reset_processor", "reset_worker_pool")
+class TestParallelProcessor:
+    """Test serving a ParallelChatProcessor"""
+
+    @patch("orchael_sdk.server.load_processor_class")
+    @patch("orchael_sdk.server.load_config")
+    def test_parallel_calls_use_worker_pool(
+        self, mock_load_config: MagicMock, mock_load_class: MagicMock
+    ) -> None:
+        """Test a wrapped parallel processor calls its processors on the pool"""
+        mock_load_config.return_value = {
+            "processor_class": "m.FanOutProcessor",
+            "hedging": {"min_samples": 100},
+            "middleware": ["tests.test_server.ShoutingMiddleware"],
+        }
+        mock_load_class.return_value = FanOutProcessor
+
+        with TestClient(app) as client:
+            response = client.post("/chat", json={"input": "hi"})
+            assert response.json() == {"input": "hi", "output": "STORED"}
+
+            assert server.hedged_processor is not None
+            parallel = server.hedged_processor.processor
+            assert isinstance(parallel, FanOutProcessor)
+            assert parallel.executor is server.get_executor()
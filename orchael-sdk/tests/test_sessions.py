@@ -0,0 +1,108 @@
+"""
+Tests for server-side conversation sessions
+"""
+
+import pytest
+
+from orchael_sdk.history import entry_size
+from orchael_sdk.sessions import SessionStore
+
+
+class FakeClock:
+    """Manually advanced clock for TTL tests"""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestSessionStore:
+    """Test SessionStore"""
+
+    def test_append_and_get(self) -> None:
+        """Test turns are kept per session in order"""
+        store = SessionStore()
+        store.append("a", {"input": "hi", "output": "hello"})
+        store.append("a", {"input": "bye", "output": "goodbye"})
+        store.append("b", {"input": "x", "output": "y"})
+
+        assert store.get("a") == [
+            {"input": "hi", "output": "hello"},
+            {"input": "bye", "output": "goodbye"},
+        ]
+        assert store.get("b") == [{"input": "x", "output": "y"}]
+        assert store.get("missing") is None
+        assert len(store) == 2
+
+    def test_get_or_create_seeds_new_sessions_only(self) -> None:
+        """Test client history only seeds a session the first time"""
+        store = SessionStore()
+        seed = [{"input": "hi", "output": "hello"}]
+
+        assert store.get_or_create("a", seed) == seed  # type: ignore[arg-type]
+        store.append("a", {"input": "q", "output": "a"})
+
+        assert len(store.get_or_create("a", seed)) == 2  # type: ignore[arg-type]
+
+    def test_ttl_expiry(self) -> None:
+        """Test sessions expire after being idle for the TTL"""
+        clock = FakeClock()
+        store = SessionStore(ttl_seconds=10, clock=clock)
+        store.append("a", {"input": "hi", "output": "hello"})
+
+        clock.now = 5
+        assert store.get("a") is not None
+
+        clock.now = 16
+        assert store.get("a") is None
+        assert store.size == 0
+
+    def test_lru_eviction_by_count(self) -> None:
+        """Test the least recently used session is evicted over max_sessions"""
+        store = SessionStore(max_sessions=2)
+        store.append("a", {"input": "1", "output": "1"})
+        store.append("b", {"input": "2", "output": "2"})
+        store.get("a")
+        store.append("c", {"input": "3", "output": "3"})
+
+        assert store.get("b") is None
+        assert store.get("a") is not None
+        assert store.get("c") is not None
+
+    def test_eviction_by_bytes(self) -> None:
+        """Test sessions are evicted to stay under max_bytes"""
+        store = SessionStore(max_bytes=10)
+        store.append("a", {"input": "aaaa", "output": "aaaa"})
+        store.append("b", {"input": "bbbb", "output": "bbbb"})
+
+        assert store.get("a") is None
+        assert store.size == 8
+
+    def test_max_entries_drops_oldest_turns(self) -> None:
+        """Test per-session history is capped at max_entries"""
+        store = SessionStore(max_entries=2)
+        for i in range(4):
+            store.append("a", {"input": str(i), "output": str(i)})
+
+        history = store.get("a")
+        assert history is not None
+        assert [entry["input"] for entry in history] == ["2", "3"]
+        assert store.size == sum(entry_size(entry) for entry in history)
+
+    def test_delete(self) -> None:
+        """Test deleting a session frees its history"""
+        store = SessionStore()
+        store.append("a", {"input": "hi", "output": "hello"})
+
+        assert store.delete("a") is True
+        assert store.delete("a") is False
+        assert store.stats() == {"sessions": 0, "bytes": 0}
+
+    def test_invalid_limits(self) -> None:
+        """Test invalid limits are rejected"""
+        with pytest.raises(ValueError):
+            SessionStore(max_sessions=0)
+        with pytest.raises(ValueError):
+            SessionStore(max_entries=0)
@@ -0,0 +1,112 @@
+"""
+Tests for single-flight request coalescing
+"""
+
+import asyncio
+from typing import List, Tuple
+
+import pytest
+
+from orchael_sdk.singleflight import SingleFlight
+
+
+class TestSingleFlight:
+    """Test SingleFlight"""
+
+    def test_concurrent_callers_share_one_call(self) -> None:
+        """Test identical concurrent calls run once and share the result"""
+        flights: SingleFlight[str] = SingleFlight()
+        calls = []
+
+        async def slow() -> str:
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        async def run() -> List[Tuple[str, bool]]:
+            return list(
+                await asyncio.gather(*(flights.do("key", slow) for _ in range(5)))
+            )
+
+        results = asyncio.run(run())
+
+        assert len(calls) == 1
+        assert [result for result, _ in results] == ["result"] * 5
+        assert [shared for _, shared in results] == [False, True, True, True, True]
+        assert flights.stats() == {"calls": 1, "shared": 4, "in_flight": 0}
+
+    def test_different_keys_run_separately(self) -> None:
+        """Test calls with different keys are not coalesced"""
+        flights: SingleFlight[str] = SingleFlight()
+
+        async def run() -> List[Tuple[str, bool]]:
+            async def value(text: str) -> str:
+                await asyncio.sleep(0)
+                return text
+
+            return list(
+                await asyncio.gather(
+                    flights.do("a", lambda: value("a")),
+                    flights.do("b", lambda: value("b")),
+                )
+            )
+
+        assert asyncio.run(run()) == [("a", False), ("b", False)]
+
+    def test_sequential_calls_are_not_shared(self) -> None:
+        """Test a finished call is not reused by later callers"""
+        flights: SingleFlight[int] = SingleFlight()
+        counter = iter(range(10))
+
+        async def next_value() -> int:
+            return next(counter)
+
+        async def run() -> List[Tuple[int, bool]]:
+            return [
+                await flights.do("key", next_value),
+                await flights.do("key", next_value),
+            ]
+
+        assert asyncio.run(run()) == [(0, False), (1, False)]
+
+    def test_errors_reach_every_caller(self) -> None:
+        """Test a failing call raises in every waiting caller"""
+        flights: SingleFlight[str] = SingleFlight()
+
+        async def failing() -> str:
+            await asyncio.sleep(0.01)
+            raise RuntimeError("backend down")
+
+        async def run() -> List[object]:
+            return list(
+                await asyncio.gather(
+                    flights.do("key", failing),
+                    flights.do("key", failing),
+                    return_exceptions=True,
+                )
+            )
+
+        results = asyncio.run(run())
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+        assert len(flights) == 0
+
+    def test_cancelled_caller_does_not_cancel_call(self) -> None:
+        """Test the shared call survives the caller that started it going away"""
+        flights: SingleFlight[str] = SingleFlight()
+
+        async def slow() -> str:
+            await asyncio.sleep(0.02)
+            return "result"
+
+        async def run() -> Tuple[str, bool]:
+            leader = asyncio.ensure_future(flights.do("key", slow))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flights.do("key", slow))
+            await asyncio.sleep(0)
+            leader.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await leader
+            return await follower
+
+        assert asyncio.run(run()) == ("result", True)